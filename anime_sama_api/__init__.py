@@ -1,25 +1,44 @@
+from importlib import import_module
+import sys
+from typing import Any
+
 from .top_level import AnimeSama
 from .catalogue import Catalogue
 from .season import Season
 from .episode import Episode, Languages, Players
 from .langs import Lang, LangId, lang2ids, id2lang, flags
+from .metrics import Metrics
+from .parsing import ParseExecutor
+from .profiling import profile
+
+# The CLI pulls yt-dlp, rich and the user config, only load it when it is used
+_cli_functions = {
+    "main": ".cli.__main__",
+    "download": ".cli.downloader",
+    "multi_download": ".cli.downloader",
+}
+
+
+def _missing_cli_dependencies(*_: Any, **__: Any) -> int:
+    print(
+        "This anime-sama_api function could not run because the required "
+        "dependencies were not installed.\nMake sure you've installed "
+        "everything with: pip install 'anime-sama_api[cli]'"
+    )
+
+    sys.exit(1)
 
-try:
-    from .cli.__main__ import main
-    from .cli.downloader import download, multi_download
-except ImportError:
-    import sys
 
-    def main() -> int:
-        print(
-            "This anime-sama_api function could not run because the required "
-            "dependencies were not installed.\nMake sure you've installed "
-            "everything with: pip install 'anime-sama_api[cli]'"
-        )
+def __getattr__(name: str) -> Any:
+    if name not in _cli_functions:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-        sys.exit(1)
+    try:
+        module = import_module(_cli_functions[name], __name__)
+    except ImportError:
+        return _missing_cli_dependencies
 
-    download = multi_download = main  # type: ignore
+    return getattr(module, name)
 
 
 # __package__ = "anime-sama_api"
@@ -35,6 +54,9 @@ __all__ = [
     "lang2ids",
     "id2lang",
     "flags",
+    "Metrics",
+    "ParseExecutor",
+    "profile",
     "download",
     "multi_download",
     "main",
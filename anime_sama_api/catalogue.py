@@ -1,10 +1,14 @@
-from collections.abc import Sequence
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Sequence
 import re
 from typing import Any, Literal, cast
 
 from httpx import AsyncClient
 
-from .utils import remove_some_js_comments
+from .limits import limited_get
+from .parsing import parse, season_links
+from .episode import Episode
 from .season import Season
 from .langs import flags, Lang
 
@@ -54,7 +58,7 @@ class Catalogue:
         if self._page is not None:
             return self._page
 
-        response = await self.client.get(self.url)
+        response = await limited_get(self.client, self.url)
 
         if not response.is_success:
             self._page = ""
@@ -64,23 +68,43 @@ class Catalogue:
         return self._page
 
     async def seasons(self) -> list[Season]:
-        page_without_comments = remove_some_js_comments(string=await self.page())
+        page = await self.page()
 
-        seasons = re.findall(
-            r'panneauAnime\("(.+?)", *"(.+?)(?:vostfr|vf)"\);', page_without_comments
-        )
+        links = await parse(self.client, "catalogue", season_links, page)
 
-        seasons = [
+        return [
             Season(
                 url=self.url + link,
                 name=name,
                 serie_name=self.name,
                 client=self.client,
             )
-            for name, link in seasons
+            for name, link in links
         ]
 
-        return seasons
+    async def all_episodes_iter(self, window: int = 3) -> AsyncIterator[Episode]:
+        """
+        Yield the episodes of every season, in order. Up to `window` seasons are
+        fetched at once and the episodes of a season are yielded as soon as it is
+        merged, so only a few seasons are in memory at the same time.
+        """
+        fetching: deque[asyncio.Task[list[Episode]]] = deque()
+        try:
+            # All the seasons are on the catalogue page, they come with one request
+            for season in await self.seasons():
+                fetching.append(asyncio.ensure_future(season.episodes()))
+                if len(fetching) < window:
+                    continue
+
+                for episode in await fetching.popleft():
+                    yield episode
+
+            while fetching:
+                for episode in await fetching.popleft():
+                    yield episode
+        finally:
+            for task in fetching:
+                task.cancel()
 
     async def advancement(self) -> str:
         search = cast(list[str], re.findall(r"Avancement.+?>(.+?)<", await self.page()))
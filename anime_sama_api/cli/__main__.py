@@ -1,20 +1,47 @@
+import argparse
 import asyncio
 import logging
+from functools import partial
+from pathlib import Path
+from subprocess import Popen
 
 from rich import get_console
 from rich.logging import RichHandler
 from rich.status import Status
 
-from . import downloader, internal_player
-from .config import config
-from .episode_extra_info import convert_with_extra_info
+from . import downloader, internal_player, server, watch
+from .event_log import print_summary
+from .config import load_config
+from .episode_extra_info import EpisodeWithExtraInfo, JikanClient
+from .extraction import ExtractionCache
+from .pipeline import download_pipeline
+from .play_menu import EpisodesManager
+from .player_store import PlayerStore
+from .prefetch import Prefetcher, likely_seasons, run_in_daemon_thread
+from .site import get_mirrors, open_site
+from .streaming_proxy import StreamingProxy
 from .utils import safe_input, select_one, select_range
 
-from ..top_level import AnimeSama
+from ..catalogue import Catalogue
+from ..episode import Episode
+from ..profiling import profile
+from ..season import Season
 
 console = get_console()
 console._highlight = False
-logging.basicConfig(format="%(message)s", datefmt="[%X]", handlers=[RichHandler()])
+
+PREFETCHED_CATALOGUES = 3
+player_store = PlayerStore()
+
+
+def setup_logging() -> None:
+    if load_config().headless:
+        # Logs go to stderr so they don't mix with the JSON lines progress
+        logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    else:
+        logging.basicConfig(
+            format="%(message)s", datefmt="[%X]", handlers=[RichHandler()]
+        )
 
 
 def spinner(text: str) -> Status:
@@ -25,27 +52,75 @@ async def async_main() -> None:
     query = safe_input("Anime name: \033[0;34m", str)
 
     with spinner(f"Searching for [blue]{query}"):
-        catalogues = await AnimeSama(config.url).search(query)
-    catalogue = select_one(catalogues)
+        anime_sama = await open_site()
+        catalogues = await anime_sama.search(
+            query, load_config().search_deadline or None
+        )
+    if not catalogues.complete:
+        console.print(
+            f"[yellow]{len(catalogues.missing)} result pages were too slow, "
+            "some animes may be missing"
+        )
+
+    # While the user is choosing, the next step of the likeliest choices is fetched
+    prefetcher = Prefetcher()
+    try:
+        for catalogue in catalogues[:PREFETCHED_CATALOGUES]:
+            prefetcher.prefetch(catalogue.url, catalogue.seasons)
+        catalogue = await run_in_daemon_thread(select_one, catalogues)
+
+        with spinner(f"Getting season list for [blue]{catalogue.name}"):
+            seasons = await prefetcher.get(catalogue.url, catalogue.seasons)
+
+        for season in likely_seasons(seasons):
+            prefetcher.prefetch(season.url, partial(player_store.episodes, season))
+        season = await run_in_daemon_thread(select_one, seasons)
 
-    with spinner(f"Getting season list for [blue]{catalogue.name}"):
-        seasons = await catalogue.seasons()
-    season = select_one(seasons)
+        with spinner(f"Getting episode list for [blue]{season.name}"):
+            episodes = await prefetcher.get(
+                season.url, partial(player_store.episodes, season)
+            )
+    finally:
+        prefetcher.cancel()
+
+    await choose_and_run(season, episodes, catalogue)
+
+
+async def open_season(season_url: str) -> None:
+    """Play or download from a season URL, without any request if it is known."""
+    anime_sama = await open_site()
+    season_url = get_mirrors().rewrite(
+        season_url if season_url.endswith("/") else season_url + "/"
+    )
+    season = Season(season_url, client=anime_sama.client)
 
     with spinner(f"Getting episode list for [blue]{season.name}"):
-        episodes = await season.episodes()
+        episodes = await player_store.episodes(season)
+    if episodes:
+        season.serie_name, season.name = episodes[0].serie_name, episodes[0].season_name
+
+    catalogue = Catalogue(
+        season.url.rstrip("/").rsplit("/", 1)[0],
+        season.serie_name,
+        client=anime_sama.client,
+    )
+    await choose_and_run(season, episodes, catalogue)
+
 
+async def choose_and_run(
+    season: Season, episodes: list[Episode], catalogue: Catalogue
+) -> None:
+    config = load_config()
     console.print(f"\n[cyan bold underline]{season.serie_name} - {season.name}")
+    console.print(f"[bright_black]{season.url}")
     selected_episodes = select_range(
         episodes, msg="Choose episode(s)", print_choices=True
     )
 
     if config.download:
-        downloader.multi_download(
-            [
-                convert_with_extra_info(episode, catalogue)
-                for episode in selected_episodes
-            ],
+        await download_pipeline(
+            selected_episodes,
+            catalogue,
             config.download_path,
             config.episode_path,
             config.concurrent_downloads,
@@ -56,16 +131,139 @@ async def async_main() -> None:
             config.format_sort,
         )
     else:
-        command = internal_player.play_episode(
-            selected_episodes[0], config.prefer_languages
-        )
+        await play(selected_episodes, catalogue)
+
+    # Stale links were used, keep the refreshed ones for next time
+    await player_store.wait_refreshes()
+
+
+async def play(episodes: list[Episode], serie: Catalogue | None = None) -> None:
+    """Play the episodes in order, resolving the next one while the current one plays."""
+    config = load_config()
+    extraction = ExtractionCache()
+    manager = EpisodesManager(episodes)
+    proxies: list[StreamingProxy] = []
+
+    release_date = None
+    if config.keep_played and serie is not None:
+        # The kept episodes get the same path as if they were downloaded
+        async with JikanClient() as jikan:
+            release_date = await jikan.release_date(serie)
+
+    while True:
+        with spinner(f"Opening [blue]{manager.current.long_name}"):
+            command: Popen[bytes] | None
+            played = None
+            if config.keep_played:
+                played = await run_in_daemon_thread(
+                    internal_player.play_and_keep,
+                    manager.current,
+                    config.prefer_languages,
+                    downloader.episode_full_path(
+                        EpisodeWithExtraInfo(manager.current, release_date),
+                        config.download_path,
+                        config.episode_path,
+                    ),
+                    extraction,
+                    config.players_config,
+                    config.concurrent_downloads.get("fragment", 1),
+                )
+
+            if played is not None:
+                command, proxy = played
+                proxies.append(proxy)
+            else:
+                command = await run_in_daemon_thread(
+                    internal_player.play_episode,
+                    manager.current,
+                    config.prefer_languages,
+                    None,
+                    extraction,
+                )
+
+        if manager.upcoming is not None:
+            extraction.prefetch_episode(
+                manager.upcoming, config.prefer_languages, config.players_config
+            )
         if command is not None:
-            command.wait()
+            await run_in_daemon_thread(command.wait)
+
+        try:
+            next(manager)
+        except StopIteration:
+            break
+
+    # The played episodes are kept even if they were not watched until the end
+    with spinner("Finishing the download of the played episodes"):
+        for proxy in proxies:
+            await run_in_daemon_thread(proxy.finish)
+
+
+def main(args: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="anime-sama", description="Search, download and play anime-sama videos"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="REPORT",
+        help="profile the run and write a report there, to attach to a bug report",
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser(
+        "watch", help="download the new episodes of the series in the watchlist"
+    )
+    serve = commands.add_parser(
+        "serve", help="serve search, seasons and episodes as a local JSON API"
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument(
+        "--ttl", type=float, default=300, help="seconds a response is cached"
+    )
+    open_command = commands.add_parser(
+        "open", help="choose episodes of a season already opened, without searching"
+    )
+    open_command.add_argument("season_url")
+    events = commands.add_parser(
+        "events", help="summarize the download event log by player host"
+    )
+    events.add_argument(
+        "path", nargs="?", help="the JSON lines log, event_log of the config by default"
+    )
+    arguments = parser.parse_args(args)
+
+    if not arguments.profile:
+        return run(arguments)
+
+    # Menus wait in the event loop too, that time is counted as network
+    with profile(
+        arguments.profile, label=f"anime-sama {arguments.command or 'search'}"
+    ):
+        exit_code = run(arguments)
+    console.print(f"[bright_black]Profile written to {arguments.profile}")
+    return exit_code
+
 
+def run(arguments: argparse.Namespace) -> int:
+    if arguments.command != "events":
+        setup_logging()
 
-def main() -> int:
     try:
-        asyncio.run(async_main())
+        match arguments.command:
+            case "watch":
+                asyncio.run(watch.watch())
+            case "open":
+                asyncio.run(open_season(arguments.season_url))
+            case "events":
+                path = arguments.path or load_config().event_log
+                if path is None:
+                    console.print("[red]No event log, set event_log in the config")
+                    return 1
+                print_summary(Path(path), console)
+            case "serve":
+                server.serve(arguments.host, arguments.port, arguments.ttl)
+            case _:
+                asyncio.run(async_main())
     except (KeyboardInterrupt, asyncio.exceptions.CancelledError, EOFError):
         console.print("\n[red]Exiting...")
 
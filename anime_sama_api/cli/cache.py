@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from threading import RLock
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+def cache_dir() -> Path:
+    if os.name == "nt":
+        return Path("~/AppData/Local/anime-sama_api/cache").expanduser()
+    return Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / (
+        "anime-sama_cli"
+    )
+
+
+class JsonStore:
+    """
+    Small persistent key-value store saved as a JSON file.
+    Entries older than `ttl` seconds are considered missing.
+    """
+
+    def __init__(self, path: Path, ttl: float | None = None) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._entries: dict[str, dict[str, Any]] | None = None
+        self._lock = RLock()
+        self._batch_depth = 0
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as exception:
+                logger.warning("Ignoring unreadable cache %s: %s", self.path, exception)
+                self._entries = {}
+        return self._entries
+
+    def get_with_age(self, key: str) -> tuple[Any, float] | None:
+        """Return the value and its age in seconds, even if it has expired."""
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None:
+            return None
+        return entry["value"], time.time() - entry["time"]
+
+    def get(self, key: str) -> Any | None:
+        value_and_age = self.get_with_age(key)
+        if value_and_age is None:
+            return None
+
+        value, age = value_and_age
+        if self.ttl is not None and age > self.ttl:
+            return None
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._load()[key] = {"time": time.time(), "value": value}
+            if not self._batch_depth:
+                self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_name(self.path.name + ".tmp")
+            temporary.write_text(
+                json.dumps(self._load(), ensure_ascii=False), encoding="utf-8"
+            )
+            temporary.replace(self.path)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Save once at the end instead of after each change."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.save()
@@ -0,0 +1,93 @@
+import logging
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from threading import Lock
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _HostState:
+    failures: deque[float] = field(default_factory=deque)
+    opened_at: float | None = None
+    probe_started_at: float | None = None
+
+
+class CircuitBreaker:
+    """
+    Skip a host after `threshold` failures within `window` seconds.
+    Once `cooldown` seconds have passed, a single download is let through to probe
+    the host: a success closes the circuit, a failure opens it for another cooldown.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 5,
+        window: float = 60,
+        cooldown: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+
+        self._hosts: dict[str, _HostState] = {}
+        self._lock = Lock()
+
+    def allow(self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.opened_at is None:
+                return True
+
+            now = self.clock()
+            if now - state.opened_at < self.cooldown:
+                return False
+
+            # A probe that never reported back should not block the host forever
+            if (
+                state.probe_started_at is not None
+                and now - state.probe_started_at < self.cooldown
+            ):
+                return False
+
+            state.probe_started_at = now
+            logger.info("Probing %s", host)
+            return True
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is not None and state.opened_at is not None
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.setdefault(host, _HostState())
+            now = self.clock()
+
+            if state.opened_at is not None:
+                state.opened_at, state.probe_started_at = now, None
+                return
+
+            state.failures.append(now)
+            while state.failures and now - state.failures[0] > self.window:
+                state.failures.popleft()
+
+            if len(state.failures) >= self.threshold:
+                state.opened_at = now
+                state.failures.clear()
+                logger.warning(
+                    "%s failed %s times, skipping it for %ss",
+                    host,
+                    self.threshold,
+                    self.cooldown,
+                )
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            if self._hosts.pop(host, None) is not None:
+                logger.debug("%s is working again", host)
@@ -2,9 +2,11 @@
 
 import logging
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cache
 import os
 import sys
+from typing import Any
 
 from ..langs import Lang, lang2ids
 
@@ -21,6 +23,8 @@ logger = logging.getLogger(__name__)
 class PlayersConfig:
     prefers: list[str]
     bans: list[str]
+    # Hosts serving a single file, downloaded with several connections without yt-dlp
+    direct: list[str] = field(default_factory=list)
 
 
 @dataclass(frozen=True)
@@ -30,80 +34,108 @@ class Config:
     episode_path: str
     download: bool
     show_players: bool
+    headless: bool
+    refresh_per_second: float
     max_retry_time: int
     format: str
     format_sort: str
     internal_player_command: list[str]
+    keep_played: bool
+    event_log: Path | None
+    search_deadline: float
+    hedge_requests: bool
     url: str
+    mirrors: list[str]
     players_config: PlayersConfig
     concurrent_downloads: dict[str, int]
+    circuit_breaker: dict[str, float]
+    watch: dict[str, Any]
 
 
-# Load default config
 exemple_config = Path(__file__).parent / "config.toml"
-if not exemple_config.exists():
-    raise FileNotFoundError(
-        "There is an issues with the installation of the package.\nThe exemple config cannot be found."
-    )
-with open(exemple_config, "rb") as file:
-    default_config = tomllib.load(file)
-
-
-# Load user config
-possible_path_str = ["."]
-possible_path_str.append(
-    "~/AppData/Local/anime-sama_api" if os.name == "nt" else "~/.config/anime-sama_cli"
-)
-possible_path = [Path(path).expanduser() for path in possible_path_str]
-del possible_path_str
-
-user_config = {}
-for path in possible_path:
-    config_file = path / "config.toml"
-    if config_file.is_file():
-        with open(config_file, "rb") as config_file_reader:
-            user_config = tomllib.load(config_file_reader)
-            break
-else:
+config_dirs = [
+    Path("."),
+    Path(
+        "~/AppData/Local/anime-sama_api"
+        if os.name == "nt"
+        else "~/.config/anime-sama_cli"
+    ).expanduser(),
+]
+
+
+def load_default_config() -> dict[str, Any]:
+    if not exemple_config.exists():
+        raise FileNotFoundError(
+            "There is an issues with the installation of the package.\nThe exemple config cannot be found."
+        )
+    with open(exemple_config, "rb") as file:
+        return tomllib.load(file)
+
+
+def load_user_config() -> dict[str, Any]:
+    for path in config_dirs:
+        config_file = path / "config.toml"
+        if config_file.is_file():
+            with open(config_file, "rb") as config_file_reader:
+                return tomllib.load(config_file_reader)
+
     from shutil import copy
 
-    possible_path[1].mkdir(parents=True, exist_ok=True)
-    copy(exemple_config, possible_path[1])
-    logger.info("Default config created at %s", possible_path[1])
-del possible_path
+    config_dirs[1].mkdir(parents=True, exist_ok=True)
+    copy(exemple_config, config_dirs[1])
+    logger.info("Default config created at %s", config_dirs[1])
+    return {}
+
+
+@cache
+def load_config() -> Config:
+    default_config = load_default_config()
 
-# Update the default values by values set by the user
-config_dict = default_config | user_config
+    # Update the default values by values set by the user
+    config_dict = default_config | load_user_config()
 
-# Check if value respect the type
-for index, lang in enumerate(config_dict["prefer_languages"]):
-    # Backward compatibility
-    if lang == "VO":
-        config_dict["prefer_languages"][index] = "VOSTFR"
-        lang = "VOSTFR"
+    # Check if value respect the type
+    for index, lang in enumerate(config_dict["prefer_languages"]):
+        # Backward compatibility
+        if lang == "VO":
+            config_dict["prefer_languages"][index] = "VOSTFR"
+            lang = "VOSTFR"
 
-    assert lang in lang2ids, (
-        f"{lang} is not a valid languages for prefer_languages\nOnly the following are acceptable: {list(lang2ids.keys())}"
+        assert lang in lang2ids, (
+            f"{lang} is not a valid languages for prefer_languages\nOnly the following are acceptable: {list(lang2ids.keys())}"
+        )
+
+    # Convert type
+    config_dict["download_path"] = (
+        Path(config_dict["download_path"])
+        if config_dict.get("download_path") is not None
+        else ""
+    )
+    config_dict["event_log"] = (
+        Path(config_dict["event_log"]).expanduser()
+        if config_dict.get("event_log")
+        else None
+    )
+    config_dict["internal_player_command"] = (
+        config_dict["internal_player_command"].split()
+        if config_dict.get("internal_player_command") is not None
+        else ""
     )
+    config_dict["players_config"] = (
+        PlayersConfig(
+            **(default_config["players_hostname"] | config_dict["players_hostname"])
+        )
+        if config_dict.get("players_hostname") is not None
+        else PlayersConfig([], [])
+    )
+    del config_dict["players_hostname"]
+    if config_dict.get("players"):  # Backward compatibility
+        del config_dict["players"]
+    return Config(**config_dict)
+
 
-# Convert type
-config_dict["download_path"] = (
-    Path(config_dict["download_path"])
-    if config_dict.get("download_path") is not None
-    else ""
-)
-config_dict["internal_player_command"] = (
-    config_dict["internal_player_command"].split()
-    if config_dict.get("internal_player_command") is not None
-    else ""
-)
-config_dict["players_config"] = (
-    PlayersConfig(**config_dict["players_hostname"])
-    if config_dict.get("players_hostname") is not None
-    else PlayersConfig([], [])
-)
-del config_dict["players_hostname"]
-if config_dict.get("players"):  # Backward compatibility
-    del config_dict["players"]
-config = Config(**config_dict)
-del config_dict
+def __getattr__(name: str) -> Any:
+    # The config is read on first use instead of when the module is imported
+    if name == "config":
+        return load_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
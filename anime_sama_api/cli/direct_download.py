@@ -0,0 +1,318 @@
+import glob
+import json
+import logging
+import re
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Condition, Event, Lock
+from typing import Any
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SIZE = 4 * 1024 * 1024
+
+
+class DirectDownloadError(Exception):
+    pass
+
+
+def remove_partial_files(full_path: Path) -> None:
+    """Remove the unfinished direct downloads of `full_path`, whatever their extension."""
+    for suffix in (".rpart", ".rpart.json"):
+        for file in full_path.parent.glob(f"{glob.escape(full_path.name)}.*{suffix}"):
+            file.unlink(missing_ok=True)
+
+
+class RangedDownload:
+    """
+    Download a single file over several connections.
+    The file is split into fixed size segments written into a preallocated file.
+    Finished segments are saved next to it so an interrupted download resumes.
+
+    The file can be read while it is downloaded: `wait` blocks until some bytes are
+    available at an offset and `prioritize` moves the download to where a reader is.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        destination: Path,
+        headers: dict[str, str] | None = None,
+        connections: int = 4,
+        segment_size: int = SEGMENT_SIZE,
+        progress_hook: Callable[[dict[str, Any]], None] | None = None,
+        client: httpx.Client | None = None,
+    ) -> None:
+        self.url = url
+        self.destination = destination
+        # Not ".part" to not be mistaken with a sequential yt-dlp partial file
+        self.part_path = destination.with_name(destination.name + ".rpart")
+        self.state_path = destination.with_name(destination.name + ".rpart.json")
+        self.headers = headers or {}
+        self.connections = max(connections, 1)
+        self.segment_size = segment_size
+        self.progress_hook = progress_hook
+
+        self._own_client = client is None
+        self.client = client or httpx.Client(
+            follow_redirects=True,
+            timeout=httpx.Timeout(30),
+            limits=httpx.Limits(max_connections=self.connections),
+        )
+
+        self.size = 0
+        self.downloaded = 0
+        self._done: set[int] = set()
+        self._pending: deque[int] = deque()
+        self._lock = Lock()
+        self._stop = Event()
+
+        self._changed = Condition(self._lock)
+        self._ready = Event()
+        self._ranged = False
+        self._finished = False
+        self._error: BaseException | None = None
+
+    @property
+    def number_of_segments(self) -> int:
+        return -(-self.size // self.segment_size)
+
+    def segment_range(self, index: int) -> tuple[int, int]:
+        start = index * self.segment_size
+        return start, min(start + self.segment_size, self.size) - 1
+
+    def run(self) -> Path:
+        try:
+            size = self._probe_size()
+            self.destination.parent.mkdir(parents=True, exist_ok=True)
+
+            if size is None:
+                self._ready.set()
+                self._download_whole()
+            else:
+                self.size = size
+                self._prepare()
+                self._ranged = True
+                self._ready.set()
+                self._download_segments()
+
+            self.part_path.replace(self.destination)
+            self.state_path.unlink(missing_ok=True)
+            self._report("finished")
+        except BaseException as exception:
+            with self._changed:
+                self._error = exception
+                self._changed.notify_all()
+            raise
+        finally:
+            self._ready.set()
+            if self._own_client:
+                self.client.close()
+
+        with self._changed:
+            self._finished = True
+            self._changed.notify_all()
+        return self.destination
+
+    def wait_ready(self, timeout: float | None = None) -> int | None:
+        """
+        Wait until the size of the file is known and return it,
+        None if it cannot be known or if the file cannot be read out of order.
+        """
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"{self.url} didn't answer")
+        if self._error is not None:
+            raise DirectDownloadError(f"The download failed: {self._error}")
+        if self._ranged:
+            return self.size
+        return None
+
+    def _available(self, offset: int) -> int:
+        if self._ranged:
+            if offset >= self.size:
+                return 0
+            index = offset // self.segment_size
+            if index not in self._done:
+                return -1
+            return self.segment_range(index)[1] - offset + 1
+
+        if offset < self.downloaded:
+            return self.downloaded - offset
+        return 0 if self._finished else -1
+
+    def wait(self, offset: int, timeout: float | None = None) -> int:
+        """
+        Wait until bytes are available at `offset` and return how many can be read
+        from there, 0 at the end of the file.
+        """
+        with self._changed:
+            while (available := self._available(offset)) == -1:
+                if self._error is not None:
+                    raise DirectDownloadError(f"The download failed: {self._error}")
+                if not self._changed.wait(timeout):
+                    raise TimeoutError(f"Nothing downloaded at {offset} in {timeout}s")
+            return available
+
+    def read(self, offset: int, size: int) -> bytes:
+        # The part file is renamed once the download is finished
+        for path in (self.part_path, self.destination):
+            try:
+                with open(path, "rb") as file:
+                    file.seek(offset)
+                    return file.read(size)
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(self.destination)
+
+    def prioritize(self, offset: int) -> None:
+        """Download the segments from `offset` first, like a player that seeked."""
+        first = offset // self.segment_size
+        with self._lock:
+            pending = sorted(self._pending)
+            self._pending = deque(
+                [index for index in pending if index >= first]
+                + [index for index in pending if index < first]
+            )
+
+    def _probe_size(self) -> int | None:
+        """Return the size of the file or None if the server doesn't accept ranges."""
+        with self.client.stream(
+            "GET", self.url, headers=self.headers | {"Range": "bytes=0-0"}
+        ) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                return None
+
+            match_size = re.search(r"/(\d+)", response.headers.get("Content-Range", ""))
+            if match_size is None:
+                return None
+            return int(match_size.group(1))
+
+    def _prepare(self) -> None:
+        if self.state_path.is_file() and self.part_path.is_file():
+            state = json.loads(self.state_path.read_text())
+            if (
+                state.get("size") == self.size
+                and state.get("segment_size") == self.segment_size
+            ):
+                self._done = set(state.get("done", []))
+                logger.debug(
+                    "Resuming %s (%s/%s segments)",
+                    self.destination.name,
+                    len(self._done),
+                    self.number_of_segments,
+                )
+
+        if not self._done:
+            with open(self.part_path, "wb") as file:
+                file.truncate(self.size)
+            self._save_state()
+
+        self._pending = deque(
+            index for index in range(self.number_of_segments) if index not in self._done
+        )
+        self.downloaded = sum(
+            end - start + 1 for start, end in map(self.segment_range, self._done)
+        )
+
+    def _save_state(self) -> None:
+        state = {
+            "url": self.url,
+            "size": self.size,
+            "segment_size": self.segment_size,
+            "done": sorted(self._done),
+        }
+        self.state_path.write_text(json.dumps(state))
+
+    def _next_segment(self) -> int | None:
+        with self._lock:
+            if self._stop.is_set() or not self._pending:
+                return None
+            return self._pending.popleft()
+
+    def _segment_done(self, index: int) -> None:
+        with self._changed:
+            self._done.add(index)
+            self._save_state()
+            self._changed.notify_all()
+
+    def _add_progress(self, size: int) -> None:
+        with self._lock:
+            self.downloaded += size
+        self._report("downloading")
+
+    def _report(self, status: str) -> None:
+        if self.progress_hook is not None:
+            self.progress_hook(
+                {
+                    "status": status,
+                    "downloaded_bytes": self.downloaded,
+                    "total_bytes": self.size or None,
+                    "filename": str(self.destination),
+                }
+            )
+
+    def _download_segments(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.connections) as executor:
+            workers = [
+                executor.submit(self._worker)
+                for _ in range(min(self.connections, len(self._pending)))
+            ]
+            try:
+                for worker in workers:
+                    worker.result()
+            except BaseException:
+                self._stop.set()
+                raise
+
+    def _worker(self) -> None:
+        with open(self.part_path, "r+b") as file:
+            while (index := self._next_segment()) is not None:
+                start, end = self.segment_range(index)
+                written = 0
+
+                with self.client.stream(
+                    "GET",
+                    self.url,
+                    headers=self.headers | {"Range": f"bytes={start}-{end}"},
+                ) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise DirectDownloadError(
+                            f"The server stopped accepting ranges for {self.url}"
+                        )
+
+                    file.seek(start)
+                    for chunk in response.iter_bytes():
+                        if self._stop.is_set():
+                            return
+                        file.write(chunk)
+                        written += len(chunk)
+                        self._add_progress(len(chunk))
+
+                if written != end - start + 1:
+                    raise DirectDownloadError(
+                        f"Incomplete segment {index} for {self.url} ({written}/{end - start + 1} bytes)"
+                    )
+                # The segment can be read as soon as it is done
+                file.flush()
+                self._segment_done(index)
+
+    def _download_whole(self) -> None:
+        with self.client.stream("GET", self.url, headers=self.headers) as response:
+            response.raise_for_status()
+            self.size = int(response.headers.get("Content-Length", 0))
+
+            with open(self.part_path, "wb") as file:
+                for chunk in response.iter_bytes():
+                    file.write(chunk)
+                    # Flushed to be readable
+                    file.flush()
+                    self._add_progress(len(chunk))
+                    with self._changed:
+                        self._changed.notify_all()
@@ -1,8 +1,14 @@
+import glob
+import os
 import random
 import time
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cache, partial
+from itertools import chain
 from pathlib import Path
+from threading import Lock
 from typing import cast
 from urllib.parse import urlparse
 
@@ -10,59 +16,165 @@ import httpx
 from yt_dlp import YoutubeDL
 from yt_dlp.utils import DownloadError
 from rich import get_console
-from rich.live import Live
-from rich.console import Group
-from rich.table import Column
-from rich.progress import (
-    BarColumn,
-    Progress,
-    TextColumn,
-    TimeRemainingColumn,
-    TransferSpeedColumn,
-    MofNCompleteColumn,
-    TaskID,
-    TotalFileSizeColumn,
-    ProgressColumn,
-)
+from rich.progress import TaskID
 
 from .episode_extra_info import EpisodeWithExtraInfo
-from .error_handeling import YDL_log_filter, reaction_to
+from .error_handeling import YDL_log_filter, classify
+from .circuit_breaker import CircuitBreaker
+from .direct_download import (
+    DirectDownloadError,
+    RangedDownload,
+    remove_partial_files,
+)
+from .event_log import EventLog
 from ..langs import Lang
-from .config import PlayersConfig, config
+from .config import PlayersConfig, load_config
+from .progress import JsonLinesProgress, RichProgress, Throttle
 
 
 logger = logging.getLogger(__name__)
 logger.addFilter(YDL_log_filter)
 
 console = get_console()
-download_progress_list: list[str | ProgressColumn] = [
-    "[bold blue]{task.fields[episode_name]}",
-    BarColumn(bar_width=None),
-    "[progress.percentage]{task.percentage:>3.1f}%",  # TODO: should disappear if the console is not wide enough
-    TransferSpeedColumn(),
-    TotalFileSizeColumn(),
-    TimeRemainingColumn(compact=True, elapsed_when_finished=True),
-]
-if config.show_players:
-    download_progress_list.insert(
-        1,
-        TextColumn(
-            "[green]{task.fields[site]}",
-            table_column=Column(max_width=12),
-            justify="right",
-        ),
+
+
+# Built from the config on first use, not when the module is imported
+@cache
+def get_progress() -> RichProgress | JsonLinesProgress:
+    config = load_config()
+    if config.headless:
+        return JsonLinesProgress()
+    return RichProgress(console, config.show_players, config.refresh_per_second)
+
+
+@cache
+def get_circuit_breaker() -> CircuitBreaker:
+    """Shared by all the downloads so an outage is only discovered once."""
+    settings = load_config().circuit_breaker
+    return CircuitBreaker(
+        threshold=int(settings.get("failures", 5)),
+        window=settings.get("window", 60),
+        cooldown=settings.get("cooldown", 300),
     )
 
-download_progress = Progress(*download_progress_list, console=console)
 
-total_progress = Progress(
-    TextColumn("[bold cyan]{task.description}"),
-    BarColumn(bar_width=None),
-    MofNCompleteColumn(),
-    TimeRemainingColumn(elapsed_when_finished=True),
-    console=console,
-)
-progress = Group(total_progress, download_progress)
+@cache
+def get_events() -> EventLog:
+    return EventLog(load_config().event_log)
+
+
+def episode_full_path(
+    episode: EpisodeWithExtraInfo, path: Path, episode_path: str = "{episode}"
+) -> Path:
+    """Where the episode is saved, without the extension."""
+    return (
+        path
+        / episode_path.format(
+            serie=episode.warpped.serie_name,
+            season=episode.warpped.season_name,
+            episode=episode.warpped.name,
+            release_year_parentheses=episode.release_year_parentheses(),
+        )
+    ).expanduser()
+
+
+def download_direct(
+    ydl: YoutubeDL,
+    player: str,
+    full_path: Path,
+    connections: int,
+    hook: Callable[[dict], None],
+) -> bool:
+    """
+    Download the video with several connections if the player resolves to a single file.
+    Return False if yt-dlp should handle the player instead (HLS, DASH, failures...).
+    """
+    info = ydl.extract_info(player, download=False)
+    if (
+        info is None
+        or info.get("protocol") not in ("http", "https")
+        or info.get("requested_formats")
+    ):
+        return False
+
+    try:
+        RangedDownload(
+            info["url"],
+            Path(f"{full_path}.{info.get('ext', 'mp4')}"),
+            headers=info.get("http_headers"),
+            connections=connections,
+            progress_hook=hook,
+        ).run()
+    except httpx.TransportError as exception:
+        # Let the usual retry handle it, the next try resumes where it stopped
+        raise DownloadError(str(exception)) from exception
+    except (httpx.HTTPStatusError, DirectDownloadError) as exception:
+        logger.warning(f"Direct download failed, falling back to yt-dlp: {exception}")
+        return False
+
+    return True
+
+
+def downloaded_file(full_path: Path) -> Path | None:
+    """The video saved at `full_path`, whatever extension the player gave it."""
+    files = [
+        file
+        for file in full_path.parent.glob(glob.escape(full_path.name) + ".*")
+        if file.name == full_path.name + file.suffix
+        and file.suffix not in (".part", ".ytdl", ".temp")
+    ]
+    return max(files, key=lambda file: file.stat().st_mtime, default=None)
+
+
+def link_output(source: Path, destination: Path) -> str:
+    """
+    Make `destination` the same file as `source` without copying it: a hardlink, or
+    a symlink where hardlinks are not possible. Return the kind of link, "" if none.
+    """
+    if destination.exists():
+        return "existing"
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, destination)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        destination.symlink_to(source.resolve())
+        return "symlink"
+    except OSError as exception:
+        logger.warning("Cannot link %s to %s: %s", destination, source, exception)
+        return ""
+
+
+class SharedDownloads:
+    """
+    The downloads of each video, by the player tried first. An episode whose video
+    is already downloaded, or being downloaded, by another job waits for it and is
+    linked to its file instead of downloading it again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._downloads: dict[str, Future[Path | None]] = {}
+
+    def claim(self, player: str) -> tuple[bool, "Future[Path | None]"]:
+        """Whether the job is the first of its video, and the download to share."""
+        with self._lock:
+            shared = self._downloads.get(player)
+            if shared is not None:
+                if not shared.done():
+                    return False, shared
+                # Failed downloads and deleted files are downloaded again
+                file = shared.result()
+                if file is not None and file.is_file():
+                    return False, shared
+
+            shared = self._downloads[player] = Future()
+            return True, shared
+
+
+shared_downloads = SharedDownloads()
 
 
 def download(
@@ -75,33 +187,118 @@ def download(
     max_retry_time: int = 1024,
     format: str = "",
     format_sort: str = "",
-) -> None:
+) -> bool:
+    """Download an episode, return whether its video is now on the disk."""
+    name = episode.warpped.name
     if not any(episode.warpped.languages.values()):
         logger.error("No player available")
-        return
+        get_events().emit(name, "outcome", status="no_player", host=None, seconds=0)
+        return False
+
+    progress = get_progress()
+    # Shown right away, even while waiting for the same video in another job
+    me = progress.add_episode(name)
+    full_path = episode_full_path(episode, path, episode_path)
 
-    me = download_progress.add_task(
-        "download", episode_name=episode.warpped.name, site="", total=None
+    players: Iterator[str] = episode.warpped.consume_player(
+        prefer_languages, players_config.prefers, players_config.bans
+    )
+    first_player = next(players, None)
+    if first_player is not None:
+        players = chain([first_player], players)
+    download_players = partial(
+        _download,
+        name,
+        full_path,
+        me,
+        players,
+        players_config,
+        concurrent_fragment_downloads,
+        max_retry_time,
+        format,
+        format_sort,
     )
-    task = download_progress.tasks[me]
+    if first_player is None:
+        return download_players()
 
-    full_path = (
-        path
-        / episode_path.format(
-            serie=episode.warpped.serie_name,
-            season=episode.warpped.season_name,
-            episode=episode.warpped.name,
-            release_year_parentheses=episode.release_year_parentheses(),
-        )
-    ).expanduser()
+    owner, shared = shared_downloads.claim(first_player)
+    if owner:
+        try:
+            return download_players()
+        finally:
+            shared.set_result(downloaded_file(full_path))
+
+    source = shared.result()
+    if source is not None:
+        destination = Path(f"{full_path}{source.suffix}")
+        link = "same" if destination == source else link_output(source, destination)
+        if link:
+            get_events().emit(name, "linked", source=str(source), link=link)
+            progress.finish_episode(me)
+            return True
+
+    # The other job failed, this one may be luckier
+    return download_players()
+
+
+def _download(
+    name: str,
+    full_path: Path,
+    me: TaskID,
+    players: Iterator[str],
+    players_config: PlayersConfig,
+    concurrent_fragment_downloads: int,
+    max_retry_time: int,
+    format: str,
+    format_sort: str,
+) -> bool:
+    """Try the players in order until one of them downloads the episode."""
+    progress, events = get_progress(), get_events()
+    circuit_breaker = get_circuit_breaker()
+    throttle = Throttle(load_config().refresh_per_second)
+
+    started = time.monotonic()
+    host = ""
+    # Reset for each try of a player
+    attempt_start = started
+    transfer_start: float | None = None
+    transfer_lock = Lock()  # Direct downloads report from several threads
+    sucess = False
 
     def hook(data: dict) -> None:
-        if data.get("status") != "downloading":
+        nonlocal transfer_start
+        status = data.get("status")
+        with transfer_lock:
+            if transfer_start is None:
+                # The first progress report comes once the player is extracted
+                transfer_start = time.monotonic()
+                events.emit(
+                    name,
+                    "extraction",
+                    host=host,
+                    seconds=round(transfer_start - attempt_start, 3),
+                )
+        if status == "finished":
+            seconds = time.monotonic() - transfer_start
+            size = data.get("downloaded_bytes") or data.get("total_bytes") or 0
+            events.emit(
+                name,
+                "transfer",
+                host=host,
+                bytes=size,
+                seconds=round(seconds, 3),
+                rate=round(size / seconds) if seconds > 0 else None,
+            )
+
+        # yt-dlp calls this for every chunk, only forward a sample of them
+        if status != "finished" and not (status == "downloading" and throttle()):
             return
 
-        # Directly accessing .total is needed to not reset the speed
-        task.total = data.get("total_bytes") or data.get("total_bytes_estimate")
-        download_progress.update(me, completed=data.get("downloaded_bytes", 0))
+        progress.update_bytes(
+            me,
+            data.get("downloaded_bytes", 0),
+            data.get("total_bytes") or data.get("total_bytes_estimate"),
+        )
 
     option = {
         "outtmpl": f"{full_path}.%(ext)s",
@@ -112,35 +309,74 @@ def download(
         "format_sort": format_sort.split(","),
     }
 
-    for player in episode.warpped.consume_player(
-        prefer_languages, players_config.prefers, players_config.bans
-    ):
+    for player in players:
+        host = urlparse(player).hostname or ""
+        if not circuit_breaker.allow(host):
+            logger.debug("Skipping %s for %s", host, name)
+            events.emit(name, "skipped", host=host, reason="circuit_open")
+            continue
+
         retry_time = 1
         sucess = False
-        download_progress.update(me, site=urlparse(player).hostname)
+        progress.update_site(me, host)
+        events.emit(name, "player", host=host, player=player)
 
         while True:
+            attempt_start, transfer_start = time.monotonic(), None
+
             # Check if the video is not accessible through vidmoly
-            try:
-                if (
-                    player.startswith("https://vidmoly.")
-                    and "Please wait"  # Note "Please wait" appear in all the player page
-                    not in httpx.get(player, headers={"User-Agent": ""}).text
-                ):
+            if player.startswith("https://vidmoly."):
+                try:
+                    # Note "Please wait" appear in all the player page
+                    available = (
+                        "Please wait"
+                        in httpx.get(player, headers={"User-Agent": ""}).text
+                    )
+                except httpx.ConnectError:
+                    circuit_breaker.record_failure(host)
+                    available = None
+
+                events.emit(
+                    name,
+                    "probe",
+                    host=host,
+                    result={True: "ok", False: "unavailable", None: "unreachable"}[
+                        available
+                    ],
+                    seconds=round(time.monotonic() - attempt_start, 3),
+                )
+                if not available:
                     break
-            except httpx.ConnectError:
-                break
+                # The extraction time reported by the hook excludes the probe
+                attempt_start = time.monotonic()
 
             try:
                 with YoutubeDL(option) as ydl:  # type: ignore
-                    error_code = cast(int, ydl.download([player]))
+                    if host in players_config.direct and download_direct(
+                        ydl, player, full_path, concurrent_fragment_downloads, hook
+                    ):
+                        error_code = 0
+                    else:
+                        error_code = cast(int, ydl.download([player]))
+                        if not error_code:
+                            # Left by a direct download that fell back to yt-dlp
+                            remove_partial_files(full_path)
 
                     if not error_code:
                         sucess = True
+                        circuit_breaker.record_success(host)
                     else:
                         logger.fatal(
                             f"The download encountered an error code {error_code}. Please report this to the developer with URL: {player}",
                         )
+                        events.emit(
+                            name,
+                            "error",
+                            host=host,
+                            category="error_code",
+                            reaction="continue",
+                            reason=str(error_code),
+                        )
 
                     break
 
@@ -153,19 +389,45 @@ def download(
                 ):
                     exception.msg = "Waiting for vidmoly"
 
-                match reaction_to(exception.msg):
+                error = classify(exception.msg)
+                if error.host_failure:
+                    circuit_breaker.record_failure(host)
+
+                gives_up = error.reaction != "retry" or (
+                    retry_time >= max_retry_time or circuit_breaker.is_open(host)
+                )
+                if gives_up:
+                    events.emit(
+                        name,
+                        "error",
+                        host=host,
+                        category=error.category,
+                        reaction=error.reaction or "unhandled",
+                        reason=exception.msg,
+                    )
+
+                match error.reaction:
                     case "continue":
                         break
 
                     case "retry":
-                        if retry_time >= max_retry_time:
+                        if gives_up:
                             break
 
                         logger.warning(
-                            f"{episode.warpped.name} interrupted. Retrying in {retry_time}s."
+                            f"{name} interrupted. Retrying in {retry_time}s."
                         )
                         # random is used to spread the resume time and so mitigate deadlock when multiple downloads resume at the same time
-                        time.sleep(retry_time * random.uniform(0.8, 1.2))
+                        delay = retry_time * random.uniform(0.8, 1.2)
+                        events.emit(
+                            name,
+                            "retry",
+                            host=host,
+                            category=error.category,
+                            reason=exception.msg,
+                            delay=round(delay, 3),
+                        )
+                        time.sleep(delay)
                         retry_time *= 2
 
                     case "crash":
@@ -180,10 +442,17 @@ def download(
 
         if sucess:
             break
+        events.emit(name, "player_failed", host=host)
 
-    download_progress.update(me, visible=False)
-    if total_progress.tasks:
-        total_progress.update(TaskID(0), advance=1)
+    events.emit(
+        name,
+        "outcome",
+        status="success" if sucess else "failed",
+        host=host or None,
+        seconds=round(time.monotonic() - started, 3),
+    )
+    progress.finish_episode(me)
+    return sucess
 
 
 def multi_download(
@@ -200,8 +469,9 @@ def multi_download(
     """
     Not sure if you can use this function multiple times
     """
-    total_progress.add_task("Downloaded", total=len(episodes))
-    with Live(progress, console=console):
+    progress = get_progress()
+    progress.start_batch(len(episodes))
+    with progress.live():
         with ThreadPoolExecutor(
             max_workers=concurrent_downloads.get("video", 1)
         ) as executor:
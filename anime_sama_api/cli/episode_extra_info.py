@@ -1,16 +1,22 @@
-# Refactor is not a bad idea
-
+import asyncio
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from functools import lru_cache
 from typing import Any
 
 import httpx
+from httpx import AsyncClient
 
 from ..episode import Episode
 from ..catalogue import Catalogue
+from .cache import JsonStore, cache_dir
 from .utils import normalize
 
+JIKAN_SEARCH_URL = "https://api.jikan.moe/v4/anime"
+# A serie doesn't change its release date, the TTL is mostly there to retry failed matches
+CACHE_TTL = 30 * 24 * 60 * 60
+
 
 @dataclass(frozen=True)
 class EpisodeWithExtraInfo:
@@ -23,13 +29,6 @@ class EpisodeWithExtraInfo:
         return f" ({self.release_date.year})"
 
 
-def convert_with_extra_info(
-    episode: Episode, serie: Catalogue | None = None
-) -> EpisodeWithExtraInfo:
-    release_date = get_serie_release_date(serie) if serie is not None else None
-    return EpisodeWithExtraInfo(warpped=episode, release_date=release_date)
-
-
 en2fr_genre = {
     "Comedy": "Comédie",
     "Gourmet": "Gastronomie",
@@ -45,61 +44,148 @@ en2fr_genre = {
 }
 
 
-def get_serie_release_date(serie: Catalogue) -> datetime | None:
-    try:
-        anime = _get_mal_listing(serie)
-        if anime is None:
+def _is_matching(name: str, serie: Catalogue, anime: dict[str, Any]) -> bool:
+    """`name` has to be normalized."""
+    titles = {normalize(title.get("title", "")) for title in anime.get("titles", [])}
+    anime_genres = [genre.get("name") for genre in anime.get("genres", [])]
+
+    if name in titles:
+        # Also guess work but eliminate edge case like fate
+        if len(anime_genres) != 0 or len(serie.genres) == 0:
+            return True
+
+    if not any(name in title or title in name for title in titles):
+        return False
+    if len(anime_genres) == 0:
+        return len(serie.genres) == 0
+
+    # Because this condition is not a guarantee, we do an additionnal screenning base on corresponding genres
+    not_corresponding_genres = [
+        genre
+        for genre in anime_genres
+        if genre not in serie.genres and en2fr_genre.get(genre) not in serie.genres
+    ]
+    # Very scientific formula. I'm joking it just guess work
+    return len(not_corresponding_genres) / len(anime_genres) < 0.35
+
+
+class JikanClient:
+    """
+    Find the MyAnimeList entry of catalogues using Jikan.
+    Matches are kept on disk per catalogue URL so only new series hit the API.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient | None = None,
+        store: JsonStore | None = None,
+        concurrency: int = 3,
+    ) -> None:
+        self._own_client = client is None
+        self.client = client or AsyncClient()
+        self.store = store or JsonStore(cache_dir() / "jikan.json", ttl=CACHE_TTL)
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending: dict[str, asyncio.Task[dict[str, Any] | None]] = {}
+
+    async def __aenter__(self) -> "JikanClient":
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        if self._own_client:
+            await self.client.aclose()
+
+    async def _search(self, name: str) -> list[dict[str, Any]]:
+        async with self._semaphore:
+            for attempt in range(10):
+                response = await self.client.get(
+                    JIKAN_SEARCH_URL, params={"q": name, "limit": 5}
+                )
+                if response.status_code != 429:
+                    break
+                await asyncio.sleep(0.5 * (attempt + 1))
+
+        response.raise_for_status()
+        return response.json().get("data", [])
+
+    async def _find_listing(self, serie: Catalogue) -> dict[str, Any] | None:
+        listing = None
+        for name in [serie.name] + list(serie.alternative_names):
+            normalized_name = normalize(name)
+            for anime in await self._search(name):
+                if _is_matching(normalized_name, serie, anime):
+                    listing = {
+                        "mal_id": anime.get("mal_id"),
+                        "title": anime.get("title"),
+                        "aired_from": anime.get("aired", {}).get("from"),
+                    }
+                    break
+            if listing is not None:
+                break
+
+        self.store.set(serie.url, {"listing": listing})
+        return listing
+
+    async def listing(self, serie: Catalogue) -> dict[str, Any] | None:
+        if not serie.is_anime:
             return None
 
-        iso_date = anime.get("aired", {}).get("from")
-        if iso_date is None:
+        cached = self.store.get(serie.url)
+        if cached is not None:
+            return cached["listing"]
+
+        # Concurrent calls for the same serie share the same request
+        if serie.url not in self._pending:
+            self._pending[serie.url] = asyncio.ensure_future(self._find_listing(serie))
+        try:
+            return await self._pending[serie.url]
+        finally:
+            self._pending.pop(serie.url, None)
+
+    async def release_date(self, serie: Catalogue) -> datetime | None:
+        try:
+            listing = await self.listing(serie)
+        except httpx.HTTPError:
             return None
 
-        return datetime.fromisoformat(iso_date)
-    except httpx.HTTPStatusError:
-        return None
+        if listing is None or listing.get("aired_from") is None:
+            return None
+        return datetime.fromisoformat(listing["aired_from"])
 
+    async def release_dates(
+        self, series: Iterable[Catalogue]
+    ) -> dict[Catalogue, datetime | None]:
+        unique_series = list(dict.fromkeys(series))
+        with self.store.batch():
+            release_dates = await asyncio.gather(
+                *(self.release_date(serie) for serie in unique_series)
+            )
+        return dict(zip(unique_series, release_dates))
 
-@lru_cache(maxsize=128)
-def _get_mal_listing(serie: Catalogue) -> None | Any:
-    if not serie.is_anime:
-        return None
+    async def convert(
+        self, episode: Episode, serie: Catalogue | None = None
+    ) -> EpisodeWithExtraInfo:
+        release_date = await self.release_date(serie) if serie is not None else None
+        return EpisodeWithExtraInfo(warpped=episode, release_date=release_date)
 
-    for name in [serie.name] + list(serie.alternative_names):
-        i = 0
-        while True:
-            response = httpx.get(f"https://api.jikan.moe/v4/anime?q={name}&limit=5")
-            i += 1
-            if response.status_code != 429 or i > 9:
-                break
 
-        response.raise_for_status()
-        animes = response.json().get("data", [])
-
-        for anime in animes:
-            for title in anime.get("titles"):
-                name = normalize(name)
-                title = normalize(title.get("title"))
-                anime_genres = [genre.get("name") for genre in anime.get("genres")]
-                if name == title:
-                    # Also guess work but eliminate edge case like fate
-                    if len(anime_genres) == 0 and len(serie.genres) != 0:
-                        continue
-
-                    return anime
-                if name in title or title in name:
-                    # Because this condition is not a guarantee, we do an additionnal screenning base on corresponding genres
-                    not_corresponding_genres = [
-                        genre
-                        for genre in anime_genres
-                        if genre not in serie.genres
-                        and en2fr_genre.get(genre) not in serie.genres
-                    ]
-
-                    # Very scientific formula. I'm joking it just guess work
-                    if len(not_corresponding_genres) / len(anime_genres) < 0.35 and (
-                        len(anime_genres) != 0 or len(serie.genres) == 0
-                    ):
-                        return anime
-
-    return None
+def get_serie_release_date(serie: Catalogue) -> datetime | None:
+    async def release_date() -> datetime | None:
+        async with JikanClient() as jikan:
+            return await jikan.release_date(serie)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(release_date())
+
+    # asyncio.run cannot be nested, async code should use JikanClient.convert
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, release_date()).result()
+
+
+def convert_with_extra_info(
+    episode: Episode, serie: Catalogue | None = None
+) -> EpisodeWithExtraInfo:
+    release_date = get_serie_release_date(serie) if serie is not None else None
+    return EpisodeWithExtraInfo(warpped=episode, release_date=release_date)
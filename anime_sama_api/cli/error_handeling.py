@@ -1,46 +1,113 @@
 from collections.abc import Sequence
+from dataclasses import dataclass
 from logging import LogRecord
+import re
 from typing import Literal
 
 Reaction = Literal["continue", "retry", "crash", ""]
+ErrorCategory = Literal[
+    "connection_refused",
+    "connection_closed",
+    "not_found",
+    "unsupported",
+    "dns",
+    "server_error",
+    "range_error",
+    "timeout",
+    "waiting",
+    "connection_reset",
+    "broken_pipe",
+    "network_unreachable",
+    "missing_file",
+    "no_message",
+    "unknown",
+]
 
-how_to_react: dict[Reaction, Sequence[str]] = {
-    "continue": (
-        "[Errno 61] Connection refused",
-        "Remote end closed connection without response",
-        "HTTPError 404: Not Found",
-        "Unsupported URL",
-        "[Errno 7] No address associated with hostname",
-        "[Errno 11002] getaddrinfo failed",
+
+@dataclass(frozen=True)
+class ErrorClass:
+    category: ErrorCategory
+    reaction: Reaction
+    # True if the error tells that the player host is down, not only this video
+    host_failure: bool = False
+
+
+# Order matters: when a message contains several of them, the first one wins
+error_classes: dict[str, ErrorClass] = {
+    "[Errno 61] Connection refused": ErrorClass("connection_refused", "continue", True),
+    "Remote end closed connection without response": ErrorClass(
+        "connection_closed", "continue", True
+    ),
+    "HTTPError 404: Not Found": ErrorClass("not_found", "continue"),
+    "Unsupported URL": ErrorClass("unsupported", "continue"),
+    "[Errno 7] No address associated with hostname": ErrorClass(
+        "dns", "continue", True
     ),
-    "retry": (
-        "Unable to download webpage: HTTP Error 522",
-        "unable to download video data: HTTP Error 416",
-        "HTTPError 500: Internal Server Error",
-        "The read operation timed out",
-        "Waiting for vidmoly",  # Custom error msg to tell the downloader to retry
-        "TransportError('timed out')",
-        "[Errno 54] Connection reset by peer",
-        "[Errno 104] Connection reset by peer",
-        "HTTPError 503: Service Temporarily Unavailable",
-        "[Errno 32] Broken pipe",
-        "[Errno 101] Network is unreachable",
-        "[Errno 51] Network is unreachable",
-        "[Errno 2] No such file or directory",
+    "[Errno 11002] getaddrinfo failed": ErrorClass("dns", "continue", True),
+    "Unable to download webpage: HTTP Error 522": ErrorClass(
+        "server_error", "retry", True
     ),
-    "crash": (),
+    "unable to download video data: HTTP Error 416": ErrorClass("range_error", "retry"),
+    "HTTPError 500: Internal Server Error": ErrorClass("server_error", "retry", True),
+    "The read operation timed out": ErrorClass("timeout", "retry", True),
+    "Waiting for vidmoly": ErrorClass(  # Custom error msg to tell the downloader to retry
+        "waiting", "retry"
+    ),
+    "TransportError('timed out')": ErrorClass("timeout", "retry", True),
+    "[Errno 54] Connection reset by peer": ErrorClass(
+        "connection_reset", "retry", True
+    ),
+    "[Errno 104] Connection reset by peer": ErrorClass(
+        "connection_reset", "retry", True
+    ),
+    "HTTPError 503: Service Temporarily Unavailable": ErrorClass(
+        "server_error", "retry", True
+    ),
+    "[Errno 32] Broken pipe": ErrorClass("broken_pipe", "retry"),
+    "[Errno 101] Network is unreachable": ErrorClass("network_unreachable", "retry"),
+    "[Errno 51] Network is unreachable": ErrorClass("network_unreachable", "retry"),
+    "[Errno 2] No such file or directory": ErrorClass("missing_file", "retry"),
+}
+NO_MESSAGE = ErrorClass("no_message", "continue")
+UNKNOWN = ErrorClass("unknown", "")
+
+how_to_react: dict[Reaction, Sequence[str]] = {
+    reaction: tuple(
+        msg for msg, error in error_classes.items() if error.reaction == reaction
+    )
+    for reaction in ("continue", "retry", "crash")
 }
 
+# All the known messages in one pattern so an error is scanned only once
+_error_matcher = re.compile("|".join(map(re.escape, error_classes)))
+_error_priority = {msg: index for index, msg in enumerate(error_classes)}
 
-def reaction_to(msg: str | None) -> Reaction:
+_ignored_warnings = re.compile(
+    "|".join(
+        map(
+            re.escape,
+            (
+                "Falling back on generic information extractor",
+                "Live HLS streams are not supported by the native downloader.",
+            ),
+        )
+    )
+)
+
+
+def classify(msg: str | None) -> ErrorClass:
     if msg is None:
-        return "continue"
+        return NO_MESSAGE
 
-    for reaction, error_msgs in how_to_react.items():
-        for error_msg in error_msgs:
-            if error_msg in msg:
-                return reaction
-    return ""
+    matches = [match.group(0) for match in _error_matcher.finditer(msg)]
+    if not matches:
+        return UNKNOWN
+
+    return error_classes[min(matches, key=_error_priority.__getitem__)]
+
+
+def reaction_to(msg: str | None) -> Reaction:
+    return classify(msg).reaction
 
 
 def is_error_handle(msg: str) -> bool:
@@ -53,15 +120,7 @@ def YDL_log_filter(record: LogRecord) -> bool:
 
     match record.levelname:
         case "WARNING":
-            if any(
-                msg in record.msg
-                for msg in (
-                    "Falling back on generic information extractor",
-                    "Live HLS streams are not supported by the native downloader.",
-                )
-            ):
-                return False
-            return True
+            return _ignored_warnings.search(record.msg) is None
         case "ERROR":
             return not is_error_handle(record.msg)
         case _:
@@ -0,0 +1,166 @@
+import json
+import logging
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from rich.console import Console
+from rich.table import Table
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """
+    What happens to each episode during its download, one JSON object per line:
+    the player chosen, the probe of the player page, the extraction time, the
+    transfer, each retry with its reason and the outcome. Nothing is written
+    without a `path`.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._lock = Lock()
+
+    def emit(self, episode: str, event: str, **fields: Any) -> None:
+        if self.path is None:
+            return
+
+        line = json.dumps(
+            {"time": round(time.time(), 3), "episode": episode, "event": event}
+            | fields,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+
+def read_events(path: Path) -> Iterator[dict[str, Any]]:
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of a log written while killed can be cut
+                logger.debug("Skipping an invalid line of %s", path)
+
+
+@dataclass
+class HostSummary:
+    players: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
+    bytes: int = 0
+    transfer_seconds: float = 0.0
+    extraction_seconds: list[float] = field(default_factory=list)
+    # Error category: count
+    errors: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second while transferring."""
+        return self.bytes / self.transfer_seconds if self.transfer_seconds else 0.0
+
+    @property
+    def extraction(self) -> float:
+        """Mean extraction time in seconds."""
+        if not self.extraction_seconds:
+            return 0.0
+        return sum(self.extraction_seconds) / len(self.extraction_seconds)
+
+
+def summarize(events: Iterable[dict[str, Any]]) -> dict[str, HostSummary]:
+    """Aggregate the events of a log by player host."""
+    hosts: dict[str, HostSummary] = {}
+    for event in events:
+        host = event.get("host")
+        if not host:
+            continue
+        summary = hosts.setdefault(host, HostSummary())
+
+        match event["event"]:
+            case "player":
+                summary.players += 1
+            case "extraction":
+                summary.extraction_seconds.append(event["seconds"])
+            case "transfer":
+                summary.bytes += event["bytes"]
+                summary.transfer_seconds += event["seconds"]
+            case "retry":
+                summary.retries += 1
+                summary.errors[event["category"]] = (
+                    summary.errors.get(event["category"], 0) + 1
+                )
+            case "error":
+                summary.errors[event["category"]] = (
+                    summary.errors.get(event["category"], 0) + 1
+                )
+            case "outcome" if event["status"] == "success":
+                summary.successes += 1
+            case "player_failed":
+                summary.failures += 1
+    return hosts
+
+
+def _size(size: float) -> str:
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1000:
+            return f"{size:.1f} {unit}"
+        size /= 1000
+    return f"{size:.1f} TB"
+
+
+def print_summary(path: Path, console: Console) -> None:
+    if not path.is_file():
+        console.print(f"[red]{path} does not exist")
+        return
+
+    hosts = summarize(read_events(path))
+    if not hosts:
+        console.print(f"[yellow]No download recorded in {path}")
+        return
+
+    throughput = Table(title="Players")
+    for column in ("Host", "Tried", "Succeeded", "Failed", "Retries"):
+        throughput.add_column(column, justify="right" if column != "Host" else "left")
+    for column in ("Downloaded", "Throughput", "Extraction"):
+        throughput.add_column(column, justify="right")
+
+    for host, summary in sorted(hosts.items(), key=lambda item: -item[1].bytes):
+        throughput.add_row(
+            host,
+            str(summary.players),
+            str(summary.successes),
+            str(summary.failures),
+            str(summary.retries),
+            _size(summary.bytes),
+            f"{_size(summary.throughput)}/s",
+            f"{summary.extraction:.1f}s",
+        )
+    console.print(throughput)
+
+    categories = sorted(
+        {category for summary in hosts.values() for category in summary.errors}
+    )
+    if not categories:
+        return
+
+    failures = Table(title="Errors")
+    failures.add_column("Host")
+    for category in categories:
+        failures.add_column(category, justify="right")
+    for host, summary in sorted(hosts.items()):
+        if summary.errors:
+            failures.add_row(
+                host,
+                *(str(summary.errors.get(category, "")) for category in categories),
+            )
+    console.print(failures)
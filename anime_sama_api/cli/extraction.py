@@ -0,0 +1,121 @@
+import logging
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from threading import Lock, Thread
+from typing import Any
+
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadError
+
+from ..episode import Episode
+from ..langs import Lang
+from .config import PlayersConfig
+from .error_handeling import YDL_log_filter
+
+
+logger = logging.getLogger(__name__)
+logger.addFilter(YDL_log_filter)
+
+
+@dataclass(frozen=True)
+class Stream:
+    url: str
+    headers: dict[str, str] = field(default_factory=dict)
+    ext: str = "mp4"
+    protocol: str = "https"
+
+
+class ExtractionCache:
+    """
+    Direct streams of players resolved with yt-dlp. Extraction is the slow part of
+    starting a video, so a result is shared by concurrent callers and kept for `ttl`
+    seconds (stream URLs expire after a while). A player that cannot be resolved
+    is only remembered for `failure_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 10 * 60,
+        options: dict[str, Any] | None = None,
+        failure_ttl: float = 30,
+    ):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        # A single file because a player can only be given one URL
+        self.options = {"format": "best", "logger": logger} | (options or {})
+
+        self._lock = Lock()
+        self._streams: dict[str, tuple[float, Future[Stream | None]]] = {}
+
+    def _extract(self, player: str) -> Stream | None:
+        try:
+            with YoutubeDL(self.options) as ydl:  # type: ignore
+                info = ydl.extract_info(player, download=False)
+        except DownloadError as exception:
+            logger.debug("Cannot resolve %s: %s", player, exception.msg)
+            return None
+
+        if info is None or "url" not in info:
+            return None
+        return Stream(
+            info["url"],
+            dict(info.get("http_headers") or {}),
+            info.get("ext", "mp4"),
+            info.get("protocol", "https"),
+        )
+
+    def _is_expired(self, cached: tuple[float, Future[Stream | None]]) -> bool:
+        created, future = cached
+        failed = (
+            future.done() and future.exception() is None and future.result() is None
+        )
+        ttl = self.failure_ttl if failed else self.ttl
+        return time.monotonic() - created > ttl
+
+    def resolve(self, player: str) -> Stream | None:
+        with self._lock:
+            cached = self._streams.get(player)
+            is_owner = cached is None or self._is_expired(cached)
+            if cached is None or is_owner:
+                cached = time.monotonic(), Future()
+                self._streams[player] = cached
+
+        future = cached[1]
+        if is_owner:
+            try:
+                future.set_result(self._extract(player))
+            except BaseException as exception:
+                future.set_exception(exception)
+                with self._lock:
+                    if self._streams.get(player) is cached:
+                        del self._streams[player]
+        return future.result()
+
+    def resolve_episode(
+        self,
+        episode: Episode,
+        prefer_languages: list[Lang],
+        players_config: PlayersConfig,
+    ) -> tuple[str, Stream] | None:
+        """Return the first player of the episode that resolves, with its stream."""
+        for player in episode.consume_player(
+            prefer_languages, players_config.prefers, players_config.bans
+        ):
+            stream = self.resolve(player)
+            if stream is not None:
+                return player, stream
+        return None
+
+    def prefetch_episode(
+        self,
+        episode: Episode,
+        prefer_languages: list[Lang],
+        players_config: PlayersConfig,
+    ) -> None:
+        """Resolve the episode in the background so it is ready when needed."""
+        Thread(
+            target=self.resolve_episode,
+            args=(episode, prefer_languages, players_config),
+            daemon=True,
+        ).start()
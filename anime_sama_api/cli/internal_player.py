@@ -6,7 +6,10 @@ from pathlib import Path
 from rich import print
 
 from ..langs import Lang
-from .config import config
+from .config import PlayersConfig, load_config
+from .direct_download import RangedDownload
+from .extraction import ExtractionCache, Stream
+from .streaming_proxy import StreamingProxy
 from ..episode import Episode
 
 
@@ -24,17 +27,52 @@ def open_silent_process(command: list[str]) -> subprocess.Popen[bytes]:
         sys.exit(404)
 
 
+def is_mpv(command: list[str]) -> bool:
+    return Path(command[0]).stem == "mpv"
+
+
+def mpv_stream_args(stream: Stream, title: str = "") -> list[str]:
+    """mpv options to play a stream with the HTTP headers it was resolved with."""
+    headers = dict(stream.headers)
+    args = [f"--force-media-title={title}"] if title else []
+
+    # Dedicated options because the values of a header list are split on commas
+    if "User-Agent" in headers:
+        args.append(f"--user-agent={headers.pop('User-Agent')}")
+    if "Referer" in headers:
+        args.append(f"--referrer={headers.pop('Referer')}")
+    args += [
+        f"--http-header-fields-append={name}: {value}"
+        for name, value in headers.items()
+    ]
+    return args
+
+
 def play_episode(
     episode: Episode,
     prefer_languages: list[Lang],
     args: list[str] | None = None,
+    extraction: ExtractionCache | None = None,
+    players_config: PlayersConfig | None = None,
 ) -> subprocess.Popen[bytes] | None:
     best = episode.best(prefer_languages)
     if best is None:
         print("[red]No player available")
         return None
 
-    player_command = config.internal_player_command + [best]
+    config = load_config()
+    target, stream_args = best, []
+    # mpv starts faster with the stream than with the player page it has to extract
+    if extraction is not None and is_mpv(config.internal_player_command):
+        resolved = extraction.resolve_episode(
+            episode, prefer_languages, players_config or config.players_config
+        )
+        if resolved is not None:
+            _, stream = resolved
+            target = stream.url
+            stream_args = mpv_stream_args(stream, episode.short_name)
+
+    player_command = config.internal_player_command + stream_args + [target]
     if args is not None:
         player_command += args
 
@@ -48,8 +86,43 @@ def play_episode(
     # self._start_dc_presence(entry)
 
 
+def play_and_keep(
+    episode: Episode,
+    prefer_languages: list[Lang],
+    destination: Path,
+    extraction: ExtractionCache,
+    players_config: PlayersConfig | None = None,
+    connections: int = 1,
+) -> tuple[subprocess.Popen[bytes], StreamingProxy] | None:
+    """
+    Play the episode through a local proxy that saves it at `destination` (without
+    extension). Return None if no player serves a plain video file.
+    """
+    config = load_config()
+    resolved = extraction.resolve_episode(
+        episode, prefer_languages, players_config or config.players_config
+    )
+    if resolved is None or resolved[1].protocol not in ("http", "https"):
+        return None
+
+    _, stream = resolved
+    proxy = StreamingProxy(
+        RangedDownload(
+            stream.url,
+            Path(f"{destination}.{stream.ext}"),
+            headers=stream.headers,
+            connections=connections,
+        )
+    ).start()
+
+    player_command = config.internal_player_command + [proxy.url]
+    if is_mpv(config.internal_player_command):
+        player_command.insert(-1, f"--force-media-title={episode.short_name}")
+    return open_silent_process(player_command), proxy
+
+
 def play_file(path: Path, args: list[str] | None = None) -> subprocess.Popen[bytes]:
-    player_command = config.internal_player_command + [str(path)]
+    player_command = load_config().internal_player_command + [str(path)]
     if args is not None:
         player_command += args
 
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from ..catalogue import Catalogue
+from ..episode import Episode
+from ..langs import Lang
+from . import downloader
+from .config import PlayersConfig
+from .episode_extra_info import EpisodeWithExtraInfo, JikanClient
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _aiter(
+    episodes: Iterable[Episode] | AsyncIterable[Episode],
+) -> AsyncIterator[Episode]:
+    if isinstance(episodes, AsyncIterable):
+        async for episode in episodes:
+            yield episode
+    else:
+        for episode in episodes:
+            yield episode
+
+
+async def download_pipeline(
+    episodes: Iterable[Episode] | AsyncIterable[Episode],
+    serie: Catalogue | None,
+    path: Path,
+    episode_path: str = "{episode}",
+    concurrent_downloads: dict[str, int] | None = None,
+    prefer_languages: list[Lang] = ["VOSTFR"],
+    players_config: PlayersConfig = PlayersConfig([], []),
+    max_retry_time: int = 1024,
+    format: str = "",
+    format_sort: str = "",
+    queue_size: int = 8,
+) -> list[Episode]:
+    """
+    Resolve, enrich then download episodes as a stream: each stage is connected to the
+    next one by a bounded queue so the first download starts as soon as its episode is
+    ready instead of waiting for the whole batch. Return the episodes downloaded.
+    """
+    if concurrent_downloads is None:
+        concurrent_downloads = {}
+    workers = concurrent_downloads.get("video", 1)
+    to_enrich: asyncio.Queue[Episode | None] = asyncio.Queue(queue_size)
+    to_download: asyncio.Queue[EpisodeWithExtraInfo | None] = asyncio.Queue(queue_size)
+    downloaded: list[Episode] = []
+
+    async def resolve() -> None:
+        async for episode in _aiter(episodes):
+            downloader.get_progress().extend_batch(1)
+            await to_enrich.put(episode)
+        await to_enrich.put(None)
+
+    async def enrich(jikan: JikanClient) -> None:
+        while (episode := await to_enrich.get()) is not None:
+            await to_download.put(await jikan.convert(episode, serie))
+        for _ in range(workers):
+            await to_download.put(None)
+
+    async def download(executor: ThreadPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        while (episode := await to_download.get()) is not None:
+            try:
+                success = await loop.run_in_executor(
+                    executor,
+                    partial(
+                        downloader.download,
+                        episode,
+                        path,
+                        episode_path,
+                        prefer_languages,
+                        players_config,
+                        concurrent_downloads.get("fragment", 1),
+                        max_retry_time,
+                        format,
+                        format_sort,
+                    ),
+                )
+            except Exception:
+                logger.exception("Failed to download %s", episode.warpped.name)
+                continue
+            if success:
+                downloaded.append(episode.warpped)
+
+    # Not a with statement, its exit would block the event loop until the running
+    # downloads end even when the pipeline failed or was cancelled
+    executor = ThreadPoolExecutor(workers)
+    async with JikanClient() as jikan:
+        with downloader.get_progress().live():
+            stages = [
+                asyncio.ensure_future(stage)
+                for stage in (
+                    resolve(),
+                    enrich(jikan),
+                    *(download(executor) for _ in range(workers)),
+                )
+            ]
+            try:
+                done, _ = await asyncio.wait(
+                    stages, return_when=asyncio.FIRST_EXCEPTION
+                )
+                for stage in done:
+                    stage.result()
+            finally:
+                # A failed stage would leave the others waiting on their queue
+                for stage in stages:
+                    stage.cancel()
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    return downloaded
@@ -24,6 +24,12 @@ class EpisodesManager:
     def current(self) -> Episode:
         return self.episodes[self.current_index]
 
+    @property
+    def upcoming(self) -> Episode | None:
+        if self.current_index < len(self.episodes) - 1:
+            return self.episodes[self.current_index + 1]
+        return None
+
 
 class PlayMenu:
     def print_menu(self) -> None:
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Any, cast
+from urllib.parse import urlsplit
+
+from ..episode import Episode, Languages, Players
+from ..langs import LangId
+from ..season import Season, SeasonLangPage
+from .cache import JsonStore, cache_dir
+
+
+logger = logging.getLogger(__name__)
+
+# After that, stored links are still used but checked in the background
+STALE_AFTER = 6 * 60 * 60
+
+
+def episode_to_json(episode: Episode) -> dict[str, Any]:
+    return {
+        "name": episode._name,
+        "index": episode.index,
+        "languages": {
+            lang_id: list(players) for lang_id, players in episode.languages.items()
+        },
+    }
+
+
+def episode_from_json(
+    data: dict[str, Any], serie_name: str, season_name: str
+) -> Episode:
+    languages: dict[LangId, Players] = {}
+    for lang_id, links in data["languages"].items():
+        # Players() reorders the links it is created with, they are already in order
+        players = Players()
+        players.extend(links)
+        languages[cast(LangId, lang_id)] = players
+
+    return Episode(
+        Languages(languages),  # type: ignore
+        serie_name,
+        season_name,
+        data["name"],
+        data["index"],
+    )
+
+
+def store_key(season_url: str) -> str:
+    # Without the domain, so the links stay known when anime-sama changes mirror
+    return urlsplit(season_url).path
+
+
+class PlayerStore:
+    """
+    Player links of the seasons already resolved, kept on disk by season URL with
+    the filever of each language, so known episodes can be played or downloaded
+    without scraping. Stale seasons are served as is and refreshed in the
+    background; the episodes are only fetched again if a filever changed.
+    """
+
+    def __init__(self, store: JsonStore | None = None) -> None:
+        self.store = store or JsonStore(cache_dir() / "players.json", ttl=STALE_AFTER)
+        self._refreshes: dict[str, asyncio.Task[None]] = {}
+
+    def get(self, season_url: str) -> list[Episode] | None:
+        """Return the stored episodes of a season, even if they are stale."""
+        value_and_age = self.store.get_with_age(store_key(season_url))
+        if value_and_age is None:
+            return None
+
+        entry, _ = value_and_age
+        return [
+            episode_from_json(episode, entry["serie_name"], entry["season_name"])
+            for episode in entry["episodes"]
+        ]
+
+    def save(
+        self, season: Season, pages: list[SeasonLangPage], episodes: list[Episode]
+    ) -> None:
+        self.store.set(
+            store_key(season.url),
+            {
+                "serie_name": season.serie_name,
+                "season_name": season.name,
+                "filevers": {page.lang_id: page.filever for page in pages},
+                "episodes": [episode_to_json(episode) for episode in episodes],
+            },
+        )
+
+    async def fetch(self, season: Season) -> list[Episode]:
+        pages = await season.get_all_pages()
+        episodes = season.episodes_from(pages)
+        self.save(season, pages, episodes)
+        return episodes
+
+    async def refresh(self, season: Season) -> None:
+        value_and_age = self.store.get_with_age(store_key(season.url))
+        if value_and_age is not None:
+            entry, _ = value_and_age
+            if await season.filevers() == entry["filevers"]:
+                self.store.set(store_key(season.url), entry)  # Fresh again
+                return
+
+        await self.fetch(season)
+
+    def refresh_in_background(self, season: Season) -> None:
+        if season.url in self._refreshes:
+            return
+
+        async def refresh() -> None:
+            try:
+                await self.refresh(season)
+            except Exception as exception:
+                logger.debug("Cannot refresh the players of %s: %s", season, exception)
+            finally:
+                del self._refreshes[season.url]
+
+        self._refreshes[season.url] = asyncio.ensure_future(refresh())
+
+    async def episodes(self, season: Season) -> list[Episode]:
+        """Return the episodes of a season, from the store if they are known."""
+        episodes = self.get(season.url)
+        if episodes is None:
+            return await self.fetch(season)
+
+        if self.store.get(store_key(season.url)) is None:  # Stale
+            self.refresh_in_background(season)
+        return episodes
+
+    async def wait_refreshes(self) -> None:
+        await asyncio.gather(*self._refreshes.values())
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from threading import Thread
+from typing import Any, ParamSpec, TypeVar
+
+from ..season import Season
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+P = ParamSpec("P")
+
+
+class Prefetcher:
+    """
+    Fetch what the user will likely choose while a menu is on screen.
+    Prefetches run at most `concurrency` at a time and the ones that were not
+    chosen are cancelled as soon as a choice is made.
+    """
+
+    def __init__(self, concurrency: int = 3) -> None:
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: dict[Hashable, asyncio.Task[Any]] = {}
+
+    def prefetch(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> None:
+        if key in self._tasks:
+            return
+
+        async def run() -> T:
+            async with self._semaphore:
+                return await factory()
+
+        self._tasks[key] = asyncio.ensure_future(run())
+
+    async def get(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """Return the prefetched result of `key`, or compute it if there is none."""
+        task = self._tasks.pop(key, None)
+        # The other prefetches are not useful anymore and would delay this one
+        self.cancel()
+
+        if task is not None:
+            try:
+                return await task
+            except Exception as exception:
+                logger.debug("Prefetch of %s failed: %s", key, exception)
+        return await factory()
+
+    def cancel(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+
+def likely_seasons(seasons: list[Season], how_many: int = 2) -> list[Season]:
+    """People usually start a serie or continue its latest season."""
+    likely = {season.url: season for season in seasons[-1:] + seasons[:1]}
+    return list(likely.values())[:how_many]
+
+
+async def run_in_daemon_thread(
+    function: Callable[P, T], *args: P.args, **kwargs: P.kwargs
+) -> T:
+    """
+    Run a blocking function, like a menu waiting for the user, without blocking the
+    event loop. Unlike `asyncio.to_thread`, exiting doesn't wait for the function.
+    """
+    loop = asyncio.get_running_loop()
+    future: asyncio.Future[T] = loop.create_future()
+
+    def set_result(result: T) -> None:
+        if not future.done():
+            future.set_result(result)
+
+    def set_exception(exception: BaseException) -> None:
+        if not future.done():
+            future.set_exception(exception)
+
+    def resolve(callback: Callable[[Any], None], value: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(callback, value)
+        except RuntimeError:  # The loop is already closed
+            pass
+
+    def run() -> None:
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as exception:
+            # Even a SystemExit, like the one of a menu without choices, is raised
+            # in the caller instead of leaving it waiting forever
+            resolve(set_exception, exception)
+        else:
+            resolve(set_result, result)
+
+    Thread(target=run, daemon=True).start()
+    return await future
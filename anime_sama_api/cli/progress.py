@@ -0,0 +1,196 @@
+import json
+import sys
+import time
+from threading import Lock
+from typing import IO, Any
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.progress import (
+    BarColumn,
+    MofNCompleteColumn,
+    Progress,
+    ProgressColumn,
+    TaskID,
+    TextColumn,
+    TimeRemainingColumn,
+    TotalFileSizeColumn,
+    TransferSpeedColumn,
+)
+from rich.table import Column
+
+
+class Throttle:
+    """Tell if enough time has passed since the last accepted call."""
+
+    def __init__(self, refresh_per_second: float) -> None:
+        self.interval = 1 / refresh_per_second if refresh_per_second > 0 else 0.0
+        self._last = float("-inf")
+
+    def __call__(self) -> bool:
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return False
+        self._last = now
+        return True
+
+
+class RichProgress:
+    def __init__(
+        self,
+        console: Console,
+        show_players: bool = False,
+        refresh_per_second: float = 4,
+    ) -> None:
+        self.console = console
+        self.refresh_per_second = refresh_per_second
+
+        download_progress_list: list[str | ProgressColumn] = [
+            "[bold blue]{task.fields[episode_name]}",
+            BarColumn(bar_width=None),
+            "[progress.percentage]{task.percentage:>3.1f}%",  # TODO: should disappear if the console is not wide enough
+            TransferSpeedColumn(),
+            TotalFileSizeColumn(),
+            TimeRemainingColumn(compact=True, elapsed_when_finished=True),
+        ]
+        if show_players:
+            download_progress_list.insert(
+                1,
+                TextColumn(
+                    "[green]{task.fields[site]}",
+                    table_column=Column(max_width=12),
+                    justify="right",
+                ),
+            )
+
+        self.download_progress = Progress(*download_progress_list, console=console)
+        self.total_progress = Progress(
+            TextColumn("[bold cyan]{task.description}"),
+            BarColumn(bar_width=None),
+            MofNCompleteColumn(),
+            TimeRemainingColumn(elapsed_when_finished=True),
+            console=console,
+        )
+
+    def live(self) -> Live:
+        return Live(
+            Group(self.total_progress, self.download_progress),
+            console=self.console,
+            refresh_per_second=self.refresh_per_second,
+        )
+
+    def start_batch(self, total: int) -> None:
+        self.total_progress.add_task("Downloaded", total=total)
+
+    def extend_batch(self, count: int) -> None:
+        if not self.total_progress.tasks:
+            self.start_batch(count)
+            return
+        task = self.total_progress.tasks[0]
+        self.total_progress.update(TaskID(0), total=(task.total or 0) + count)
+
+    def add_episode(self, episode_name: str) -> TaskID:
+        return self.download_progress.add_task(
+            "download", episode_name=episode_name, site="", total=None
+        )
+
+    def update_site(self, task_id: TaskID, site: str | None) -> None:
+        self.download_progress.update(task_id, site=site)
+
+    def update_bytes(self, task_id: TaskID, downloaded: int, total: int | None) -> None:
+        # Directly accessing .total is needed to not reset the speed
+        self.download_progress.tasks[task_id].total = total
+        self.download_progress.update(task_id, completed=downloaded)
+
+    def finish_episode(self, task_id: TaskID) -> None:
+        self.download_progress.update(task_id, visible=False)
+        if self.total_progress.tasks:
+            self.total_progress.update(TaskID(0), advance=1)
+
+
+class JsonLinesProgress:
+    """
+    Headless progress reporting: one compact JSON object per line instead of a
+    terminal rendering, meant to be consumed by a log collector.
+    """
+
+    def __init__(self, output: IO[str] | None = None) -> None:
+        self.output = output or sys.stdout
+        self._lock = Lock()
+        self._next_id = 0
+        self._episodes: dict[int, dict[str, Any]] = {}
+        self._batch_total = 0
+        self._batch_done = 0
+
+    def _emit(self, **event: Any) -> None:
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def live(self) -> "JsonLinesProgress":
+        return self
+
+    def __enter__(self) -> "JsonLinesProgress":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        pass
+
+    def start_batch(self, total: int) -> None:
+        self._batch_total, self._batch_done = total, 0
+        self._emit(event="batch", completed=0, total=total)
+
+    def extend_batch(self, count: int) -> None:
+        with self._lock:
+            self._batch_total += count
+
+    def add_episode(self, episode_name: str) -> TaskID:
+        with self._lock:
+            task_id = self._next_id
+            self._next_id += 1
+        self._episodes[task_id] = {
+            "episode": episode_name,
+            "site": None,
+            "time": time.monotonic(),
+            "downloaded": 0,
+        }
+        self._emit(event="start", id=task_id, episode=episode_name)
+        return TaskID(task_id)
+
+    def update_site(self, task_id: TaskID, site: str | None) -> None:
+        episode = self._episodes[task_id]
+        episode["site"] = site
+        self._emit(event="site", id=task_id, episode=episode["episode"], site=site)
+
+    def update_bytes(self, task_id: TaskID, downloaded: int, total: int | None) -> None:
+        episode = self._episodes[task_id]
+        now = time.monotonic()
+        elapsed = now - episode["time"]
+        speed = (downloaded - episode["downloaded"]) / elapsed if elapsed > 0 else 0
+        episode["time"], episode["downloaded"] = now, downloaded
+
+        self._emit(
+            event="progress",
+            id=task_id,
+            episode=episode["episode"],
+            site=episode["site"],
+            downloaded=downloaded,
+            total=total,
+            speed=round(max(speed, 0)),
+        )
+
+    def finish_episode(self, task_id: TaskID) -> None:
+        episode = self._episodes.pop(task_id)
+        self._emit(
+            event="end",
+            id=task_id,
+            episode=episode["episode"],
+            downloaded=episode["downloaded"],
+        )
+        if self._batch_total:
+            with self._lock:
+                self._batch_done += 1
+            self._emit(
+                event="batch", completed=self._batch_done, total=self._batch_total
+            )
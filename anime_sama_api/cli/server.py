@@ -0,0 +1,318 @@
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+from ..catalogue import Catalogue
+from ..episode import Episode
+from ..metrics import Metrics
+from ..season import Season
+from ..top_level import AnimeSama, EpisodeRelease
+from .site import open_site
+
+
+logger = logging.getLogger(__name__)
+
+Params = dict[str, str]
+
+
+class MissingParameter(Exception):
+    pass
+
+
+def catalogue_to_json(catalogue: Catalogue) -> dict[str, Any]:
+    return {
+        "url": catalogue.url,
+        "name": catalogue.name,
+        "alternative_names": list(catalogue.alternative_names),
+        "genres": list(catalogue.genres),
+        "categories": sorted(catalogue.categories),
+        "languages": sorted(catalogue.languages),
+        "image_url": catalogue.image_url,
+    }
+
+
+def season_to_json(season: Season) -> dict[str, Any]:
+    return {"url": season.url, "name": season.name, "serie_name": season.serie_name}
+
+
+def episode_to_json(episode: Episode) -> dict[str, Any]:
+    return {
+        "name": episode.name,
+        "index": episode.index,
+        "serie_name": episode.serie_name,
+        "season_name": episode.season_name,
+        "languages": {
+            lang_id: list(players) for lang_id, players in episode.languages.items()
+        },
+    }
+
+
+def release_to_json(release: EpisodeRelease) -> dict[str, Any]:
+    return {
+        "serie_name": release.serie_name,
+        "descriptive": release.descriptive,
+        "language": release.language,
+        "categories": list(release.categories),
+        "page_url": release.page_url,
+        "season_url": release.season_url,
+        "catalogue_url": release.catalogue_url,
+        "image_url": release.image_url,
+    }
+
+
+class Api:
+    """
+    The JSON endpoints. Every consumer shares the same AnimeSama, so the same
+    connection pool and library caches, and identical requests made within `ttl`
+    seconds share a single response. Catalogue pages are kept for `ttl` seconds too.
+    With `metrics`, the requests to anime-sama are measured and served on /metrics.
+    """
+
+    def __init__(
+        self, anime_sama: AnimeSama, ttl: float = 300, metrics: Metrics | None = None
+    ) -> None:
+        self.anime_sama = anime_sama
+        self.ttl = ttl
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.instrument(anime_sama.client)
+
+        self._responses: dict[str, tuple[float, asyncio.Task[Any]]] = {}
+        # Catalogues seen in search results keep their metadata and their page
+        self._catalogues: dict[str, tuple[float, Catalogue]] = {}
+        self._pruned_at = time.monotonic()
+
+        self.routes: dict[str, Callable[[Params], Awaitable[Any]]] = {
+            "/search": self.search,
+            "/catalogue": self.catalogue_details,
+            "/seasons": self.seasons,
+            "/episodes": self.episodes,
+            "/new-episodes": self.new_episodes,
+        }
+
+    async def handle(self, path: str, params: Params) -> Any:
+        """Return the cached JSON response, computing it if needed."""
+        self._prune()
+        key = f"{path}?{sorted(params.items())}"
+        cached = self._responses.get(key)
+        if cached is None or time.monotonic() - cached[0] > self.ttl:
+            cached = time.monotonic(), asyncio.ensure_future(self.routes[path](params))
+            self._responses[key] = cached
+
+        try:
+            return await cached[1]
+        except Exception:
+            if self._responses.get(key) is cached:
+                del self._responses[key]
+            raise
+
+    def _prune(self) -> None:
+        """Forget the expired responses and catalogues, at most once per `ttl`."""
+        now = time.monotonic()
+        if now - self._pruned_at <= self.ttl:
+            return
+        self._pruned_at = now
+
+        self._responses = {
+            key: cached
+            for key, cached in self._responses.items()
+            if now - cached[0] <= self.ttl or not cached[1].done()
+        }
+        self._catalogues = {
+            url: cached
+            for url, cached in self._catalogues.items()
+            if now - cached[0] <= self.ttl
+        }
+
+    @staticmethod
+    def _param(params: Params, name: str) -> str:
+        if name not in params:
+            raise MissingParameter(name)
+        return params[name]
+
+    def _is_fresh(self, url: str) -> bool:
+        cached = self._catalogues.get(url)
+        return cached is not None and time.monotonic() - cached[0] <= self.ttl
+
+    async def _catalogue(self, url: str) -> Catalogue:
+        """The catalogue with its page, a failed page is fetched again next time."""
+        url = url if url.endswith("/") else url + "/"
+        if not self._is_fresh(url):
+            expired = self._catalogues.get(url)
+            if expired is None:
+                catalogue = Catalogue(url, client=self.anime_sama.client)
+            else:
+                # Keep the metadata from the search results but not the page
+                old = expired[1]
+                catalogue = Catalogue(
+                    url,
+                    name=old.name,
+                    alternative_names=old.alternative_names,
+                    genres=old.genres,
+                    categories=old.categories,
+                    languages=old.languages,
+                    image_url=old.image_url,
+                    client=self.anime_sama.client,
+                )
+            self._catalogues[url] = time.monotonic(), catalogue
+
+        catalogue = self._catalogues[url][1]
+        if not await catalogue.page():
+            self._catalogues[url] = float("-inf"), catalogue
+        return catalogue
+
+    async def search(self, params: Params) -> list[dict[str, Any]]:
+        catalogues = await self.anime_sama.search(self._param(params, "q"))
+        for catalogue in catalogues:
+            if not self._is_fresh(catalogue.url):
+                self._catalogues[catalogue.url] = time.monotonic(), catalogue
+        return [catalogue_to_json(catalogue) for catalogue in catalogues]
+
+    async def catalogue_details(self, params: Params) -> dict[str, Any]:
+        catalogue = await self._catalogue(self._param(params, "url"))
+        advancement, correspondence, synopsis, is_mature = await asyncio.gather(
+            catalogue.advancement(),
+            catalogue.correspondence(),
+            catalogue.synopsis(),
+            catalogue.is_mature(),
+        )
+        return catalogue_to_json(catalogue) | {
+            "advancement": advancement,
+            "correspondence": correspondence,
+            "synopsis": synopsis,
+            "is_mature": is_mature,
+        }
+
+    async def seasons(self, params: Params) -> list[dict[str, Any]]:
+        catalogue = await self._catalogue(self._param(params, "url"))
+        return [season_to_json(season) for season in await catalogue.seasons()]
+
+    async def episodes(self, params: Params) -> list[dict[str, Any]]:
+        season_url = self._param(params, "url")
+        season_url = season_url if season_url.endswith("/") else season_url + "/"
+        catalogue = await self._catalogue(season_url.rstrip("/").rsplit("/", 1)[0])
+
+        episodes = await self.anime_sama.season_episodes(season_url, catalogue)
+        return [episode_to_json(episode) for episode in episodes]
+
+    async def new_episodes(self, _: Params) -> list[dict[str, Any]]:
+        return [
+            release_to_json(release) for release in await self.anime_sama.new_episodes()
+        ]
+
+
+def make_handler(
+    api: Api, loop: asyncio.AbstractEventLoop
+) -> type[BaseHTTPRequestHandler]:
+    class ApiRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: HTTPStatus, body: Any) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            if status == HTTPStatus.OK:
+                self.send_header("Cache-Control", f"max-age={int(api.ttl)}")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_metrics(self, query: str) -> None:
+            assert api.metrics is not None
+            # Prometheus text by default, never cached as it changes all the time
+            if parse_qs(query).get("format") == ["json"]:
+                content_type = "application/json; charset=utf-8"
+                data = json.dumps(api.metrics.to_json()).encode()
+            else:
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+                data = api.metrics.to_prometheus().encode()
+
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            path = url.path.rstrip("/") or "/"
+            if path == "/metrics" and api.metrics is not None:
+                self._send_metrics(url.query)
+                return
+            if path not in api.routes:
+                self._send_json(
+                    HTTPStatus.NOT_FOUND,
+                    {"error": "Unknown endpoint", "endpoints": list(api.routes)},
+                )
+                return
+
+            params = {
+                name: values[0]
+                for name, values in parse_qs(url.query, keep_blank_values=True).items()
+            }
+            future = asyncio.run_coroutine_threadsafe(api.handle(path, params), loop)
+            try:
+                self._send_json(HTTPStatus.OK, future.result())
+            except MissingParameter as exception:
+                self._send_json(
+                    HTTPStatus.BAD_REQUEST,
+                    {"error": f"Missing parameter '{exception}'"},
+                )
+            except httpx.HTTPError as exception:
+                self._send_json(HTTPStatus.BAD_GATEWAY, {"error": str(exception)})
+            except Exception:
+                logger.exception("Cannot answer %s", self.path)
+                self._send_json(
+                    HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+                )
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.info("%s - %s", self.address_string(), format % args)
+
+    return ApiRequestHandler
+
+
+class ApiServer(ThreadingHTTPServer):
+    """
+    Serve an Api over HTTP. Requests are handled by threads but the library runs
+    in a single event loop owned by the server.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        api: Api,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ) -> None:
+        self.api = api
+        self.loop = loop or asyncio.new_event_loop()
+        self._loop_thread = Thread(target=self.loop.run_forever, daemon=True)
+        self._loop_thread.start()
+        super().__init__(address, make_handler(api, self.loop))
+
+    def server_close(self) -> None:
+        super().server_close()
+        asyncio.run_coroutine_threadsafe(
+            self.api.anime_sama.client.aclose(), self.loop
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._loop_thread.join()
+        self.loop.close()
+
+
+def serve(host: str, port: int, ttl: float = 300) -> None:
+    loop = asyncio.new_event_loop()
+    # On the mirrors like the other commands, its client is bound to the server loop
+    api = Api(loop.run_until_complete(open_site()), ttl, Metrics())
+    with ApiServer((host, port), api, loop) as server:
+        logger.info("Serving on http://%s:%s/", *server.server_address[:2])
+        server.serve_forever()
@@ -0,0 +1,27 @@
+from functools import cache
+
+import httpx
+
+from ..hedging import HedgingTransport
+from ..mirrors import Mirrors
+from ..top_level import AnimeSama
+from .config import load_config
+
+
+@cache
+def get_mirrors() -> Mirrors:
+    config = load_config()
+    return Mirrors([config.url, *config.mirrors])
+
+
+async def open_site() -> AnimeSama:
+    """anime-sama on its fastest mirror, moving to another one if it goes down."""
+    mirrors = get_mirrors()
+    transport = mirrors.transport(
+        HedgingTransport() if load_config().hedge_requests else None
+    )
+    await mirrors.choose(transport.transport)
+    anime_sama = AnimeSama(mirrors.active, httpx.AsyncClient(transport=transport))
+    # The pages link to the mirror that served them, the parsers look for it
+    mirrors.on_change(lambda active: setattr(anime_sama, "site_url", active))
+    return anime_sama
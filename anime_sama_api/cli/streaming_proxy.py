@@ -0,0 +1,137 @@
+import logging
+import mimetypes
+import re
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Any
+from urllib.parse import quote
+
+from .direct_download import DirectDownloadError, RangedDownload
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+# How long a player waits for bytes before its request fails
+READ_TIMEOUT = 60
+
+
+class ProxyRequestHandler(BaseHTTPRequestHandler):
+    server: "StreamingProxy"
+
+    def _range(self, size: int | None) -> tuple[int, int | None] | None:
+        match_range = re.fullmatch(
+            r"bytes=(\d*)-(\d*)", self.headers.get("Range", "").strip()
+        )
+        if match_range is None or size is None:
+            return None
+
+        start, end = match_range.groups()
+        if not start:  # The last bytes
+            return max(size - int(end or 0), 0), size - 1
+        return int(start), min(int(end), size - 1) if end else size - 1
+
+    def _send_headers(self) -> tuple[int, int | None] | None:
+        download = self.server.download
+        try:
+            size = download.wait_ready(READ_TIMEOUT)
+        except (DirectDownloadError, TimeoutError) as exception:
+            self.send_error(HTTPStatus.BAD_GATEWAY, str(exception))
+            return None
+
+        content_type = mimetypes.guess_type(download.destination.name)[0]
+        requested_range = self._range(size)
+
+        if size is not None and requested_range is not None:
+            start, end = requested_range
+            if start >= size or end is not None and end < start:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return None
+
+            # The player seeked there, download what comes next first
+            download.prioritize(start)
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            start, end = 0, size - 1 if size is not None else None
+            self.send_response(HTTPStatus.OK)
+
+        if size is not None:
+            self.send_header("Accept-Ranges", "bytes")
+        if end is not None:
+            self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Content-Type", content_type or "application/octet-stream")
+        self.end_headers()
+        return start, end
+
+    def do_HEAD(self) -> None:
+        self._send_headers()
+
+    def do_GET(self) -> None:
+        content_range = self._send_headers()
+        if content_range is None:
+            return
+
+        download = self.server.download
+        position, end = content_range
+        try:
+            while end is None or position <= end:
+                available = download.wait(position, READ_TIMEOUT)
+                if available == 0:
+                    break
+
+                if end is not None:
+                    available = min(available, end - position + 1)
+                data = download.read(position, min(available, CHUNK_SIZE))
+                self.wfile.write(data)
+                position += len(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The player seeked or stopped
+        except (DirectDownloadError, TimeoutError) as exception:
+            logger.warning("Stopped streaming %s: %s", download.destination, exception)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class StreamingProxy(ThreadingHTTPServer):
+    """
+    Serve a video on localhost while it is downloaded into the library, so an episode
+    that is watched and kept is only transferred once. Range requests of the player
+    move the download to where it seeks, and the download goes on after the playback.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, download: RangedDownload, address: tuple[str, int] = ("127.0.0.1", 0)
+    ) -> None:
+        super().__init__(address, ProxyRequestHandler)
+        self.download = download
+        self._download_thread = Thread(target=self._download, daemon=True)
+        self._serve_thread = Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/{quote(self.download.destination.name)}"
+
+    def _download(self) -> None:
+        try:
+            self.download.run()
+        except Exception as exception:
+            logger.error("Cannot download %s: %s", self.download.destination, exception)
+
+    def start(self) -> "StreamingProxy":
+        self._download_thread.start()
+        self._serve_thread.start()
+        return self
+
+    def finish(self) -> None:
+        """Wait for the end of the download then stop serving."""
+        self._download_thread.join()
+        self.shutdown()
+        self.server_close()
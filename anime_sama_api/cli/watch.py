@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TypeGuard
+
+import httpx
+
+from ..catalogue import Catalogue
+from ..episode import Episode
+from ..langs import Lang
+from ..top_level import AnimeSama, EpisodeRelease
+from .cache import JsonStore, cache_dir
+from .config import load_config
+from .pipeline import download_pipeline
+from .site import open_site
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class NewRelease:
+    release: EpisodeRelease
+    catalogue: Catalogue
+    episodes: list[Episode]
+
+
+def _is_resolved(result: NewRelease | BaseException | None) -> TypeGuard[NewRelease]:
+    return isinstance(result, NewRelease)
+
+
+class Watcher:
+    """Find the episodes of a watchlist that have been released since the last poll."""
+
+    def __init__(
+        self,
+        anime_sama: AnimeSama,
+        series: Iterable[str],
+        languages: Iterable[Lang],
+        seen: JsonStore,
+    ) -> None:
+        self.anime_sama = anime_sama
+        self.series = set(series)
+        self.languages = set(languages)
+        self.seen = seen
+
+    @staticmethod
+    def _key(release: EpisodeRelease) -> str:
+        return f"{release.page_url} {release.descriptive}"
+
+    def is_watched(self, release: EpisodeRelease) -> bool:
+        return (
+            release.catalogue_url.rstrip("/").rsplit("/", 1)[-1] in self.series
+            and release.language in self.languages
+        )
+
+    async def _resolve(self, release: EpisodeRelease) -> NewRelease | None:
+        episodes = await release.get_real_episodes()
+        if not episodes:
+            logger.warning("Cannot find the episodes of %s yet", release.fancy_name)
+            return None
+
+        catalogue = Catalogue(
+            release.catalogue_url,
+            name=release.serie_name,
+            categories=set(release.categories),
+            client=self.anime_sama.client,
+        )
+        return NewRelease(release, catalogue, episodes)
+
+    async def poll(self) -> list[NewRelease]:
+        releases = [
+            release
+            for release in await self.anime_sama.new_episodes()
+            if self.is_watched(release) and self.seen.get(self._key(release)) is None
+        ]
+        # Releases of the same season share the same resolution
+        results = await asyncio.gather(
+            *(self._resolve(release) for release in releases), return_exceptions=True
+        )
+
+        for release, result in zip(releases, results):
+            if isinstance(result, BaseException):
+                logger.warning("Cannot resolve %s: %s", release.fancy_name, result)
+        return [result for result in results if _is_resolved(result)]
+
+    def mark_seen(self, new_releases: Iterable[NewRelease]) -> None:
+        with self.seen.batch():
+            for new_release in new_releases:
+                self.seen.set(self._key(new_release.release), True)
+
+
+async def watch() -> None:
+    config = load_config()
+    watch_config = config.watch
+    watcher = Watcher(
+        await open_site(),
+        watch_config.get("series", []),
+        watch_config.get("languages", config.prefer_languages),
+        JsonStore(cache_dir() / "watch.json"),
+    )
+    if not watcher.series:
+        logger.error("The watchlist is empty, add series to [watch] in the config")
+        return
+
+    logger.info("Watching %s", ", ".join(sorted(watcher.series)))
+    while True:
+        try:
+            new_releases = await watcher.poll()
+        except httpx.HTTPError as exception:
+            logger.warning("Cannot check the new episodes: %s", exception)
+            new_releases = []
+
+        batches: dict[tuple[Catalogue, Lang], list[NewRelease]] = {}
+        for new_release in new_releases:
+            batches.setdefault(
+                (new_release.catalogue, new_release.release.language), []
+            ).append(new_release)
+
+        for (catalogue, language), batch in batches.items():
+            logger.info(
+                "New release(s) for %s: %s",
+                catalogue.name,
+                ", ".join(new.release.fancy_name for new in batch),
+            )
+            downloaded = await download_pipeline(
+                [episode for new in batch for episode in new.episodes],
+                catalogue,
+                config.download_path,
+                config.episode_path,
+                config.concurrent_downloads,
+                [language] + config.prefer_languages,
+                config.players_config,
+                config.max_retry_time,
+                config.format,
+                config.format_sort,
+            )
+            # The failed ones are tried again on the next poll
+            watcher.mark_seen(
+                new
+                for new in batch
+                if all(episode in downloaded for episode in new.episodes)
+            )
+
+        await asyncio.sleep(watch_config.get("interval", 600))
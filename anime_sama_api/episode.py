@@ -10,14 +10,30 @@ from .langs import flags, Lang, LangId, id2lang, lang2ids
 logger = logging.getLogger(__name__)
 
 
+# (pattern, replacement) applied in order to every player URL, so the same video
+# always has the same URL whatever the page it comes from
+PLAYER_URL_RULES: list[tuple[re.Pattern[str], str]] = [
+    (re.compile(r"^\s+|\s+$"), ""),
+    # Protocol-relative links
+    (re.compile(r"^//"), "https://"),
+    # Old links
+    (re.compile(r"^(https?://)(?:www\.)?vidmoly\.to/"), r"\1vidmoly.net/"),
+]
+
+
+def canonical_player(url: str) -> str:
+    for pattern, replacement in PLAYER_URL_RULES:
+        url = pattern.sub(replacement, url)
+    return url
+
+
 class Players(list[str]):
     def __init__(self, *args: Sequence[Any], **kwargs: dict[Any, Any]):
         ret = super().__init__(*args, **kwargs)
         self.swapPlayers()  # seem to exist on all pages but that could be false, to be sure check script_videos.js
 
-        # Autofix old links
         for index, _ in enumerate(self):
-            self[index] = self[index].replace("vidmoly.to", "vidmoly.net")
+            self[index] = canonical_player(self[index])
 
         return ret
 
@@ -69,22 +85,30 @@ class Languages(dict[LangId, Players]):
         prefer_players: list[str],
         ban_players: list[str],
     ) -> Generator[str]:
+        # Languages often share their players, each one is only tried once
+        tried: set[str] = set()
+
+        def untried(players: Players) -> Generator[str]:
+            for player in players.sort_and_filter(
+                prefer_players=prefer_players, ban_players=ban_players
+            ):
+                if player not in tried:
+                    tried.add(player)
+                    yield player
+
         for prefer_language in prefer_languages:
             for players in self.availables.get(prefer_language, []):
                 if players:
-                    yield from players.sort_and_filter(
-                        prefer_players=prefer_players, ban_players=ban_players
-                    )
+                    yield from untried(players)
 
         for language in lang2ids:
             for players in self.availables.get(language, []):
-                if players:
+                # The preferred languages were already tried
+                if fallback := list(untried(players)):
                     logger.warning(
                         "Language preference not respected. Using %s", language
                     )
-                    yield from players.sort_and_filter(
-                        prefer_players=prefer_players, ban_players=ban_players
-                    )
+                    yield from fallback
 
 
 @dataclass(frozen=True)
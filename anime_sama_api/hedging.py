@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import deque
+
+import httpx
+
+from .metrics import endpoint_class
+
+
+class LatencyWindow:
+    """The latencies of the last `size` responses, to know what is unusually slow."""
+
+    def __init__(self, size: int = 200) -> None:
+        self.latencies: deque[float] = deque(maxlen=size)
+
+    def add(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def quantile(self, quantile: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[int(quantile * (len(ordered) - 1))]
+
+    def __len__(self) -> int:
+        return len(self.latencies)
+
+
+class HedgingTransport(httpx.AsyncBaseTransport):
+    """
+    Send a second identical GET when a response takes longer than the `quantile`
+    latency of its kind of page (search, catalogue, season...) and use whichever
+    answers first, so one stalled connection doesn't make a whole operation wait.
+    Nothing is hedged until `min_samples` responses of that kind were measured.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport | None = None,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        window: int = 200,
+    ) -> None:
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.window = window
+
+        self.latencies: dict[str, LatencyWindow] = {}
+        self.hedged = 0
+
+    def hedge_delay(self, endpoint: str) -> float | None:
+        """How long to wait before hedging a request, None to never hedge it."""
+        latencies = self.latencies.get(endpoint)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        return max(latencies.quantile(self.quantile), self.min_delay)
+
+    async def _send(self, request: httpx.Request, endpoint: str) -> httpx.Response:
+        """
+        Send the request and read its whole body before returning. Every response is
+        buffered in memory, even when it is not hedged, so this transport doesn't
+        suit streamed downloads of large files.
+        """
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        try:
+            # The body is part of the latency: a page can stall in the middle
+            content = b"".join([chunk async for chunk in response.stream])  # type: ignore
+        finally:
+            await response.aclose()
+
+        if response.status_code < 500:
+            self.latencies.setdefault(endpoint, LatencyWindow(self.window)).add(
+                time.perf_counter() - start
+            )
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            content=content,
+            extensions=response.extensions,
+            request=request,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = endpoint_class(request.url)
+        delay = self.hedge_delay(endpoint)
+        # Only idempotent requests without a body can be sent twice
+        if request.method != "GET" or delay is None:
+            return await self._send(request, endpoint)
+
+        attempts = {asyncio.ensure_future(self._send(request, endpoint))}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                self.hedged += 1
+                attempts.add(asyncio.ensure_future(self._send(request, endpoint)))
+
+            while True:
+                done, attempts = await asyncio.wait(
+                    attempts, return_when=asyncio.FIRST_COMPLETED
+                )
+                # If one of them failed, the other one can still answer
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+                if not attempts:
+                    return done.pop().result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
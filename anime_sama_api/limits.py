@@ -0,0 +1,20 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any
+
+from httpx import AsyncClient, Response
+
+# Set by a batch (like `AnimeSama.resolve_many`) to bound the requests it sends,
+# the tasks it starts inherit it
+request_slots: ContextVar[asyncio.Semaphore | None] = ContextVar(
+    "request_slots", default=None
+)
+
+
+async def limited_get(client: AsyncClient, url: str, **kwargs: Any) -> Response:
+    """GET `url`, waiting for a free slot when the current batch limits its requests."""
+    slots = request_slots.get()
+    if slots is None:
+        return await client.get(url, **kwargs)
+    async with slots:
+        return await client.get(url, **kwargs)
@@ -0,0 +1,287 @@
+import json
+import time
+from bisect import bisect_left
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Any
+from weakref import WeakKeyDictionary
+
+from httpx import (
+    URL,
+    AsyncByteStream,
+    AsyncClient,
+    Request,
+    Response,
+    ResponseNotRead,
+)
+
+# Seconds, the last bucket is +Inf
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_START = "anime_sama_metrics_start"
+_instrumented: "WeakKeyDictionary[AsyncClient, Metrics]" = WeakKeyDictionary()
+
+
+def endpoint_class(url: URL) -> str:
+    """The kind of anime-sama page an URL is, "other" for players and images."""
+    parts = [part for part in url.path.split("/") if part]
+    if not parts:
+        return "homepage"
+    if parts[0] != "catalogue":
+        return "other"
+    if parts[-1] == "episodes.js":
+        return "episodes.js"
+    match len(parts):
+        case 1:
+            return "search"
+        case 2:
+            return "catalogue"
+        case 4:
+            return "season"
+    return "other"
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = self.counts or [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(upper bound, observations under it), the Prometheus way."""
+        bounds = [f"{bucket:g}" for bucket in self.buckets] + ["+Inf"]
+        total = 0
+        cumulative = []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": dict(self.cumulative()),
+        }
+
+
+@dataclass
+class EndpointMetrics:
+    count: int = 0
+    bytes: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+    latency: Histogram = field(default_factory=Histogram)
+
+
+class _MeasuredStream(AsyncByteStream):
+    """Count the bytes of a response body and report them once it is closed."""
+
+    def __init__(
+        self, stream: AsyncByteStream, on_close: Callable[[int], None]
+    ) -> None:
+        self.stream = stream
+        self.on_close = on_close
+        self.bytes = 0
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            self.bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self.on_close(self.bytes)
+
+
+class Metrics:
+    """
+    Requests and parsing of the anime-sama pages, by kind of page: number of requests,
+    bytes received, status codes and latency histograms. A response is measured until
+    its body is read, so the latency includes the download of the page.
+
+    Attach it to the client shared by AnimeSama, Catalogue and Season with
+    `instrument`, then export it with `to_json`, `to_prometheus` or `write`.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.requests: dict[str, EndpointMetrics] = {}
+        self.parsing: dict[str, Histogram] = {}
+        # Clients may be shared with threads running their own event loop
+        self._lock = Lock()
+
+    def instrument(self, client: AsyncClient) -> AsyncClient:
+        client.event_hooks["request"].append(self._on_request)
+        client.event_hooks["response"].append(self._on_response)
+        _instrumented[client] = self
+        return client
+
+    async def _on_request(self, request: Request) -> None:
+        request.extensions[_START] = time.perf_counter()
+
+    async def _on_response(self, response: Response) -> None:
+        request = response.request
+        start = request.extensions.get(_START, time.perf_counter())
+        endpoint = endpoint_class(request.url)
+        status_code = response.status_code
+
+        def record(size: int) -> None:
+            self.record_request(
+                endpoint, status_code, size, time.perf_counter() - start
+            )
+
+        try:
+            # In-memory responses, like the ones of a MockTransport, are already read
+            record(len(response.content))
+        except ResponseNotRead:
+            response.stream = _MeasuredStream(response.stream, record)  # type: ignore
+
+    def record_request(
+        self, endpoint: str, status_code: int, size: int, latency: float
+    ) -> None:
+        with self._lock:
+            metrics = self.requests.setdefault(
+                endpoint, EndpointMetrics(latency=Histogram(self.buckets))
+            )
+            metrics.count += 1
+            metrics.bytes += size
+            metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+            metrics.latency.observe(latency)
+
+    def record_parse(self, page: str, duration: float) -> None:
+        with self._lock:
+            self.parsing.setdefault(page, Histogram(self.buckets)).observe(duration)
+
+    @contextmanager
+    def time_parse(self, page: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_parse(page, time.perf_counter() - start)
+
+    def to_json(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": {
+                    endpoint: {
+                        "count": metrics.count,
+                        "bytes": metrics.bytes,
+                        "statuses": {
+                            str(status): count
+                            for status, count in sorted(metrics.statuses.items())
+                        },
+                        "latency": metrics.latency.to_json(),
+                    }
+                    for endpoint, metrics in sorted(self.requests.items())
+                },
+                "parsing": {
+                    page: histogram.to_json()
+                    for page, histogram in sorted(self.parsing.items())
+                },
+            }
+
+    @staticmethod
+    def _histogram_lines(name: str, label: str, histogram: Histogram) -> list[str]:
+        lines = [
+            f'{name}_bucket{{{label},le="{bound}"}} {count}'
+            for bound, count in histogram.cumulative()
+        ]
+        lines.append(f"{name}_sum{{{label}}} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{{{label}}} {histogram.count}")
+        return lines
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            requests = sorted(self.requests.items())
+            parsing = sorted(self.parsing.items())
+
+            lines = [
+                "# HELP anime_sama_requests_total Requests to anime-sama by page and status.",
+                "# TYPE anime_sama_requests_total counter",
+            ]
+            for endpoint, metrics in requests:
+                lines += [
+                    f'anime_sama_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+                    for status, count in sorted(metrics.statuses.items())
+                ]
+
+            lines += [
+                "# HELP anime_sama_response_bytes_total Bytes received by page.",
+                "# TYPE anime_sama_response_bytes_total counter",
+            ]
+            lines += [
+                f'anime_sama_response_bytes_total{{endpoint="{endpoint}"}} {metrics.bytes}'
+                for endpoint, metrics in requests
+            ]
+
+            lines += [
+                "# HELP anime_sama_request_duration_seconds Time to receive a page.",
+                "# TYPE anime_sama_request_duration_seconds histogram",
+            ]
+            for endpoint, metrics in requests:
+                lines += self._histogram_lines(
+                    "anime_sama_request_duration_seconds",
+                    f'endpoint="{endpoint}"',
+                    metrics.latency,
+                )
+
+            lines += [
+                "# HELP anime_sama_parse_duration_seconds Time to parse a page.",
+                "# TYPE anime_sama_parse_duration_seconds histogram",
+            ]
+            for page, histogram in parsing:
+                lines += self._histogram_lines(
+                    "anime_sama_parse_duration_seconds", f'page="{page}"', histogram
+                )
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Save as JSON if `path` ends with .json, else as a Prometheus text file."""
+        content = (
+            json.dumps(self.to_json(), indent=1)
+            if path.suffix == ".json"
+            else self.to_prometheus()
+        )
+        # Replaced at once so a scraper never reads half a file
+        temporary = path.with_name(path.name + ".tmp")
+        temporary.write_text(content, encoding="utf-8")
+        temporary.replace(path)
+
+
+def record_parse_time(client: AsyncClient, page: str, duration: float) -> None:
+    """Record a parsing time measured elsewhere if the client is instrumented."""
+    metrics = _instrumented.get(client)
+    if metrics is not None:
+        metrics.record_parse(page, duration)
+
+
+@contextmanager
+def parse_timer(client: AsyncClient, page: str) -> Iterator[None]:
+    """Time the parsing of a page if the client is instrumented."""
+    metrics = _instrumented.get(client)
+    if metrics is None:
+        yield
+        return
+
+    with metrics.time_parse(page):
+        yield
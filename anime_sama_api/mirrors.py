@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+
+async def probe(
+    transport: httpx.AsyncBaseTransport, url: str, timeout: float = 5
+) -> float | None:
+    """Seconds to get the homepage of a mirror, None if it doesn't work."""
+    request = httpx.Request(
+        "GET", url, extensions={"timeout": httpx.Timeout(timeout).as_dict()}
+    )
+    start = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(
+            transport.handle_async_request(request), timeout
+        )
+        try:
+            async for _ in response.stream:  # type: ignore
+                pass
+        finally:
+            await response.aclose()
+    except (httpx.HTTPError, asyncio.TimeoutError) as exception:
+        logger.debug("Mirror %s is down: %r", url, exception)
+        return None
+
+    if response.status_code >= 400:
+        logger.debug("Mirror %s answered %s", url, response.status_code)
+        return None
+    return time.perf_counter() - start
+
+
+class Mirrors:
+    """
+    The domains anime-sama is served from. `choose` probes them all at once and
+    makes the fastest healthy one active; URLs of any mirror are moved to the
+    active one by `rewrite` and by the requests of a `transport`. The callbacks
+    added with `on_change` are called with the new active mirror.
+    """
+
+    def __init__(self, urls: list[str], timeout: float = 5) -> None:
+        # Without duplicates, in order of preference
+        self.urls = list(
+            dict.fromkeys(url if url.endswith("/") else url + "/" for url in urls)
+        )
+        self.timeout = timeout
+        self.active = self.urls[0]
+        self.latencies: dict[str, float | None] = {}
+        self._callbacks: list[Callable[[str], None]] = []
+
+    def on_change(self, callback: Callable[[str], None]) -> None:
+        self._callbacks.append(callback)
+
+    async def choose(self, transport: httpx.AsyncBaseTransport) -> str:
+        if len(self.urls) > 1:
+            latencies = await asyncio.gather(
+                *(probe(transport, url, self.timeout) for url in self.urls)
+            )
+            self.latencies = dict(zip(self.urls, latencies))
+
+            healthy = {
+                url: latency
+                for url, latency in self.latencies.items()
+                if latency is not None
+            }
+            if healthy:
+                active = min(healthy, key=healthy.__getitem__)
+                if active != self.active:
+                    logger.info("Using the mirror %s", active)
+                    self.active = active
+                    for callback in self._callbacks:
+                        callback(active)
+            else:
+                logger.warning("No mirror answered, staying on %s", self.active)
+        return self.active
+
+    def mirror_of(self, url: str) -> str | None:
+        for mirror in self.urls:
+            if url.startswith(mirror):
+                return mirror
+        return None
+
+    def rewrite(self, url: str) -> str:
+        """The same page on the active mirror, for URLs saved from another one."""
+        mirror = self.mirror_of(url)
+        if mirror is None or mirror == self.active:
+            return url
+        return self.active + url[len(mirror) :]
+
+    def transport(
+        self, transport: httpx.AsyncBaseTransport | None = None, failures: int = 3
+    ) -> "MirrorTransport":
+        return MirrorTransport(self, transport, failures)
+
+
+class MirrorTransport(httpx.AsyncBaseTransport):
+    """
+    Send the requests for any mirror to the active one. After `failures` network
+    errors or server errors in a row, the mirrors are probed again and the
+    request is retried once if another mirror became active.
+    """
+
+    def __init__(
+        self,
+        mirrors: Mirrors,
+        transport: httpx.AsyncBaseTransport | None = None,
+        failures: int = 3,
+    ) -> None:
+        self.mirrors = mirrors
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.failures = failures
+        self._failed = 0
+        self._choosing: asyncio.Task[str] | None = None
+
+    def _to_active(self, request: httpx.Request) -> httpx.Request:
+        url = self.mirrors.rewrite(str(request.url))
+        if url == str(request.url):
+            return request
+
+        rewritten = httpx.Request(
+            request.method,
+            url,
+            headers=request.headers,
+            stream=request.stream,
+            extensions=request.extensions,
+        )
+        rewritten.headers["Host"] = rewritten.url.netloc.decode()
+        return rewritten
+
+    async def _fail_over(self) -> bool:
+        """Probe the mirrors again, True if another one is now active."""
+        active = self.mirrors.active
+        # Concurrent failures share the same probe
+        if self._choosing is None or self._choosing.done():
+            self._choosing = asyncio.ensure_future(self.mirrors.choose(self.transport))
+        await self._choosing
+        self._failed = 0
+        return self.mirrors.active != active
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        is_site = self.mirrors.mirror_of(str(request.url)) is not None
+        try:
+            response = await self.transport.handle_async_request(
+                self._to_active(request)
+            )
+        except httpx.TransportError:
+            if not is_site:
+                raise
+            self._failed += 1
+            if self._failed >= self.failures and await self._fail_over():
+                return await self.transport.handle_async_request(
+                    self._to_active(request)
+                )
+            raise
+
+        if not is_site:
+            return response
+        if response.status_code < 500:
+            self._failed = 0
+            return response
+
+        self._failed += 1
+        if self._failed >= self.failures and await self._fail_over():
+            await response.aclose()
+            return await self.transport.handle_async_request(self._to_active(request))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,273 @@
+import asyncio
+from ast import literal_eval
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import reduce
+from html import unescape
+import re
+import time
+from typing import Any, TypeVar
+from weakref import WeakKeyDictionary
+
+from httpx import AsyncClient
+
+from .metrics import parse_timer, record_parse_time
+from .utils import remove_some_js_comments, split_and_strip, zip_varlen
+
+T = TypeVar("T")
+
+# (language id, html, episodes.js)
+LangPage = tuple[str, str, str]
+# (name, language id: players)
+EpisodeRecord = tuple[str, dict[str, list[str]]]
+
+_executors: "WeakKeyDictionary[AsyncClient, ParseExecutor]" = WeakKeyDictionary()
+
+
+@dataclass(frozen=True)
+class CatalogueCard:
+    url: str
+    image_url: str
+    name: str
+    alternative_names: list[str]
+    genres: list[str]
+    categories: list[str]
+    languages: list[str]
+
+
+def catalogue_cards(html: str, site_url: str) -> list[CatalogueCard]:
+    """The catalogues of a search page, categories and languages are not checked."""
+    text_without_script = re.sub(r"<script[\W\w]+?</script>", "", html)
+    cards = []
+    for match in re.finditer(
+        rf"href=\"({site_url}catalogue/.+)\"[\W\w]+?src=\"(.+?)\"[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<",
+        text_without_script,
+    ):
+        (
+            url,
+            image_url,
+            name,
+            alternative_names_str,
+            genres_str,
+            categories_str,
+            languages_str,
+        ) = (unescape(item) for item in match.groups())
+
+        if " - " in genres_str:
+            genres = genres_str.split(" - ")
+        else:
+            genres = genres_str.split(", ") if genres_str else []
+
+        cards.append(
+            CatalogueCard(
+                url=url,
+                image_url=image_url,
+                name=name,
+                alternative_names=(
+                    alternative_names_str.split(", ") if alternative_names_str else []
+                ),
+                genres=genres,
+                categories=categories_str.split(", ") if categories_str else [],
+                languages=languages_str.split(", ") if languages_str else [],
+            )
+        )
+    return cards
+
+
+def season_links(page: str) -> list[tuple[str, str]]:
+    """(name, link relative to the catalogue) of the seasons of a catalogue page."""
+    return re.findall(
+        r'panneauAnime\("(.+?)", *"(.+?)(?:vostfr|vf)"\);',
+        remove_some_js_comments(string=page),
+    )
+
+
+def players_from(episodes_js: str) -> list[list[str]]:
+    """The players of each episode, in the order of episodes.js."""
+    players_list = re.findall(
+        r"eps(\d+) ?= ?\[([\W\w]+?)\]", remove_some_js_comments(episodes_js)
+    )
+    players_list = sorted(players_list, key=lambda tuple: tuple[0])
+    players_list_links = (re.findall(r"'(.+?)'", player) for _, player in players_list)
+    return zip_varlen(*players_list_links)
+
+
+def episode_names(
+    html: str, page_url: str, number_of_episodes: int, number_of_episodes_max: int
+) -> list[str]:
+    functions = re.findall(
+        r"resetListe\(\); *[\n\r]+\t*(.*?)}",
+        html,
+        re.DOTALL,
+    )[-1]
+    functions_list = split_and_strip(functions, (";", "\n"))[:-1]
+
+    def padding(n: int) -> str:
+        return " " * (len(str(number_of_episodes_max)) - len(str(n)))
+
+    def episode_name_range(*args) -> list[str]:
+        return [f"Episode {n}{padding(n)}" for n in range(*args)]
+
+    episodes_name: list[str] = []
+    for function in functions_list:
+        if function.startswith("//"):
+            continue
+
+        call_start = function.find("(")
+        function, args_sting = function[:call_start], function[call_start + 1 : -1]
+        if args_sting:
+            # Warning literal_eval: Can crash
+            args = literal_eval(node_or_string=args_sting + ",")
+        else:
+            args = ()
+
+        match function:
+            case "":
+                continue
+            case "creerListe":
+                if len(args) < 2:
+                    # Only seen on Dragon Ball GT (Film), Junji Ito Collection (Saison 1) and Orange (Film)
+                    # Surely a small oversight in anime-sama.org
+                    # So it is undefined but do nothing is generaly the good reaction
+                    continue
+
+                episodes_name += episode_name_range(int(args[0]), int(args[1]) + 1)
+            case "finirListe" | "finirListeOP":
+                if not args:
+                    break
+
+                episodes_name += episode_name_range(
+                    int(args[0]),
+                    int(args[0]) + number_of_episodes - len(episodes_name),
+                )
+                break
+            case "newSP":
+                if not args:
+                    raise NotImplementedError(
+                        f"Error while parsing 'newSP'.\nPlease report this to the developer with URL: {page_url}"
+                    )
+                episodes_name.append(f"Episode {args[0]}")
+            case "newSPF":
+                if not args:
+                    raise NotImplementedError(
+                        f"Error while parsing 'newSPF'.\nPlease report this to the developer with URL: {page_url}"
+                    )
+                episodes_name.append(args[0])
+            case name:
+                raise NotImplementedError(
+                    f"Error cannot parse '{name}'.\nPlease report this to the developer with URL: {page_url}"
+                )
+
+    return episodes_name
+
+
+def _extend_episodes(
+    current: list[EpisodeRecord], new: tuple[str, list[str], list[list[str]]]
+) -> list[EpisodeRecord]:
+    """
+    Extend a list of episodes AKA (name, languages) from a list names and players corresponding
+    to a language while preserving the relative order of names.
+    This function is intended to be used with reduce.
+    """
+    lang_id, names, players_list = new  # Unpack args. This is due to reduce
+
+    fusion = []
+    curr_done = 0
+    for name_new, players in zip(names, players_list):
+        for pos, (name_current, languages) in enumerate(current[curr_done:]):
+            if name_new == name_current:
+                languages[lang_id] = players
+                fusion.extend(current[curr_done : curr_done + pos + 1])
+                curr_done += pos + 1
+                break
+        else:
+            fusion.append((name_new, {lang_id: players}))
+    fusion.extend(current[curr_done:])
+    return fusion
+
+
+def season_episodes(pages: list[LangPage], season_url: str) -> list[EpisodeRecord]:
+    """The episodes of a season with their players, from the pages of each language."""
+    players_list = [players_from(episodes_js) for _, _, episodes_js in pages]
+
+    number_of_episodes_max = max(len(episodes_page) for episodes_page in players_list)
+
+    episodes_names = [
+        episode_names(
+            html,
+            f"{season_url}{lang_id}/",
+            len(episodes_page),
+            number_of_episodes_max,
+        )
+        for (lang_id, html, _), episodes_page in zip(pages, players_list)
+    ]
+
+    return reduce(
+        _extend_episodes,
+        zip((lang_id for lang_id, _, _ in pages), episodes_names, players_list),
+        [],
+    )
+
+
+class ParseExecutor:
+    """
+    Parse the pages received by the attached clients in a pool of processes, so
+    the event loop only waits for the network and a crawl of thousands of pages
+    can parse on every core. The pages are sent as text and only the records
+    come back. Use it as a context manager, or call `shutdown`.
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self.max_workers = max_workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Created on first use, a client can be attached long before parsing
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.max_workers)
+        return self._pool
+
+    def attach(self, client: AsyncClient) -> AsyncClient:
+        _executors[client] = self
+        return client
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.pool, function, *args
+        )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "ParseExecutor":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.shutdown()
+
+
+def _timed(function: Callable[..., T], *args: Any) -> tuple[T, float]:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+async def parse(
+    client: AsyncClient, page: str, function: Callable[..., T], *args: Any
+) -> T:
+    """
+    Run a parsing function in the executor of the client, or right away. Only the
+    parsing itself is timed as `page`, not the wait for a worker.
+    """
+    executor = _executors.get(client)
+    if executor is None:
+        with parse_timer(client, page):
+            return function(*args)
+
+    result, duration = await executor.run(_timed, function, *args)
+    record_parse_time(client, page, duration)
+    return result
@@ -0,0 +1,131 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+# (part of the file name or of the function name, kind of work)
+_KINDS = (
+    ("/httpx/", "network"),
+    ("/httpcore/", "network"),
+    ("/h11/", "network"),
+    ("/h2/", "network"),
+    ("/anyio/", "network"),
+    ("ssl", "network"),
+    ("socket", "network"),
+    # Waiting for the network in the event loop
+    ("selectors.py", "network"),
+    ("select.", "network"),
+    ("_sre", "regex"),
+    ("re.Pattern", "regex"),
+    ("/re/", "regex"),
+    ("/re.py", "regex"),
+    ("sre_", "regex"),
+)
+_MODEL_FILES = ("catalogue.py", "season.py", "episode.py", "langs.py", "top_level.py")
+_MODEL_FUNCTIONS = ("__init__", "__post_init__", "__new__", "__setitem__")
+KINDS = ("network", "regex", "parsing", "models", "other")
+
+
+def kind_of(filename: str, function: str) -> str:
+    """What a profiled function spends time on."""
+    filename = filename.replace("\\", "/")
+    for pattern, kind in _KINDS:
+        if pattern in filename or pattern in function:
+            return kind
+
+    # The rest of the library reads the pages, the CLI and the fake site don't
+    if "/anime_sama_api/" in filename and not any(
+        package in filename for package in ("/cli/", "/testing/")
+    ):
+        if filename.endswith(_MODEL_FILES) and function in _MODEL_FUNCTIONS:
+            return "models"
+        return "parsing"
+    return "other"
+
+
+def time_by_kind(stats: pstats.Stats) -> dict[str, float]:
+    """The own time of the functions, summed by kind of work."""
+    times = dict.fromkeys(KINDS, 0.0)
+    for (filename, _, function), (_, _, own_time, _, _) in stats.stats.items():  # type: ignore
+        times[kind_of(filename, function)] += own_time
+    return times
+
+
+def format_report(
+    label: str,
+    wall_time: float,
+    stats: pstats.Stats,
+    snapshot: tracemalloc.Snapshot,
+    peak: int,
+    top: int = 25,
+) -> str:
+    times = time_by_kind(stats)
+    total = sum(times.values()) or 1
+
+    lines = [f"Profile of {label}: {wall_time:.3f}s", "", "Time by kind of work:"]
+    lines += [
+        f"  {kind:<15}{seconds:>9.3f}s {seconds / total:>6.1%}"
+        for kind, seconds in times.items()
+    ]
+    lines += ["", f"Memory peak: {peak / 1024 / 1024:.1f} MiB", ""]
+
+    lines.append(f"Top {top} allocations:")
+    lines += [
+        f"  {statistic.size / 1024:>9.1f} KiB {statistic.count:>7} blocks  {statistic.traceback}"
+        for statistic in snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            )
+        ).statistics("lineno")[:top]
+    ]
+
+    output = io.StringIO()
+    stats.stream = output  # type: ignore
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    lines += ["", output.getvalue().strip()]
+
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def profile(path: Path | str, label: str = "", top: int = 25) -> Iterator[None]:
+    """
+    Profile what runs in the block with cProfile and tracemalloc, then write a
+    report to `path`: time spent in the network, in regexes, in the rest of the
+    parsing, in building the models and elsewhere, memory allocations and the
+    slowest functions. The raw cProfile stats are saved next to it, with .prof
+    appended to its name so they never replace the report.
+
+    Only the current thread is profiled, which is the one of the event loop.
+    """
+    path = Path(path)
+    profiler = cProfile.Profile()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall_time = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not was_tracing:
+            tracemalloc.stop()
+
+        stats = pstats.Stats(profiler)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(path.with_name(path.name + ".prof"))
+        path.write_text(
+            format_report(label or path.stem, wall_time, stats, snapshot, peak, top),
+            encoding="utf-8",
+        )
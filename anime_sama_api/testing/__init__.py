@@ -0,0 +1,22 @@
+"""Helpers to run code using the library without the real site."""
+
+from .cassette import (
+    Cassette,
+    CassetteMiss,
+    Interaction,
+    RecordingTransport,
+    ReplayTransport,
+    client_from_env,
+)
+from .fake_site import FakeSite, FakeSiteServer
+
+__all__ = [
+    "Cassette",
+    "CassetteMiss",
+    "FakeSite",
+    "FakeSiteServer",
+    "Interaction",
+    "RecordingTransport",
+    "ReplayTransport",
+    "client_from_env",
+]
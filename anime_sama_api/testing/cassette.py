@@ -0,0 +1,224 @@
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Literal
+
+import httpx
+
+
+# Decoded bodies are stored, these headers would not match them anymore
+_IGNORED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class CassetteMiss(httpx.TransportError):
+    """The request was not recorded in the cassette."""
+
+
+@dataclass
+class Interaction:
+    method: str
+    url: str
+    status_code: int
+    headers: dict[str, str] = field(default_factory=dict)
+    text: str | None = None
+    base64: str | None = None
+    # Seconds between the request and the end of the response when recorded
+    elapsed: float = 0.0
+
+    @property
+    def content(self) -> bytes:
+        if self.text is not None:
+            return self.text.encode()
+        return base64.b64decode(self.base64 or "")
+
+    @classmethod
+    def from_response(
+        cls, response: httpx.Response, content: bytes, elapsed: float
+    ) -> "Interaction":
+        try:
+            text, encoded = content.decode(), None
+        except UnicodeDecodeError:
+            text, encoded = None, base64.b64encode(content).decode()
+
+        return cls(
+            method=response.request.method,
+            url=str(response.request.url),
+            status_code=response.status_code,
+            headers={
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in _IGNORED_HEADERS
+            },
+            text=text,
+            base64=encoded,
+            elapsed=round(elapsed, 4),
+        )
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            self.status_code,
+            headers=self.headers,
+            content=self.content,
+            request=request,
+        )
+
+
+class Cassette:
+    """Recorded HTTP interactions, saved as a JSON file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.interactions: list[Interaction] = []
+        if path.is_file():
+            self.interactions = [
+                Interaction(**interaction)
+                for interaction in json.loads(path.read_text(encoding="utf-8"))
+            ]
+
+    def append(self, interaction: Interaction) -> None:
+        self.interactions.append(interaction)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(
+            json.dumps(
+                [asdict(interaction) for interaction in self.interactions],
+                ensure_ascii=False,
+                indent=1,
+            ),
+            encoding="utf-8",
+        )
+        temporary.replace(self.path)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Forward the requests to `transport` and record them into the cassette, which is
+    saved when the transport is closed.
+    """
+
+    def __init__(
+        self, cassette: Cassette, transport: httpx.AsyncBaseTransport | None = None
+    ) -> None:
+        self.cassette = cassette
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        # A response read through the transport is not decoded yet
+        response = httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=response.stream,
+            request=request,
+            extensions=response.extensions,
+        )
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+
+        interaction = Interaction.from_response(
+            response, response.content, time.perf_counter() - start
+        )
+        self.cassette.append(interaction)
+
+        return interaction.to_response(request)
+
+    async def aclose(self) -> None:
+        try:
+            if self.cassette.interactions:
+                self.cassette.save()
+        finally:
+            await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serve the responses of a cassette without any network access.
+    Requests are matched on method and URL; a request made several times gets the
+    recorded responses in order, then the last one again.
+
+    `latency` is added before each response: a number of seconds, or "recorded" to
+    reproduce the timing of the recording. `jitter` spreads it by that fraction.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: float | Literal["recorded"] = 0.0,
+        jitter: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+
+        self._interactions: dict[tuple[str, str], list[Interaction]] = {}
+        for interaction in cassette.interactions:
+            self._interactions.setdefault(
+                (interaction.method, interaction.url), []
+            ).append(interaction)
+        self._served: dict[tuple[str, str], int] = {}
+
+    def _delay(self, interaction: Interaction) -> float:
+        delay = interaction.elapsed if self.latency == "recorded" else self.latency
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request.method, str(request.url)
+        if key not in self._interactions:
+            raise CassetteMiss(f"{request.method} {request.url} was not recorded")
+
+        interactions = self._interactions[key]
+        index = self._served.get(key, 0)
+        self._served[key] = index + 1
+        interaction = interactions[min(index, len(interactions) - 1)]
+
+        delay = self._delay(interaction)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return interaction.to_response(request)
+
+
+def client_from_env(
+    cassette_path: Path,
+    transport: httpx.AsyncBaseTransport | None = None,
+    **kwargs: object,
+) -> httpx.AsyncClient:
+    """
+    Return a client whose network depends on the ANIME_SAMA_HTTP variable:
+    "live" uses the network, "record" uses it and saves into the cassette when the
+    client is closed, and "replay" only serves the cassette. When unset, the cassette
+    is replayed if it exists. ANIME_SAMA_LATENCY sets the replay latency ("recorded"
+    or seconds). `transport` replaces the network in the live and record modes.
+    """
+    mode = os.environ.get("ANIME_SAMA_HTTP") or (
+        "replay" if cassette_path.is_file() else "live"
+    )
+    match mode:
+        case "live":
+            return httpx.AsyncClient(transport=transport, **kwargs)  # type: ignore
+        case "record":
+            return httpx.AsyncClient(
+                transport=RecordingTransport(Cassette(cassette_path), transport),
+                **kwargs,  # type: ignore
+            )
+        case "replay":
+            latency = os.environ.get("ANIME_SAMA_LATENCY", "0")
+            return httpx.AsyncClient(
+                transport=ReplayTransport(
+                    Cassette(cassette_path),
+                    latency="recorded" if latency == "recorded" else float(latency),
+                ),
+                **kwargs,  # type: ignore
+            )
+        case _:
+            raise ValueError(
+                f"ANIME_SAMA_HTTP should be live, record or replay, not {mode!r}"
+            )
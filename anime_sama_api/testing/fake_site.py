@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+from ..top_level import WEEKDAYS
+
+
+GENRES = ["Action", "Aventure", "Comédie", "Drame", "Fantastique", "Shônen"]
+
+
+@dataclass
+class FakeResponse:
+    status_code: int
+    headers: dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+
+
+class FakeSite:
+    """
+    Generate a synthetic anime-sama in the formats the parsers expect, of any size.
+    Catalogues are named "Serie <n>", their seasons "Saison <n>" and every episode
+    has `players` fake players serving `video_size` bytes of fake video.
+
+    Each response is delayed by `latency` seconds and fails with a 503 with a
+    probability of `error_rate`. The same `seed` always gives the same site.
+    """
+
+    def __init__(
+        self,
+        catalogues: int = 100,
+        seasons: int = 2,
+        episodes: int = 12,
+        languages: tuple[str, ...] = ("vostfr", "vf"),
+        players: int = 2,
+        page_size: int = 48,
+        video_size: int = 1024 * 1024,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.catalogues = catalogues
+        self.seasons = seasons
+        self.episodes = episodes
+        self.languages = languages
+        self.players = players
+        self.page_size = page_size
+        self.video_size = video_size
+        self.latency = latency
+        self.error_rate = error_rate
+
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self.requests = 0
+
+    @staticmethod
+    def slug(number: int) -> str:
+        return f"serie-{number}"
+
+    @staticmethod
+    def name(number: int) -> str:
+        return f"Serie {number}"
+
+    def _card(self, url: str, image: str, *lines: str) -> str:
+        # One value per line, right after a tag, like the parsers read them
+        return "\n".join(
+            [f'<a href="{url}">', f'<img src="{image}" alt="">{lines[0]}']
+            + [f"<p>{line}" for line in lines[1:]]
+            + ["</a>"]
+        )
+
+    def _search_page(self, site: str, query: str, page: int) -> str:
+        numbers = [
+            number
+            for number in range(1, self.catalogues + 1)
+            if query.lower() in self.name(number).lower()
+        ]
+        last_page = max(-(-len(numbers) // self.page_size), 1)
+        numbers = numbers[(page - 1) * self.page_size : page * self.page_size]
+
+        cards = [
+            self._card(
+                f"{site}catalogue/{self.slug(number)}/",
+                f"{site}img/{self.slug(number)}.jpg",
+                self.name(number),
+                f"Alt {number}",
+                " - ".join(GENRES[number % len(GENRES) : number % len(GENRES) + 2]),
+                "Anime",
+                "VOSTFR, VF" if "vf" in self.languages else "VOSTFR",
+            )
+            for number in numbers
+        ]
+        pagination = " ".join(
+            f'<a href="?search={query}&page={number}">{number}</a>'
+            for number in range(1, last_page + 1)
+        )
+        return "\n".join(["<html><body>"] + cards + [pagination, "</body></html>"])
+
+    def _catalogue_page(self, number: int) -> str:
+        seasons = "\n".join(
+            f'panneauAnime("Saison {season}", "saison{season}/vostfr");'
+            for season in range(1, self.seasons + 1)
+        )
+        return (
+            f"<html><body><h4>{self.name(number)}</h4>\n"
+            f"<p>Synopsis</p>\n<p>Synopsis of {self.name(number)}</p>\n"
+            "<p>Avancement : <span>Aucune donnée.</span></p>\n"
+            "<p>Correspondance : <span>Aucune donnée.</span></p>\n"
+            f"<script>\n{seasons}\n</script></body></html>"
+        )
+
+    def _filever(self, number: int, season: int, lang_id: str) -> int:
+        return number * 1000 + season * 10 + self.languages.index(lang_id)
+
+    def _season_page(self, site: str, number: int, season: int, lang_id: str) -> str:
+        return (
+            "<html><body>\n"
+            f'<img src="{site}img/flag_jp.png">\n<p>VO</p>\n'
+            f'<script src="episodes.js?filever={self._filever(number, season, lang_id)}"></script>\n'
+            f"<script>resetListe();\n\tcreerListe(1, {self.episodes});\n}}</script>\n"
+            "</body></html>"
+        )
+
+    def player_url(
+        self,
+        site: str,
+        number: int,
+        season: int,
+        lang_id: str,
+        episode: int,
+        player: int,
+    ) -> str:
+        return f"{site}videos/{self.slug(number)}-{season}-{lang_id}-{episode}-{player}.mp4"
+
+    def _episodes_js(self, site: str, number: int, season: int, lang_id: str) -> str:
+        return "\n".join(
+            f"var eps{player} = ["
+            + ", ".join(
+                f"'{self.player_url(site, number, season, lang_id, episode, player)}'"
+                for episode in range(1, self.episodes + 1)
+            )
+            + "];"
+            for player in range(1, self.players + 1)
+        )
+
+    def _homepage(self, site: str) -> str:
+        # The last seasons got a new episode, the newest first
+        releases = [
+            self._card(
+                f"{site}catalogue/{self.slug(number)}/saison{self.seasons}/vostfr/",
+                f"{site}img/{self.slug(number)}.jpg",
+                self.name(number),
+                "Anime",
+                "VOSTFR",
+                f"Episode {self.episodes}",
+            )
+            for number in range(1, min(self.catalogues, 10) + 1)
+        ]
+        classics = [
+            f'<a href="{site}catalogue/{self.slug(number)}/">'
+            f'<img src="{site}img/{self.slug(number)}.jpg"><h1>{self.name(number)}</h1></a>'
+            for number in range(1, min(self.catalogues, 5) + 1)
+        ]
+        planning = [
+            f"<h2>{day}</h2>\n"
+            + "\n".join(
+                f'<script>cartePlanningAnime("{self.name(number)}", '
+                f'"{self.slug(number)}/saison{self.seasons}/vostfr");</script>'
+                for number in range(1, self.catalogues + 1)
+                if number % len(WEEKDAYS) == index
+            )
+            for index, day in enumerate(WEEKDAYS)
+        ]
+        return "\n".join(
+            ["<html><body>", "<!-- AJOUTS ANIMES -->"]
+            + releases
+            # The new episodes are read from their section and the 3 next ones
+            + ["<!-- DERNIERS AJOUTS -->", "<!-- BOUTONS -->", "<!-- FIN AJOUTS -->"]
+            + ["<!-- CLASSIQUES -->"]
+            + classics
+            + ["<!-- PLANNING -->"]
+            + planning
+            + ["<!-- FIN -->", "</body></html>"]
+        )
+
+    def video(self, name: str) -> bytes:
+        pattern = hashlib.sha256(name.encode()).digest()
+        return (pattern * (self.video_size // len(pattern) + 1))[: self.video_size]
+
+    def _video_response(self, name: str, range_header: str | None) -> FakeResponse:
+        video = self.video(name)
+        headers = {"Content-Type": "video/mp4", "Accept-Ranges": "bytes"}
+
+        match_range = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header or "")
+        if match_range is None:
+            return FakeResponse(200, headers, video)
+
+        start = int(match_range.group(1))
+        end = min(int(match_range.group(2) or len(video) - 1), len(video) - 1)
+        if start >= len(video):
+            return FakeResponse(416, {"Content-Range": f"bytes */{len(video)}"})
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(video)}"
+        return FakeResponse(206, headers, video[start : end + 1])
+
+    def _fails(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def respond(self, site: str, path: str, query: str, headers: Any) -> FakeResponse:
+        """Return the response to a request, `site` is the URL of the site root."""
+        if self._fails():
+            return FakeResponse(503, {}, b"Service Unavailable")
+
+        html = {"Content-Type": "text/html; charset=utf-8"}
+        params = {name: values[0] for name, values in parse_qs(query).items()}
+
+        if path == "/":
+            return FakeResponse(200, html, self._homepage(site).encode())
+        if path == "/catalogue/":
+            page = self._search_page(
+                site, params.get("search", ""), int(params.get("page", 1))
+            )
+            return FakeResponse(200, html, page.encode())
+
+        if match_video := re.fullmatch(r"/videos/(.+)\.mp4", path):
+            return self._video_response(match_video.group(1), headers.get("Range"))
+
+        match_path = re.fullmatch(
+            r"/catalogue/serie-(\d+)/(?:saison(\d+)/(?:(\w+)/(episodes\.js)?)?)?", path
+        )
+        if match_path is None:
+            return FakeResponse(404)
+
+        number, season, lang_id, episodes_js = match_path.groups()
+        if not 1 <= int(number) <= self.catalogues:
+            return FakeResponse(404)
+        if season is None:
+            return FakeResponse(200, html, self._catalogue_page(int(number)).encode())
+        if (
+            not 1 <= int(season) <= self.seasons
+            or lang_id is None
+            or lang_id not in self.languages
+        ):
+            return FakeResponse(404)
+
+        if episodes_js:
+            content = self._episodes_js(site, int(number), int(season), lang_id)
+            return FakeResponse(
+                200, {"Content-Type": "text/javascript"}, content.encode()
+            )
+        content = self._season_page(site, int(number), int(season), lang_id)
+        return FakeResponse(200, html, content.encode())
+
+    async def handle_async(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        response = self.respond(
+            f"{request.url.scheme}://{request.url.netloc.decode()}/",
+            request.url.path,
+            request.url.query.decode(),
+            request.headers,
+        )
+        return httpx.Response(
+            response.status_code, headers=response.headers, content=response.content
+        )
+
+    def transport(self) -> httpx.MockTransport:
+        """Serve the site to an AsyncClient without any socket."""
+        return httpx.MockTransport(self.handle_async)
+
+
+class FakeSiteRequestHandler(BaseHTTPRequestHandler):
+    server: "FakeSiteServer"
+
+    def do_GET(self) -> None:
+        site = self.server.site
+        if site.latency:
+            time.sleep(site.latency)
+
+        url = urlsplit(self.path)
+        response = site.respond(self.server.url, url.path, url.query, self.headers)
+        self.send_response(response.status_code)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(response.content)))
+        self.end_headers()
+        self.wfile.write(response.content)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class FakeSiteServer(ThreadingHTTPServer):
+    """Serve a FakeSite over HTTP, for tools like yt-dlp that need a real server."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, site: FakeSite, address: tuple[str, int] = ("127.0.0.1", 0)
+    ) -> None:
+        super().__init__(address, FakeSiteRequestHandler)
+        self.site = site
+        self._thread = Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/"
+
+    def start(self) -> "FakeSiteServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a fake anime-sama")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--catalogues", type=int, default=1000)
+    parser.add_argument("--seasons", type=int, default=2)
+    parser.add_argument("--episodes", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    arguments = parser.parse_args()
+
+    server = FakeSiteServer(
+        FakeSite(
+            catalogues=arguments.catalogues,
+            seasons=arguments.seasons,
+            episodes=arguments.episodes,
+            latency=arguments.latency,
+            error_rate=arguments.error_rate,
+        ),
+        ("127.0.0.1", arguments.port),
+    )
+    print(f"Serving a fake anime-sama on {server.url}")
+    server.serve_forever()
@@ -1,22 +1,65 @@
 import asyncio
-from collections.abc import AsyncIterator, Generator
+from collections.abc import AsyncIterator, Awaitable, Callable, Generator, Iterable
 from html import unescape
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property
 import logging
 import re
-from typing import Any, cast
+import time
+from typing import Any, Literal, TypeVar, cast, get_args
 
-from httpx import AsyncClient
+from httpx import AsyncClient, Response
 
 from .episode import Episode
 from .season import Season
-from .langs import Lang, flags
-from .utils import filter_literal, is_Literal
+from .langs import Lang, LangId, flags, lang2ids
+from .limits import request_slots
+from .metrics import parse_timer
+from .parsing import CatalogueCard, catalogue_cards, parse
+from .utils import filter_literal, is_Literal, remove_some_js_comments
 from .catalogue import Catalogue, Category
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+class PartialResults(list[T]):
+    """
+    Results of a search with a deadline, `missing` is what arrived too late.
+    Only the searches have a deadline, they are the operations spread over many
+    pages. The other ones, like `new_episodes`, fetch a single page and wait for it.
+    """
+
+    def __init__(self, results: Iterable[T] = (), missing: Iterable[str] = ()) -> None:
+        super().__init__(results)
+        self.missing = list(missing)
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+@dataclass
+class ResolvedSeason:
+    season: Season
+    episodes: list[Episode] = field(default_factory=list)
+    error: Exception | None = None
+
+
+@dataclass
+class ResolvedCatalogue:
+    catalogue: Catalogue
+    seasons: list[ResolvedSeason] = field(default_factory=list)
+    error: Exception | None = None
+
+    @property
+    def errors(self) -> list[Exception]:
+        """The error of the catalogue and the ones of its seasons."""
+        errors = [self.error] if self.error is not None else []
+        return errors + [season.error for season in self.seasons if season.error]
+
 
 @dataclass(frozen=True)
 class EpisodeRelease:
@@ -26,83 +69,423 @@ class EpisodeRelease:
     categories: tuple[Category]
     language: Lang
     descriptive: str
+    anime_sama: "AnimeSama | None" = field(default=None, compare=False, repr=False)
 
-    def get_real_episodes(self) -> list[Episode]:
-        raise NotImplementedError
+    @property
+    def catalogue_url(self) -> str:
+        site_url, path = self.page_url.split("/catalogue/", 1)
+        return f"{site_url}/catalogue/{path.split('/')[0]}/"
+
+    @property
+    def season_url(self) -> str:
+        parts = self.page_url.rstrip("/").split("/")
+        if parts[-1] in get_args(LangId):
+            parts = parts[:-1]
+        return "/".join(parts) + "/"
+
+    @property
+    def lang_ids(self) -> set[LangId]:
+        lang_ids = set(lang2ids.get(self.language, []))
+        url_lang_id = self.page_url.rstrip("/").split("/")[-1]
+        if url_lang_id in get_args(LangId):
+            lang_ids.add(cast(LangId, url_lang_id))
+        return lang_ids
+
+    @property
+    def episode_numbers(self) -> set[int]:
+        match_range = re.search(r"(\d+) *(?:à|-) *(\d+)", self.descriptive)
+        if match_range is not None:
+            start, end = map(int, match_range.groups())
+            return set(range(start, end + 1))
+
+        numbers = re.findall(r"\d+", self.descriptive)
+        return {int(numbers[-1])} if numbers else set()
+
+    def is_release_of(self, episode: Episode) -> bool:
+        if not any(episode.languages.get(lang_id) for lang_id in self.lang_ids):
+            return False
+        if episode.name == self.descriptive.strip():
+            return True
+
+        match_number = re.search(r"(\d+)$", episode.name)
+        return (
+            match_number is not None
+            and int(match_number.group(1)) in self.episode_numbers
+        )
+
+    async def get_real_episodes(self) -> list[Episode]:
+        """
+        Return the episodes of the season corresponding to this release.
+        Releases from the same AnimeSama share the resolved seasons.
+        """
+        anime_sama = self.anime_sama or AnimeSama(
+            self.catalogue_url.split("catalogue/")[0]
+        )
+        episodes = await anime_sama.season_episodes(
+            self.season_url,
+            Catalogue(
+                self.catalogue_url,
+                name=self.serie_name,
+                categories=set(self.categories),
+                client=anime_sama.client,
+            ),
+        )
+        return [episode for episode in episodes if self.is_release_of(episode)]
 
     @property
     def fancy_name(self) -> str:
         return f"{self.serie_name} - {self.descriptive} {flags.get(self.language, '')}"
 
 
-class AnimeSama:
-    def __init__(self, site_url: str, client: AsyncClient | None = None) -> None:
-        self.site_url = site_url
-        self.client = client or AsyncClient()
+WEEKDAYS = ("Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche")
 
-    async def _get_homepage_section(self, section_name: str, how_many: int = 1) -> str:
-        homepage = await self.client.get(self.site_url)
 
-        if not homepage.is_success:
-            return ""
+class HomePage:
+    """
+    The homepage indexed once by its comment-delimited sections.
+    Each getter parses its section only the first time it is accessed.
+    """
 
-        sections = homepage.text.split("<!--")
-        for index, section in enumerate(sections):
-            comment_end_pos = section.find("-->")
-            if section_name in section[:comment_end_pos]:
-                return "<!--" + "<!--".join(sections[index : index + how_many])
+    def __init__(self, anime_sama: "AnimeSama", html: str) -> None:
+        self.anime_sama = anime_sama
+        self.html = html
 
+        # (comment, html from this comment to the next one)
+        self._sections: list[tuple[str, str]] = []
+        starts = [match.start() for match in re.finditer("<!--", html)]
+        for start, end in zip(starts, starts[1:] + [len(html)]):
+            comment_end = html.find("-->", start, end)
+            comment = html[start + 4 : comment_end if comment_end != -1 else end]
+            self._sections.append((comment.lower(), html[start:end]))
+
+    def section(self, *names: str, how_many: int = 1) -> str:
+        """Return the first section whose comment contains one of `names`."""
+        for index, (comment, _) in enumerate(self._sections):
+            if any(name.lower() in comment for name in names):
+                return "".join(
+                    section for _, section in self._sections[index : index + how_many]
+                )
         return ""
 
-    def _yield_catalogues_from(self, html: str) -> Generator[Catalogue]:
-        text_without_script = re.sub(r"<script[\W\w]+?</script>", "", html)
+    def _yield_section_catalogues(self, html: str) -> Generator[Catalogue]:
+        seen = set()
         for match in re.finditer(
-            rf"href=\"({self.site_url}catalogue/.+)\"[\W\w]+?src=\"(.+?)\"[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<",
-            text_without_script,
+            rf"href=\"({self.anime_sama.site_url}catalogue/[^/\"]+/?)[^\"]*\"[\W\w]*?src=\"(.+?)\"[\W\w]*?<(?:h\d|p)[^>]*>(.*?)<",
+            html,
         ):
-            (
+            url, image_url, name = match.groups()
+            if url.rstrip("/") in seen:
+                continue
+            seen.add(url.rstrip("/"))
+
+            yield Catalogue(
+                url=url,
+                name=unescape(name.strip()),
+                image_url=image_url,
+                client=self.anime_sama.client,
+            )
+
+    @cached_property
+    def new_episodes(self) -> list[EpisodeRelease]:
+        section = self.section("ajouts animes", how_many=4)
+        with parse_timer(self.anime_sama.client, "homepage"):
+            release_episodes = list(
+                self.anime_sama._yield_release_episodes_from(section)
+            )
+        return list(reversed(release_episodes))
+
+    @cached_property
+    def new_content(self) -> list[Catalogue]:
+        section = self.section("derniers contenus", "sorties")
+        with parse_timer(self.anime_sama.client, "homepage"):
+            return list(self._yield_section_catalogues(section))
+
+    @cached_property
+    def classics(self) -> list[Catalogue]:
+        section = self.section("classique")
+        with parse_timer(self.anime_sama.client, "homepage"):
+            return list(self._yield_section_catalogues(section))
+
+    @cached_property
+    def highlights(self) -> list[Catalogue]:
+        section = self.section("pépites", "pepites", "découvr", "decouvr")
+        with parse_timer(self.anime_sama.client, "homepage"):
+            return list(self._yield_section_catalogues(section))
+
+    def _yield_planning_seasons(self, html: str) -> Generator[Season]:
+        urls = set()
+        # Either a script call like cartePlanningAnime("name", "url") or a link
+        for match in re.finditer(
+            rf"cartePlanning\w*\(\s*\"(?P<name>.+?)\", *\"(?P<script_path>.+?)\"|href=\"{self.anime_sama.site_url}catalogue/(?P<href_path>.+?)\"",
+            html,
+        ):
+            path = match["script_path"] or match["href_path"]
+            parts = [part for part in path.split("/") if part]
+            if parts and parts[-1] in get_args(LangId):
+                parts.pop()
+            if len(parts) < 2:  # Not a season
+                continue
+
+            url = f"{self.anime_sama.site_url}catalogue/{parts[0]}/{parts[1]}/"
+            if url in urls:
+                continue
+            urls.add(url)
+
+            yield Season(
                 url,
-                image_url,
-                name,
-                alternative_names_str,
-                genres_str,
-                categories_str,
-                languages_str,
-            ) = (unescape(item) for item in match.groups())
-
-            alternative_names = (
-                alternative_names_str.split(", ") if alternative_names_str else []
+                serie_name=unescape(match["name"] or ""),
+                client=self.anime_sama.client,
+            )
+
+    @cached_property
+    def planning(self) -> list[list[Season]]:
+        """The seasons released each day of the week, starting on monday."""
+        with parse_timer(self.anime_sama.client, "homepage"):
+            section = remove_some_js_comments(self.section("planning"))
+
+            planning: list[list[Season]] = []
+            for index, day in enumerate(WEEKDAYS):
+                start = section.find(day)
+                if start == -1:
+                    planning.append([])
+                    continue
+
+                next_days = (
+                    section.find(next_day, start + len(day))
+                    for next_day in WEEKDAYS[index + 1 :]
+                )
+                end = min((pos for pos in next_days if pos != -1), default=len(section))
+                planning.append(list(self._yield_planning_seasons(section[start:end])))
+
+        return planning
+
+
+def _failed(task: asyncio.Task[Any]) -> bool:
+    return task.done() and (task.cancelled() or task.exception() is not None)
+
+
+def _expired(cached: tuple[float, asyncio.Task[Any]], now: float, ttl: float) -> bool:
+    """A task still running is kept so it stays shared by the callers awaiting it."""
+    created, task = cached
+    return task.done() and (now - created > ttl or _failed(task))
+
+
+class AnimeSama:
+    def __init__(
+        self,
+        site_url: str,
+        client: AsyncClient | None = None,
+        season_cache_ttl: float = 60,
+    ) -> None:
+        self.site_url = site_url
+        self.client = client or AsyncClient()
+
+        self.season_cache_ttl = season_cache_ttl
+        self._seasons_cache: dict[str, tuple[float, asyncio.Task[list[Season]]]] = {}
+        self._episodes_cache: dict[str, tuple[float, asyncio.Task[list[Episode]]]] = {}
+        self._pruned_at = time.monotonic()
+
+        self._homepage = ""
+        self._homepage_validators: dict[str, str] = {}
+        self._homepage_parsed: HomePage | None = None
+
+    async def _get_homepage(self) -> str:
+        """
+        Fetch the homepage with a conditional request so polling an unchanged
+        homepage only cost a 304 response.
+        """
+        response = await self.client.get(
+            self.site_url, headers=self._homepage_validators
+        )
+
+        if response.status_code == 304:
+            return self._homepage
+        if not response.is_success:
+            return ""
+
+        self._homepage = response.text
+        self._homepage_validators = {}
+        if "ETag" in response.headers:
+            self._homepage_validators["If-None-Match"] = response.headers["ETag"]
+        if "Last-Modified" in response.headers:
+            self._homepage_validators["If-Modified-Since"] = response.headers[
+                "Last-Modified"
+            ]
+
+        return self._homepage
+
+    async def _cached(
+        self,
+        cache: dict[str, tuple[float, asyncio.Task[T]]],
+        key: str,
+        factory: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Share the result of `factory` for `season_cache_ttl` seconds."""
+        self._prune()
+        cached = cache.get(key)
+        if (
+            cached is None
+            or time.monotonic() - cached[0] > self.season_cache_ttl
+            or _failed(cached[1])
+        ):
+            cached = time.monotonic(), asyncio.ensure_future(factory())
+            cache[key] = cached
+
+        try:
+            return await cached[1]
+        except Exception:
+            if cache.get(key) is cached:
+                del cache[key]
+            raise
+
+    def _prune(self) -> None:
+        """
+        Forget the expired seasons and episodes, and the failed ones, at most once
+        per `season_cache_ttl`.
+        """
+        now = time.monotonic()
+        if now - self._pruned_at <= self.season_cache_ttl:
+            return
+        self._pruned_at = now
+
+        # In place, the callers of `_cached` hold the caches
+        for cache in (self._seasons_cache, self._episodes_cache):
+            for key in [
+                key
+                for key, cached in cache.items()
+                if _expired(cached, now, self.season_cache_ttl)
+            ]:
+                del cache[key]
+
+    async def season_episodes(
+        self, season_url: str, catalogue: Catalogue | None = None
+    ) -> list[Episode]:
+        """
+        Return the episodes of a season from its URL.
+        The result is cached so many releases of the same season only resolve it once.
+        """
+        if catalogue is None:
+            catalogue = Catalogue(
+                season_url.rstrip("/").rsplit("/", 1)[0], client=self.client
             )
-            if " - " in genres_str:
-                genres = genres_str.split(" - ")
-            else:
-                genres = genres_str.split(", ") if genres_str else []
-            categories = categories_str.split(", ") if categories_str else []
-            languages = languages_str.split(", ") if languages_str else []
+
+        async def get_season() -> Season:
+            # The catalogue gives the real names of the serie and the season
+            seasons = await self._cached(
+                self._seasons_cache, catalogue.url, catalogue.seasons
+            )
+            for season in seasons:
+                if season.url == season_url:
+                    return season
+            return Season(season_url, serie_name=catalogue.name, client=self.client)
+
+        async def get_episodes() -> list[Episode]:
+            return await (await get_season()).episodes()
+
+        return await self._cached(self._episodes_cache, season_url, get_episodes)
+
+    async def resolve_many(
+        self,
+        urls: Iterable[str],
+        depth: Literal["seasons", "episodes"] = "episodes",
+        concurrency: int = 8,
+    ) -> list[ResolvedCatalogue]:
+        """
+        Resolve the seasons of many catalogues, and their episodes with the
+        "episodes" depth. Duplicate URLs are resolved once and the whole batch
+        sends at most `concurrency` requests at the same time. A failure is kept in
+        the `error` of its catalogue or season instead of being raised.
+        """
+
+        async def resolve_season(season: Season) -> ResolvedSeason:
+            try:
+                episodes = await self._cached(
+                    self._episodes_cache, season.url, season.episodes
+                )
+            except Exception as exception:
+                return ResolvedSeason(season, error=exception)
+            return ResolvedSeason(season, episodes)
+
+        async def resolve_catalogue(url: str) -> ResolvedCatalogue:
+            catalogue = Catalogue(url, client=self.client)
+
+            async def get_seasons() -> list[Season]:
+                seasons = await catalogue.seasons()
+                # A catalogue that cannot be fetched has an empty page
+                if not seasons and not await catalogue.page():
+                    raise LookupError(f"Cannot get the page of {catalogue.url}")
+                return seasons
+
+            try:
+                seasons = await self._cached(
+                    self._seasons_cache, catalogue.url, get_seasons
+                )
+            except Exception as exception:
+                return ResolvedCatalogue(catalogue, error=exception)
+
+            if depth == "seasons":
+                return ResolvedCatalogue(
+                    catalogue, [ResolvedSeason(season) for season in seasons]
+                )
+            return ResolvedCatalogue(
+                catalogue,
+                list(await asyncio.gather(*map(resolve_season, seasons))),
+            )
+
+        unique_urls = dict.fromkeys(
+            url if url.endswith("/") else url + "/" for url in urls
+        )
+        # The limit is on the requests themselves, not on the catalogues or seasons
+        # that each send several of them
+        token = request_slots.set(asyncio.Semaphore(concurrency))
+        try:
+            return list(await asyncio.gather(*map(resolve_catalogue, unique_urls)))
+        finally:
+            request_slots.reset(token)
+
+    async def homepage(self) -> HomePage:
+        """
+        Fetch and index the homepage. All the homepage getters can be called on the
+        result for the cost of one request.
+        """
+        html = await self._get_homepage()
+        # An unchanged homepage doesn't need to be parsed again
+        if self._homepage_parsed is None or self._homepage_parsed.html is not html:
+            # Only split at its comments, the getters time the parsing of their section
+            self._homepage_parsed = HomePage(self, html)
+        return self._homepage_parsed
+
+    def _catalogues_from(self, cards: list[CatalogueCard]) -> Generator[Catalogue]:
+        for card in cards:
 
             def not_in_literal(value: Any) -> None:
                 logger.warning(
-                    f"Error while parsing '{value}'. \nPlease report this to the developer with URL: {url}"
+                    f"Error while parsing '{value}'. \nPlease report this to the developer with URL: {card.url}"
                 )
 
             categories_checked = cast(
-                set[Category], set(filter_literal(categories, Category, not_in_literal))
+                set[Category],
+                set(filter_literal(card.categories, Category, not_in_literal)),
             )
             languages_checked = cast(
-                set[Lang], set(filter_literal(languages, Lang, not_in_literal))
+                set[Lang], set(filter_literal(card.languages, Lang, not_in_literal))
             )
 
             yield Catalogue(
-                url=url,
-                name=name,
-                alternative_names=alternative_names,
-                genres=genres,
+                url=card.url,
+                name=card.name,
+                alternative_names=card.alternative_names,
+                genres=card.genres,
                 categories=categories_checked,
                 languages=languages_checked,
-                image_url=image_url,
+                image_url=card.image_url,
                 client=self.client,
             )
 
+    async def _parse_search_page(self, html: str) -> list[Catalogue]:
+        cards = await parse(self.client, "search", catalogue_cards, html, self.site_url)
+        return list(self._catalogues_from(cards))
+
     def _yield_release_episodes_from(self, html: str) -> Generator[EpisodeRelease]:
         for match in re.finditer(
             rf"href=\"({self.site_url}catalogue/.+)\"[\W\w]+?src=\"(.+?)\"[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<[\W\w]+?>(.*)\n?<",
@@ -137,34 +520,69 @@ class AnimeSama:
                 categories=categories_checked,
                 language=cast(Lang, language),
                 descriptive=descriptive,
+                anime_sama=self,
             )
 
-    async def search(self, query: str) -> list[Catalogue]:
-        response = (
-            await self.client.get(f"{self.site_url}catalogue/?search={query}")
-        ).raise_for_status()
+    async def search(
+        self, query: str, deadline: float | None = None
+    ) -> PartialResults[Catalogue]:
+        """
+        Return the catalogues matching the query. With a `deadline` in seconds, the
+        result pages not received in time are left out and listed in `missing`
+        instead of making the whole search wait for them. The deadline only covers
+        these pages, not `search_iter` nor the seasons of the catalogues found.
+        """
+        loop = asyncio.get_running_loop()
+        end = None if deadline is None else loop.time() + deadline
+
+        first_url = f"{self.site_url}catalogue/?search={query}"
+        try:
+            response = await asyncio.wait_for(self.client.get(first_url), deadline)
+        except asyncio.TimeoutError:
+            return PartialResults(missing=[first_url])
+        response.raise_for_status()
 
         pages_regex = re.findall(r"page=(\d+)", response.text)
 
         if not pages_regex:
-            return []
+            return PartialResults()
 
         last_page = int(pages_regex[-1])
 
-        responses = [response] + await asyncio.gather(
+        urls = [
+            f"{self.site_url}catalogue/?search={query}&page={num}"
+            for num in range(2, last_page + 1)
+        ]
+        requests = [asyncio.ensure_future(self.client.get(url)) for url in urls]
+        late: set[asyncio.Future[Response]] = set()
+        if requests:
+            _, late = await asyncio.wait(
+                requests, timeout=None if end is None else max(end - loop.time(), 0)
+            )
+            for request in late:
+                request.cancel()
+
+        catalogues: PartialResults[Catalogue] = PartialResults()
+        responses = [response] + [
+            request.result() for request in requests if request not in late
+        ]
+        # The pages are parsed together when an executor can parse them in parallel
+        for page in await asyncio.gather(
             *(
-                self.client.get(f"{self.site_url}catalogue/?search={query}&page={num}")
-                for num in range(2, last_page + 1)
+                self._parse_search_page(response.text)
+                for response in responses
+                if response.is_success
+            )
+        ):
+            catalogues += page
+
+        catalogues.missing = [
+            url for url, request in zip(urls, requests) if request in late
+        ]
+        if catalogues.missing:
+            logger.warning(
+                "%s result pages of %r missed the deadline", len(late), query
             )
-        )
-
-        catalogues = []
-        for response in responses:
-            if not response.is_success:
-                continue
-
-            catalogues += list(self._yield_catalogues_from(response.text))
-
         return catalogues
 
     async def search_iter(self, query: str) -> AsyncIterator[Catalogue]:
@@ -179,7 +597,7 @@ class AnimeSama:
 
         last_page = int(pages_regex[-1])
 
-        for catalogue in self._yield_catalogues_from(response.text):
+        for catalogue in await self._parse_search_page(response.text):
             yield catalogue
 
         for number in range(2, last_page + 1):
@@ -190,36 +608,37 @@ class AnimeSama:
             if not response.is_success:
                 continue
 
-            for catalogue in self._yield_catalogues_from(response.text):
+            for catalogue in await self._parse_search_page(response.text):
                 yield catalogue
 
     async def catalogues_iter(self) -> AsyncIterator[Catalogue]:
         async for catalogue in self.search_iter(""):
             yield catalogue
 
-    async def all_catalogues(self) -> list[Catalogue]:
-        return await self.search("")
+    async def all_catalogues(
+        self, deadline: float | None = None
+    ) -> PartialResults[Catalogue]:
+        """Every catalogue, with the `deadline` of `search`."""
+        return await self.search("", deadline)
 
     async def planning(self) -> list[list[Season]]:
-        # Get from homepage, return value should be change
-        raise NotImplementedError
+        """Return the seasons released each day of the week, starting on monday."""
+        return (await self.homepage()).planning
 
     async def new_episodes(self) -> list[EpisodeRelease]:
         """
         Return the new available episodes on anime-sama using the homepage sorted from oldest to newest.
         """
-        section = await self._get_homepage_section("ajouts animes", 4)
-        release_episodes = list(self._yield_release_episodes_from(section))
-        return list(reversed(release_episodes))
+        return (await self.homepage()).new_episodes
 
     """async def new_scans(self) -> list[Scan]:
         raise NotImplementedError"""
 
     async def new_content(self) -> list[Catalogue]:
-        raise NotImplementedError
+        return (await self.homepage()).new_content
 
     async def classics(self) -> list[Catalogue]:
-        raise NotImplementedError
+        return (await self.homepage()).classics
 
     async def highlights(self) -> list[Catalogue]:
-        raise NotImplementedError
+        return (await self.homepage()).highlights
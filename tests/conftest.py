@@ -0,0 +1,10 @@
+import pytest_asyncio
+
+from .data.http import client
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session", autouse=True)
+async def close_http_client():
+    yield
+    # Saves the cassette when recording
+    await client.aclose()
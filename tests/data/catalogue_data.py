@@ -1,6 +1,10 @@
 from anime_sama_api.catalogue import Catalogue
 
+from .http import client
 
-one_piece = Catalogue("https://anime-sama.org/catalogue/one-piece/")
-mha = Catalogue("https://anime-sama.org/catalogue/my-hero-academia/")
-gumball = Catalogue("https://anime-sama.org/catalogue/le-monde-incroyable-de-gumball/")
+
+one_piece = Catalogue("https://anime-sama.org/catalogue/one-piece/", client=client)
+mha = Catalogue("https://anime-sama.org/catalogue/my-hero-academia/", client=client)
+gumball = Catalogue(
+    "https://anime-sama.org/catalogue/le-monde-incroyable-de-gumball/", client=client
+)
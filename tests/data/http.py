@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from anime_sama_api.testing import client_from_env
+
+cassette_path = Path(__file__).parent / "cassettes" / "anime-sama.json"
+
+# Shared by the test data. Run the tests with ANIME_SAMA_HTTP=record to refresh the
+# cassette from the live site, they then run offline from it
+client = client_from_env(cassette_path)
+
+# Without a cassette, the tests of the live site only run when asked to, so that
+# the tests stay offline by default
+live_site = pytest.mark.skipif(
+    not cassette_path.is_file() and not os.environ.get("ANIME_SAMA_HTTP"),
+    reason="needs the anime-sama cassette or ANIME_SAMA_HTTP=live/record",
+)
@@ -0,0 +1,37 @@
+from collections import Counter
+from collections.abc import Callable
+
+import httpx
+
+from anime_sama_api.testing import FakeSite
+
+
+class InFlight:
+    """
+    Serve a fake site and remember the most requests it answered at the same time,
+    or the most groups of requests when `group` tells the group of a request.
+    """
+
+    def __init__(
+        self,
+        site: FakeSite,
+        group: Callable[[httpx.Request], str] = lambda request: str(id(request)),
+    ) -> None:
+        self.site = site
+        self.group = group
+        self.requested: list[str] = []
+        self.max_in_flight = 0
+        self._in_flight: Counter[str] = Counter()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requested.append(request.url.path)
+        group = self.group(request)
+        self._in_flight[group] += 1
+        self.max_in_flight = max(self.max_in_flight, len(+self._in_flight))
+        try:
+            return await self.site.handle_async(request)
+        finally:
+            self._in_flight[group] -= 1
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
@@ -1,29 +1,36 @@
 from anime_sama_api.season import Season
 
+from .http import client
+
 one_piece = (
     [
-        Season(f"https://anime-sama.org/catalogue/one-piece/saison{i}/")
+        Season(f"https://anime-sama.org/catalogue/one-piece/saison{i}/", client=client)
         for i in range(1, 12)
     ]
     + [
-        Season("https://anime-sama.org/catalogue/one-piece/film/"),
-        Season("https://anime-sama.org/catalogue/one-piece/oav/"),
-        Season("https://anime-sama.org/catalogue/one-piece/saison1hs/"),
-        Season("https://anime-sama.org/catalogue/one-piece/kai/"),
+        Season("https://anime-sama.org/catalogue/one-piece/film/", client=client),
+        Season("https://anime-sama.org/catalogue/one-piece/oav/", client=client),
+        Season("https://anime-sama.org/catalogue/one-piece/saison1hs/", client=client),
+        Season("https://anime-sama.org/catalogue/one-piece/kai/", client=client),
     ]
     + [
-        Season(f"https://anime-sama.org/catalogue/one-piece/kai{i}/")
+        Season(f"https://anime-sama.org/catalogue/one-piece/kai{i}/", client=client)
         for i in range(2, 11)
     ]
 )
 gumball = [
-    Season(f"https://anime-sama.org/catalogue/le-monde-incroyable-de-gumball/saison{i}/")
+    Season(
+        f"https://anime-sama.org/catalogue/le-monde-incroyable-de-gumball/saison{i}/",
+        client=client,
+    )
     for i in range(1, 7)
 ]
 mha = [
-    Season(f"https://anime-sama.org/catalogue/my-hero-academia/saison{i}/")
+    Season(
+        f"https://anime-sama.org/catalogue/my-hero-academia/saison{i}/", client=client
+    )
     for i in range(1, 8)
 ] + [
-    Season("https://anime-sama.org/catalogue/my-hero-academia/film/"),
-    Season("https://anime-sama.org/catalogue/my-hero-academia/oav/"),
+    Season("https://anime-sama.org/catalogue/my-hero-academia/film/", client=client),
+    Season("https://anime-sama.org/catalogue/my-hero-academia/oav/", client=client),
 ]
@@ -0,0 +1,89 @@
+import gzip
+import time
+
+import httpx
+import pytest
+
+from anime_sama_api.testing import (
+    Cassette,
+    CassetteMiss,
+    RecordingTransport,
+    ReplayTransport,
+    client_from_env,
+)
+
+
+def site() -> httpx.MockTransport:
+    counter = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal counter
+        counter += 1
+        if request.url.path == "/video":
+            return httpx.Response(200, content=bytes(range(256)))
+        return httpx.Response(
+            200,
+            content=gzip.compress(f"page {counter}".encode()),
+            headers={"Content-Encoding": "gzip", "ETag": f'"{counter}"'},
+        )
+
+    return httpx.MockTransport(handler)
+
+
+async def test_record_then_replay(tmp_path):
+    path = tmp_path / "cassette.json"
+    async with httpx.AsyncClient(
+        transport=RecordingTransport(Cassette(path), site())
+    ) as client:
+        assert (await client.get("https://site/page")).text == "page 1"
+        assert (await client.get("https://site/page")).text == "page 2"
+        await client.get("https://site/video")
+
+    async with httpx.AsyncClient(transport=ReplayTransport(Cassette(path))) as client:
+        first = await client.get("https://site/page")
+        assert first.text == "page 1"
+        assert first.headers["ETag"] == '"1"'
+        assert (await client.get("https://site/page")).text == "page 2"
+        # The last recorded response is replayed once the others are used
+        assert (await client.get("https://site/page")).text == "page 2"
+        assert (await client.get("https://site/video")).content == bytes(range(256))
+
+        with pytest.raises(CassetteMiss):
+            await client.get("https://site/unknown")
+
+
+async def test_replay_latency(tmp_path):
+    path = tmp_path / "cassette.json"
+    async with httpx.AsyncClient(
+        transport=RecordingTransport(Cassette(path), site())
+    ) as client:
+        await client.get("https://site/page")
+
+    async with httpx.AsyncClient(
+        transport=ReplayTransport(Cassette(path), latency=0.1)
+    ) as client:
+        start = time.perf_counter()
+        await client.get("https://site/page")
+        assert time.perf_counter() - start >= 0.1
+
+
+async def test_client_from_env(tmp_path, monkeypatch):
+    path = tmp_path / "cassette.json"
+    monkeypatch.delenv("ANIME_SAMA_HTTP", raising=False)
+    async with client_from_env(path, site()) as client:
+        assert (await client.get("https://site/page")).text == "page 1"
+    assert not path.exists()
+
+    monkeypatch.setenv("ANIME_SAMA_HTTP", "record")
+    async with client_from_env(path, site()) as client:
+        assert (await client.get("https://site/page")).text == "page 1"
+        # Saved once, when the client is closed
+        assert not path.exists()
+    assert len(Cassette(path).interactions) == 1
+
+    # The cassette exists, so it is replayed
+    monkeypatch.delenv("ANIME_SAMA_HTTP")
+    async with client_from_env(path, site()) as client:
+        assert (await client.get("https://site/page")).text == "page 1"
+        with pytest.raises(CassetteMiss):
+            await client.get("https://site/video")
@@ -1,10 +1,16 @@
 import pytest
 
+from anime_sama_api.catalogue import Catalogue
+from anime_sama_api.testing import FakeSite
+
 from .data import catalogue_data, season_data
+from .data.http import live_site
+from .data.in_flight import InFlight
 
 pytest_plugins = ("pytest_asyncio",)
 
 
+@live_site
 @pytest.mark.asyncio
 async def test_seasons():
     assert season_data.one_piece == await catalogue_data.one_piece.seasons()
@@ -12,6 +18,7 @@ async def test_seasons():
     assert season_data.gumball == await catalogue_data.gumball.seasons()
 
 
+@live_site
 @pytest.mark.asyncio
 async def test_avancement():
     assert await catalogue_data.one_piece.advancement() == "Aucune donnée."
@@ -21,6 +28,7 @@ async def test_avancement():
     )
 
 
+@live_site
 @pytest.mark.asyncio
 async def test_correspondance():
     assert (
@@ -32,3 +40,24 @@ async def test_correspondance():
         await catalogue_data.mha.correspondence()
         == "Saison 7 Épisode 21 -> Chapitre 399"
     )
+
+
+async def test_all_episodes_iter():
+    site = FakeSite(catalogues=1, seasons=6, episodes=3, latency=0.01)
+    # Grouped by season
+    in_flight = InFlight(site, lambda request: request.url.path.split("/")[3])
+    catalogue = Catalogue(
+        "https://anime-sama.test/catalogue/serie-1/", client=in_flight.client()
+    )
+
+    episodes = catalogue.all_episodes_iter(window=2)
+    first = await anext(episodes)
+    assert (first.season_name, first.name) == ("Saison 1", "Episode 1")
+    # The last seasons are not fetched yet
+    assert not any("saison6" in path for path in in_flight.requested)
+
+    rest = [episode async for episode in episodes]
+    assert [(episode.season_name, episode.index) for episode in [first] + rest] == [
+        (f"Saison {season}", index) for season in range(1, 7) for index in range(1, 4)
+    ]
+    assert in_flight.max_in_flight == 2
@@ -0,0 +1,107 @@
+import json
+import re
+
+import httpx
+
+from anime_sama_api.cli.direct_download import RangedDownload, remove_partial_files
+
+VIDEO = bytes(range(256)) * 40  # 10240 bytes
+
+
+def video_server(requested: list[str], accept_ranges: bool = True) -> httpx.Client:
+    def handler(request: httpx.Request) -> httpx.Response:
+        range_header = request.headers.get("Range")
+        requested.append(range_header)
+        if range_header is None or not accept_ranges:
+            return httpx.Response(200, content=VIDEO)
+
+        start, end = map(int, re.findall(r"\d+", range_header))
+        return httpx.Response(
+            206,
+            content=VIDEO[start : end + 1],
+            headers={"Content-Range": f"bytes {start}-{end}/{len(VIDEO)}"},
+        )
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+def test_ranged_download(tmp_path):
+    requested: list[str] = []
+    progress = []
+    destination = tmp_path / "episode.mp4"
+
+    RangedDownload(
+        "https://video.example/episode.mp4",
+        destination,
+        connections=3,
+        segment_size=1000,
+        progress_hook=progress.append,
+        client=video_server(requested),
+    ).run()
+
+    assert destination.read_bytes() == VIDEO
+    assert len(requested) == 1 + 11  # Size probe and segments
+    assert progress[-1]["status"] == "finished"
+    assert progress[-1]["downloaded_bytes"] == len(VIDEO)
+    assert not (tmp_path / "episode.mp4.rpart").exists()
+    assert not (tmp_path / "episode.mp4.rpart.json").exists()
+
+
+def test_ranged_download_resume(tmp_path):
+    destination = tmp_path / "episode.mp4"
+    part = tmp_path / "episode.mp4.rpart"
+    part.write_bytes(VIDEO[:3000] + bytes(len(VIDEO) - 3000))
+    (tmp_path / "episode.mp4.rpart.json").write_text(
+        json.dumps({"size": len(VIDEO), "segment_size": 1000, "done": [0, 1, 2]})
+    )
+
+    requested: list[str] = []
+    RangedDownload(
+        "https://video.example/episode.mp4",
+        destination,
+        segment_size=1000,
+        client=video_server(requested),
+    ).run()
+
+    assert destination.read_bytes() == VIDEO
+    assert "bytes=0-999" not in requested
+    assert "bytes=3000-3999" in requested
+
+
+def test_download_without_ranges(tmp_path):
+    destination = tmp_path / "episode.mp4"
+    RangedDownload(
+        "https://video.example/episode.mp4",
+        destination,
+        client=video_server([], accept_ranges=False),
+    ).run()
+
+    assert destination.read_bytes() == VIDEO
+
+
+def test_prioritize(tmp_path):
+    download = RangedDownload(
+        "https://video.example/episode.mp4", tmp_path / "episode.mp4", segment_size=1000
+    )
+    download.size = len(VIDEO)
+    download._prepare()
+
+    download.prioritize(7500)
+    assert list(download._pending) == [7, 8, 9, 10, 0, 1, 2, 3, 4, 5, 6]
+
+
+def test_remove_partial_files(tmp_path):
+    for name in (
+        "Episode 1.mp4.rpart",
+        "Episode 1.mp4.rpart.json",
+        "Episode 1.mp4",
+        "Episode 10.mp4.rpart",
+    ):
+        (tmp_path / name).touch()
+
+    remove_partial_files(tmp_path / "Episode 1")
+
+    assert sorted(file.name for file in tmp_path.iterdir()) == [
+        "Episode 1.mp4",
+        "Episode 10.mp4.rpart",
+    ]
@@ -1,5 +1,13 @@
+import asyncio
+import threading
+import time
 from pathlib import Path
+
+import pytest
+
+from anime_sama_api.cli import downloader
 from anime_sama_api.cli.downloader import multi_download, download
+from anime_sama_api.cli.pipeline import download_pipeline
 from anime_sama_api.cli.episode_extra_info import convert_with_extra_info
 from anime_sama_api.episode import Episode, Languages, Players
 
@@ -25,3 +33,144 @@ def test_download():
         Path(),
         prefer_languages=["VF", "VOSTFR"],
     )
+
+
+async def test_download_pipeline():
+    await download_pipeline([Episode({})], None, Path())
+
+
+async def test_download_pipeline_returns_the_downloaded_episodes(monkeypatch):
+    episodes = [Episode({}, _name="Episode 1"), Episode({}, _name="Episode 2")]
+
+    def fake_download(episode, *_):
+        return episode.warpped.name == "Episode 1"
+
+    monkeypatch.setattr(downloader, "download", fake_download)
+    assert await download_pipeline(episodes, None, Path()) == episodes[:1]
+
+
+async def test_download_pipeline_stops_on_failure():
+    async def failing_resolution():
+        yield Episode({}, _name="Episode 1")
+        raise RuntimeError("The season page changed")
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(
+            download_pipeline(failing_resolution(), None, Path()), timeout=5
+        )
+    await asyncio.sleep(0)
+    # The download workers are not left waiting for episodes
+    assert asyncio.all_tasks() == {asyncio.current_task()}
+
+
+async def test_download_pipeline_failure_does_not_wait_for_downloads(monkeypatch):
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+    finish = threading.Event()
+
+    def slow_download(episode, *_):
+        loop.call_soon_threadsafe(started.set)
+        finish.wait(5)
+
+    async def failing_resolution():
+        yield Episode({}, _name="Episode 1")
+        await started.wait()
+        raise RuntimeError("The season page changed")
+
+    monkeypatch.setattr(downloader, "download", slow_download)
+    start = time.perf_counter()
+    try:
+        with pytest.raises(RuntimeError):
+            await download_pipeline(failing_resolution(), None, Path())
+        # The event loop was not blocked until the download ended
+        assert time.perf_counter() - start < 2
+    finally:
+        finish.set()
+
+
+async def test_download_pipeline_is_streaming(monkeypatch):
+    first_downloaded = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def fake_download(episode, *_):
+        # Called from a download thread
+        loop.call_soon_threadsafe(first_downloaded.set)
+
+    async def slow_resolution():
+        yield Episode({}, _name="Episode 1")
+        # The first episode must be downloaded before the next one is resolved
+        await asyncio.wait_for(first_downloaded.wait(), timeout=5)
+        yield Episode({}, _name="Episode 2")
+
+    monkeypatch.setattr(downloader, "download", fake_download)
+    await download_pipeline(slow_resolution(), None, Path())
+
+
+def test_consume_player_tries_shared_players_once():
+    players = Players(["https://b.test/1", "https://vidmoly.to/embed-1.html"])
+    assert players == ["https://vidmoly.net/embed-1.html", "https://b.test/1"]
+
+    # The VO page is copied between language ids, so their players are the same
+    episode = Episode(Languages(vostfr=players, vj=Players(players[::-1])))
+    assert list(episode.consume_player(["VOSTFR"])) == players
+
+
+def test_duplicate_downloads_are_linked(tmp_path, monkeypatch):
+    downloaded = []
+
+    added = []
+    progress = downloader.get_progress()
+    monkeypatch.setattr(
+        progress, "add_episode", lambda name: added.append(name) or len(added)
+    )
+
+    def fake_download(name, full_path, *_):
+        downloaded.append(name)
+        time.sleep(0.1)  # The duplicate starts while this one downloads
+        # The waiting jobs are already shown
+        assert len(added) == 3
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        Path(f"{full_path}.mp4").write_bytes(b"video")
+        return True
+
+    monkeypatch.setattr(downloader, "_download", fake_download)
+    monkeypatch.setattr(downloader, "shared_downloads", downloader.SharedDownloads())
+
+    languages = Languages(vostfr=Players(["https://a.test/1", "https://b.test/1"]))
+    episodes = [
+        convert_with_extra_info(Episode(languages, "Serie", "Saison 1", "Episode 1")),
+        convert_with_extra_info(Episode(languages, "Serie", "Saison 1", "Episode 1")),
+        convert_with_extra_info(Episode(languages, "Serie", "Film", "Episode 1")),
+    ]
+    multi_download(
+        episodes,
+        tmp_path,
+        "{season}/{episode}",
+        concurrent_downloads={"video": 3},
+    )
+
+    assert len(downloaded) == 1
+    source = tmp_path / "Saison 1" / "Episode 1.mp4"
+    copy = tmp_path / "Film" / "Episode 1.mp4"
+    assert copy.read_bytes() == b"video"
+    assert copy.samefile(source)
+
+
+def test_download_warns_once_about_the_language(tmp_path, monkeypatch, caplog):
+    tried = []
+
+    def fake_download(name, full_path, me, players, *_):
+        tried.extend(players)
+        return False
+
+    monkeypatch.setattr(downloader, "_download", fake_download)
+    monkeypatch.setattr(downloader, "shared_downloads", downloader.SharedDownloads())
+    players = Players(["https://a.test/1", "https://b.test/1"])
+
+    download(
+        convert_with_extra_info(Episode(Languages(vf=players), _name="Episode 1")),
+        tmp_path,
+    )
+
+    assert tried == players
+    assert caplog.text.count("Language preference not respected") == 1
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import httpx
+
+from anime_sama_api.catalogue import Catalogue
+from anime_sama_api.cli.cache import JsonStore
+from anime_sama_api.cli import episode_extra_info
+from anime_sama_api.cli.episode_extra_info import JikanClient, convert_with_extra_info
+from anime_sama_api.episode import Episode
+
+one_piece = Catalogue(
+    "https://anime-sama.org/catalogue/one-piece/",
+    name="One Piece",
+    genres=["Action", "Aventure", "Comédie"],
+    categories={"Anime"},
+)
+one_piece_listing = {
+    "mal_id": 21,
+    "title": "One Piece",
+    "titles": [{"type": "Default", "title": "One Piece"}],
+    "genres": [{"name": "Action"}, {"name": "Adventure"}, {"name": "Comedy"}],
+    "aired": {"from": "1999-10-20T00:00:00+00:00"},
+}
+
+
+def jikan_client(queries: list[str]) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        queries.append(request.url.params["q"])
+        return httpx.Response(200, json={"data": [one_piece_listing]})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def test_release_date_is_cached_on_disk(tmp_path):
+    queries: list[str] = []
+    store_path = tmp_path / "jikan.json"
+
+    async with JikanClient(jikan_client(queries), JsonStore(store_path)) as jikan:
+        release_date = await jikan.release_date(one_piece)
+    assert release_date == datetime.fromisoformat("1999-10-20T00:00:00+00:00")
+    assert queries == ["One Piece"]
+
+    # A new run only reads the disk
+    async with JikanClient(jikan_client(queries), JsonStore(store_path)) as jikan:
+        assert await jikan.release_date(one_piece) == release_date
+    assert queries == ["One Piece"]
+
+
+async def test_release_dates(tmp_path):
+    queries: list[str] = []
+    not_anime = Catalogue("https://anime-sama.org/catalogue/one-piece-scans/")
+
+    async with JikanClient(
+        jikan_client(queries), JsonStore(tmp_path / "jikan.json")
+    ) as jikan:
+        release_dates = await jikan.release_dates([one_piece, not_anime, one_piece])
+
+    assert release_dates[one_piece] is not None
+    assert release_dates[not_anime] is None
+    assert queries == ["One Piece"]
+
+
+async def test_convert_with_extra_info_in_a_running_loop(monkeypatch):
+    async def release_date(self, serie):
+        return datetime(1999, 10, 20)
+
+    monkeypatch.setattr(JikanClient, "release_date", release_date)
+    monkeypatch.setattr(episode_extra_info, "JsonStore", lambda *_, **__: None)
+
+    episode = convert_with_extra_info(Episode({}), one_piece)
+    assert episode.release_year_parentheses() == " (1999)"
@@ -0,0 +1,57 @@
+from anime_sama_api.cli.circuit_breaker import CircuitBreaker
+from anime_sama_api.cli.error_handeling import classify, reaction_to, how_to_react
+
+
+def test_classify():
+    error = classify(
+        "ERROR: [generic] Unable to download webpage: HTTP Error 522 (caused by ...)"
+    )
+    assert error.category == "server_error"
+    assert error.reaction == "retry"
+    assert error.host_failure
+
+    assert classify("ERROR: HTTPError 404: Not Found").category == "not_found"
+    assert not classify("ERROR: HTTPError 404: Not Found").host_failure
+    assert classify("Something new").category == "unknown"
+    assert classify(None).reaction == "continue"
+
+
+def test_classify_priority():
+    # "continue" errors were checked before "retry" ones
+    msg = "The read operation timed out then Unsupported URL"
+    assert reaction_to(msg) == "continue"
+
+
+def test_how_to_react():
+    assert "Waiting for vidmoly" in how_to_react["retry"]
+    assert "Unsupported URL" in how_to_react["continue"]
+    assert how_to_react["crash"] == ()
+
+
+def test_circuit_breaker():
+    now = 0.0
+    breaker = CircuitBreaker(threshold=2, window=10, cooldown=30, clock=lambda: now)
+
+    breaker.record_failure("vidmoly.net")
+    assert breaker.allow("vidmoly.net")
+    now = 20  # Out of the window
+    breaker.record_failure("vidmoly.net")
+    assert breaker.allow("vidmoly.net")
+
+    breaker.record_failure("vidmoly.net")
+    assert breaker.is_open("vidmoly.net")
+    assert not breaker.allow("vidmoly.net")
+    assert breaker.allow("sendvid.com")
+
+    now = 50  # Cooldown passed, only one probe
+    assert breaker.allow("vidmoly.net")
+    assert not breaker.allow("vidmoly.net")
+
+    breaker.record_failure("vidmoly.net")
+    assert not breaker.allow("vidmoly.net")
+
+    now = 80
+    assert breaker.allow("vidmoly.net")
+    breaker.record_success("vidmoly.net")
+    assert not breaker.is_open("vidmoly.net")
+    assert breaker.allow("vidmoly.net")
@@ -0,0 +1,106 @@
+import time
+from pathlib import Path
+
+import httpx
+from rich.console import Console
+
+from anime_sama_api.cli import downloader
+from anime_sama_api.cli.config import PlayersConfig
+from anime_sama_api.cli.episode_extra_info import convert_with_extra_info
+from anime_sama_api.cli.event_log import EventLog, print_summary, read_events, summarize
+from anime_sama_api.episode import Episode, Languages, Players
+from anime_sama_api.testing import FakeSite, FakeSiteServer
+
+
+def test_summarize():
+    log = [
+        {"event": "player", "host": "a.test"},
+        {"event": "extraction", "host": "a.test", "seconds": 1.0},
+        {"event": "retry", "host": "a.test", "category": "timeout"},
+        {"event": "extraction", "host": "a.test", "seconds": 3.0},
+        {"event": "transfer", "host": "a.test", "bytes": 4000, "seconds": 2.0},
+        {"event": "outcome", "host": "a.test", "status": "success"},
+        {"event": "player", "host": "b.test"},
+        {"event": "error", "host": "b.test", "category": "not_found"},
+        {"event": "player_failed", "host": "b.test"},
+        {"event": "outcome", "host": None, "status": "no_player"},
+    ]
+    hosts = summarize(log)
+
+    assert set(hosts) == {"a.test", "b.test"}
+    assert hosts["a.test"].successes == 1
+    assert hosts["a.test"].retries == 1
+    assert hosts["a.test"].throughput == 2000
+    assert hosts["a.test"].extraction == 2.0
+    assert hosts["a.test"].errors == {"timeout": 1}
+    assert hosts["b.test"].failures == 1
+    assert hosts["b.test"].errors == {"not_found": 1}
+
+
+def test_download_events(tmp_path: Path, monkeypatch):
+    server = FakeSiteServer(FakeSite(video_size=200_000)).start()
+    events_path = tmp_path / "events.jsonl"
+    monkeypatch.setattr(downloader, "get_events", lambda: EventLog(events_path))
+
+    try:
+        downloader.download(
+            convert_with_extra_info(
+                Episode(
+                    # Languages types its keyword arguments as dicts
+                    Languages(vostfr=Players([f"{server.url}videos/a.mp4"])),  # type: ignore
+                    _name="Episode 1",
+                )
+            ),
+            tmp_path,
+            players_config=PlayersConfig([], [], direct=["127.0.0.1"]),
+            format="best",
+        )
+    finally:
+        server.stop()
+
+    events = list(read_events(events_path))
+    assert [event["event"] for event in events] == [
+        "player",
+        "extraction",
+        "transfer",
+        "outcome",
+    ]
+    assert {event["episode"] for event in events} == {"Episode 1"}
+    assert events[2]["bytes"] == 200_000
+    assert events[3]["status"] == "success"
+
+    console = Console(record=True, width=120)
+    print_summary(events_path, console)
+    assert "127.0.0.1" in console.export_text()
+
+
+def test_probe_is_not_extraction(tmp_path: Path, monkeypatch):
+    events_path = tmp_path / "events.jsonl"
+    monkeypatch.setattr(downloader, "get_events", lambda: EventLog(events_path))
+
+    def slow_probe(url: str, **_) -> httpx.Response:
+        time.sleep(0.2)
+        return httpx.Response(200, text="Please wait")
+
+    def instant_download(ydl, player, full_path, fragments, hook) -> bool:
+        hook({"status": "finished", "downloaded_bytes": 1})
+        return True
+
+    monkeypatch.setattr(downloader.httpx, "get", slow_probe)
+    monkeypatch.setattr(downloader, "download_direct", instant_download)
+
+    downloader.download(
+        convert_with_extra_info(
+            Episode(
+                # Languages types its keyword arguments as dicts
+                Languages(vostfr=Players(["https://vidmoly.net/embed-1.html"])),  # type: ignore
+                _name="Episode 1",
+            )
+        ),
+        tmp_path,
+        players_config=PlayersConfig([], [], direct=["vidmoly.net"]),
+    )
+
+    events = {event["event"]: event for event in read_events(events_path)}
+    assert events["probe"]["seconds"] >= 0.2
+    assert events["extraction"]["seconds"] < 0.2
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from anime_sama_api.cli.config import PlayersConfig
+from anime_sama_api.cli.extraction import ExtractionCache, Stream
+from anime_sama_api.cli.internal_player import mpv_stream_args
+from anime_sama_api.cli.play_menu import EpisodesManager
+from anime_sama_api.episode import Episode, Languages, Players
+
+
+def fake_extraction(monkeypatch, cache: ExtractionCache) -> list[str]:
+    extracted: list[str] = []
+
+    def extract(player: str) -> Stream | None:
+        extracted.append(player)
+        time.sleep(0.05)
+        if "dead" in player:
+            return None
+        return Stream(player + ".mp4", {"Referer": player})
+
+    monkeypatch.setattr(cache, "_extract", extract)
+    return extracted
+
+
+def test_resolve_is_shared(monkeypatch):
+    cache = ExtractionCache()
+    extracted = fake_extraction(monkeypatch, cache)
+
+    with ThreadPoolExecutor(4) as executor:
+        streams = list(executor.map(cache.resolve, ["https://a/1"] * 4))
+    streams.append(cache.resolve("https://a/1"))
+
+    assert streams == [Stream("https://a/1.mp4", {"Referer": "https://a/1"})] * 5
+    assert extracted == ["https://a/1"]
+
+
+def test_resolve_failure_is_kept_shortly(monkeypatch):
+    cache = ExtractionCache(failure_ttl=0.1)
+    extracted = fake_extraction(monkeypatch, cache)
+
+    assert cache.resolve("https://a/dead") is None
+    assert cache.resolve("https://a/dead") is None
+    assert cache.resolve("https://a/1") is not None
+    time.sleep(0.1)
+    assert cache.resolve("https://a/dead") is None
+    assert cache.resolve("https://a/1") is not None
+
+    assert extracted == ["https://a/dead", "https://a/1", "https://a/dead"]
+
+
+def test_resolve_episode_skips_dead_players(monkeypatch):
+    cache = ExtractionCache()
+    extracted = fake_extraction(monkeypatch, cache)
+    # Players() swaps the two first players
+    episode = Episode(
+        Languages({"vostfr": Players(["https://b/ok", "https://a/dead"])})
+    )
+
+    player, stream = cache.resolve_episode(episode, ["VOSTFR"], PlayersConfig([], []))
+
+    assert player == "https://b/ok"
+    assert stream.url == "https://b/ok.mp4"
+    assert extracted == ["https://a/dead", "https://b/ok"]
+
+
+def test_mpv_stream_args():
+    stream = Stream(
+        "https://a/1.mp4",
+        {
+            "User-Agent": "Mozilla/5.0 (KHTML, like Gecko)",
+            "Referer": "https://a/",
+            "Accept": "*/*",
+        },
+    )
+    assert mpv_stream_args(stream, "One Piece S11E01") == [
+        "--force-media-title=One Piece S11E01",
+        "--user-agent=Mozilla/5.0 (KHTML, like Gecko)",
+        "--referrer=https://a/",
+        "--http-header-fields-append=Accept: */*",
+    ]
+
+
+def test_episodes_manager_upcoming():
+    manager = EpisodesManager(["1", "2"])  # type: ignore
+    assert manager.upcoming == "2"
+    next(manager)
+    assert manager.upcoming is None
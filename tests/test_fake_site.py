@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+
+from anime_sama_api.cli.direct_download import RangedDownload
+from anime_sama_api.testing import FakeSite, FakeSiteServer
+from anime_sama_api.top_level import AnimeSama
+
+SITE_URL = "https://anime-sama.test/"
+
+
+def fake_anime_sama(site: FakeSite) -> AnimeSama:
+    return AnimeSama(SITE_URL, httpx.AsyncClient(transport=site.transport()))
+
+
+async def test_crawl_fake_site():
+    site = FakeSite(catalogues=120, seasons=3, episodes=13, page_size=48)
+    anime_sama = fake_anime_sama(site)
+
+    catalogues = await anime_sama.all_catalogues()
+    assert len(catalogues) == 120
+    assert catalogues[0].name == "Serie 1"
+    assert catalogues[0].languages == {"VOSTFR", "VF"}
+    assert [catalogue.name for catalogue in await anime_sama.search("Serie 11")] == [
+        "Serie 11",
+        "Serie 110",
+        "Serie 111",
+        "Serie 112",
+        "Serie 113",
+        "Serie 114",
+        "Serie 115",
+        "Serie 116",
+        "Serie 117",
+        "Serie 118",
+        "Serie 119",
+    ]
+
+    seasons = await catalogues[0].seasons()
+    assert [season.name for season in seasons] == ["Saison 1", "Saison 2", "Saison 3"]
+    assert await catalogues[0].advancement() == "Aucune donnée."
+
+    episodes = await seasons[0].episodes()
+    assert len(episodes) == 13
+    assert episodes[0].name == "Episode 1"
+    assert {"vostfr", "vf"} <= set(episodes[0].languages)
+    assert len(episodes[0].languages["vostfr"]) == 2
+
+
+async def test_fake_homepage():
+    anime_sama = fake_anime_sama(FakeSite(catalogues=20, seasons=2, episodes=5))
+    homepage = await anime_sama.homepage()
+
+    releases = homepage.new_episodes
+    assert len(releases) == 10
+    assert releases[-1].serie_name == "Serie 1"
+    assert [episode.name for episode in await releases[-1].get_real_episodes()] == [
+        "Episode 5"
+    ]
+    assert [catalogue.name for catalogue in homepage.classics][:2] == [
+        "Serie 1",
+        "Serie 2",
+    ]
+    assert sum(len(day) for day in homepage.planning) == 20
+
+
+async def test_fake_site_errors_and_latency():
+    site = FakeSite(catalogues=10, latency=0.05, error_rate=0.5, seed=1)
+    anime_sama = fake_anime_sama(site)
+
+    responses = await asyncio.gather(
+        *(anime_sama.client.get(SITE_URL) for _ in range(20))
+    )
+    statuses = {response.status_code for response in responses}
+    assert statuses == {200, 503}
+    assert site.requests == 20
+
+
+def test_fake_player_download(tmp_path):
+    site = FakeSite(catalogues=1, video_size=100_000)
+    server = FakeSiteServer(site).start()
+    try:
+        player = site.player_url(server.url, 1, 1, "vostfr", 1, 1)
+        destination = RangedDownload(
+            player, tmp_path / "episode.mp4", connections=3, segment_size=16_384
+        ).run()
+    finally:
+        server.stop()
+
+    assert destination.read_bytes() == site.video("serie-1-1-vostfr-1-1")
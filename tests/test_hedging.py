@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import httpx
+
+from anime_sama_api.hedging import HedgingTransport
+from anime_sama_api.testing import FakeSite
+from anime_sama_api.top_level import AnimeSama
+
+SITE_URL = "https://anime-sama.test/"
+
+
+def stalling_transport(site: FakeSite, stalled: set[str]) -> httpx.MockTransport:
+    """The site, but the first request to each URL of `stalled` hangs."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) in stalled:
+            stalled.remove(str(request.url))
+            await asyncio.sleep(30)
+        return await site.handle_async(request)
+
+    return httpx.MockTransport(handler)
+
+
+async def test_search_deadline():
+    site = FakeSite(catalogues=100, page_size=20)
+    stalled = {f"{SITE_URL}catalogue/?search=&page=3"}
+    anime_sama = AnimeSama(
+        SITE_URL, httpx.AsyncClient(transport=stalling_transport(site, stalled))
+    )
+
+    start = time.perf_counter()
+    catalogues = await anime_sama.all_catalogues(deadline=0.5)
+
+    assert time.perf_counter() - start < 5
+    assert not catalogues.complete
+    assert catalogues.missing == [f"{SITE_URL}catalogue/?search=&page=3"]
+    assert len(catalogues) == 80
+
+    catalogues = await anime_sama.all_catalogues(deadline=5)
+    assert catalogues.complete
+    assert len(catalogues) == 100
+
+
+async def test_hedged_request():
+    site = FakeSite(catalogues=30)
+    stalled: set[str] = set()
+    transport = HedgingTransport(
+        stalling_transport(site, stalled), min_samples=10, min_delay=0.05
+    )
+    client = httpx.AsyncClient(transport=transport)
+
+    # Learn how long a catalogue page takes
+    for number in range(1, 11):
+        await client.get(f"{SITE_URL}catalogue/{site.slug(number)}/")
+    assert transport.hedged == 0
+
+    url = f"{SITE_URL}catalogue/{site.slug(20)}/"
+    stalled.add(url)
+    start = time.perf_counter()
+    response = await client.get(url)
+
+    assert time.perf_counter() - start < 5
+    assert response.status_code == 200
+    assert "Serie 20" in response.text
+    assert transport.hedged == 1
+
+
+async def test_no_hedging_without_samples():
+    site = FakeSite(catalogues=3)
+    transport = HedgingTransport(httpx.MockTransport(site.handle_async))
+    client = httpx.AsyncClient(transport=transport)
+
+    response = await client.get(f"{SITE_URL}catalogue/{site.slug(1)}/")
+    assert response.status_code == 200
+    assert transport.hedge_delay("catalogue") is None
+    assert transport.hedged == 0
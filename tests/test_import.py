@@ -0,0 +1,55 @@
+import os
+import re
+import subprocess
+import sys
+
+HEAVY_MODULES = ("yt_dlp", "rich", "anime_sama_api.cli.config")
+
+
+def import_time_log(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+
+def test_import_is_light():
+    log = import_time_log("import anime_sama_api")
+    imported = set(re.findall(r"\|\s+(\S+)$", log, re.MULTILINE))
+
+    total_us = next(
+        int(cumulative)
+        for cumulative, module in re.findall(
+            r"\|\s*(\d+) \|\s+(\S+)$", log, re.MULTILINE
+        )
+        if module == "anime_sama_api"
+    )
+    for module in HEAVY_MODULES:
+        assert module not in imported, (
+            f"'import anime_sama_api' imported {module} ({total_us / 1000:.0f}ms)"
+        )
+
+
+def test_cli_functions_are_lazy():
+    import anime_sama_api
+
+    assert callable(anime_sama_api.main)
+    assert callable(anime_sama_api.download)
+    assert callable(anime_sama_api.multi_download)
+
+
+def test_cli_import_does_not_read_the_config(tmp_path):
+    # The config would be created in the home directory on first read
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import anime_sama_api.cli.__main__, anime_sama_api.cli.downloader",
+        ],
+        cwd=tmp_path,
+        env=os.environ | {"HOME": str(tmp_path), "PYTHONPATH": os.getcwd()},
+        check=True,
+    )
+    assert list(tmp_path.iterdir()) == []
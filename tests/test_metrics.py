@@ -0,0 +1,98 @@
+import json
+
+import httpx
+
+from anime_sama_api.metrics import Histogram, Metrics, endpoint_class
+from anime_sama_api.testing import FakeSite, FakeSiteServer
+from anime_sama_api.top_level import AnimeSama
+
+SITE_URL = "https://anime-sama.test/"
+
+
+def test_endpoint_class():
+    assert endpoint_class(httpx.URL(SITE_URL)) == "homepage"
+    assert endpoint_class(httpx.URL(f"{SITE_URL}catalogue/?search=a")) == "search"
+    assert endpoint_class(httpx.URL(f"{SITE_URL}catalogue/serie-1/")) == "catalogue"
+    assert (
+        endpoint_class(httpx.URL(f"{SITE_URL}catalogue/serie-1/saison1/vf/"))
+        == "season"
+    )
+    assert (
+        endpoint_class(
+            httpx.URL(f"{SITE_URL}catalogue/serie-1/saison1/vf/episodes.js?filever=1")
+        )
+        == "episodes.js"
+    )
+    assert endpoint_class(httpx.URL("https://video.test/e/1")) == "other"
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+    assert histogram.to_json()["count"] == 4
+
+
+async def test_metrics_of_a_crawl(tmp_path):
+    metrics = Metrics()
+    site = FakeSite(catalogues=60, page_size=48, error_rate=0)
+    anime_sama = AnimeSama(
+        SITE_URL, metrics.instrument(httpx.AsyncClient(transport=site.transport()))
+    )
+
+    catalogues = await anime_sama.all_catalogues()
+    seasons = await catalogues[0].seasons()
+    await seasons[0].episodes()
+    await anime_sama.new_episodes()
+
+    requests = metrics.to_json()["requests"]
+    assert requests["search"]["count"] == 2
+    assert requests["search"]["statuses"] == {"200": 2}
+    assert requests["search"]["latency"]["count"] == 2
+    assert requests["catalogue"]["count"] == 1
+    assert requests["catalogue"]["bytes"] > 0
+    # Each language of the season is tried
+    assert requests["season"]["statuses"]["200"] == 2
+    assert requests["episodes.js"]["count"] == 2
+    assert requests["homepage"]["count"] == 1
+    assert set(metrics.to_json()["parsing"]) == {
+        "search",
+        "catalogue",
+        "season",
+        "homepage",
+    }
+    assert metrics.to_json()["parsing"]["search"]["count"] == 2
+    # The homepage is timed once, by the getter that parses its section
+    assert metrics.to_json()["parsing"]["homepage"]["count"] == 1
+
+    text = metrics.to_prometheus()
+    assert 'anime_sama_requests_total{endpoint="search",status="200"} 2' in text
+    assert (
+        'anime_sama_request_duration_seconds_bucket{endpoint="search",le="+Inf"} 2'
+        in text
+    )
+    assert 'anime_sama_parse_duration_seconds_count{page="catalogue"} 1' in text
+
+    metrics.write(tmp_path / "metrics.json")
+    metrics.write(tmp_path / "metrics.prom")
+    assert json.loads((tmp_path / "metrics.json").read_text()) == metrics.to_json()
+    assert (tmp_path / "metrics.prom").read_text() == text
+
+
+async def test_metrics_of_a_streamed_response():
+    metrics = Metrics()
+    server = FakeSiteServer(FakeSite(video_size=100_000)).start()
+    client = metrics.instrument(httpx.AsyncClient())
+
+    try:
+        async with client.stream("GET", f"{server.url}videos/a.mp4") as response:
+            assert metrics.requests == {}  # Measured once the body is read
+            await response.aread()
+    finally:
+        await client.aclose()
+        server.stop()
+
+    assert metrics.requests["other"].bytes == 100_000
+    assert metrics.requests["other"].latency.count == 1
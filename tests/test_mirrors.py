@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+
+from anime_sama_api.mirrors import Mirrors
+from anime_sama_api.testing import FakeSite
+from anime_sama_api.top_level import AnimeSama
+
+FAST, SLOW, DOWN = (
+    "https://anime-sama.fast/",
+    "https://anime-sama.slow/",
+    "https://anime-sama.down/",
+)
+
+
+def mirrors_transport(site: FakeSite, down: set[str]) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        mirror = f"https://{request.url.host}/"
+        if mirror in down:
+            raise httpx.ConnectError("Connection refused", request=request)
+        if mirror == SLOW:
+            await asyncio.sleep(0.2)
+        return await site.handle_async(request)
+
+    return httpx.MockTransport(handler)
+
+
+async def test_choose_fastest_mirror():
+    mirrors = Mirrors([DOWN, SLOW, FAST.rstrip("/")])
+    assert mirrors.active == DOWN
+
+    await mirrors.choose(mirrors_transport(FakeSite(), {DOWN}))
+
+    assert mirrors.active == FAST
+    assert mirrors.latencies[DOWN] is None
+    assert mirrors.rewrite(f"{SLOW}catalogue/serie-1/saison1/") == (
+        f"{FAST}catalogue/serie-1/saison1/"
+    )
+    assert mirrors.rewrite("https://video.test/e/1") == "https://video.test/e/1"
+
+
+async def test_urls_of_another_mirror():
+    mirrors = Mirrors([FAST, SLOW])
+    client = httpx.AsyncClient(
+        transport=mirrors.transport(mirrors_transport(FakeSite(), set()))
+    )
+
+    # A season saved while the slow mirror was used
+    anime_sama = AnimeSama(FAST, client)
+    episodes = await anime_sama.season_episodes(f"{SLOW}catalogue/serie-1/saison1/")
+    assert len(episodes) == 12
+
+
+async def test_fail_over():
+    down: set[str] = set()
+    mirrors = Mirrors([FAST, SLOW])
+    client = httpx.AsyncClient(
+        transport=mirrors.transport(mirrors_transport(FakeSite(), down), failures=2)
+    )
+
+    assert (await client.get(f"{FAST}catalogue/serie-1/")).status_code == 200
+
+    down.add(FAST)
+    try:
+        await client.get(f"{FAST}catalogue/serie-1/")
+    except httpx.ConnectError:
+        pass
+    else:
+        raise AssertionError("The first failure is not retried")
+
+    # The second failure in a row moves to the other mirror
+    response = await client.get(f"{FAST}catalogue/serie-1/")
+    assert response.status_code == 200
+    assert mirrors.active == SLOW
+
+
+async def test_parse_after_fail_over():
+    down: set[str] = set()
+    mirrors = Mirrors([FAST, SLOW])
+    client = httpx.AsyncClient(
+        transport=mirrors.transport(mirrors_transport(FakeSite(), down), failures=1)
+    )
+    anime_sama = AnimeSama(mirrors.active, client)
+    mirrors.on_change(lambda active: setattr(anime_sama, "site_url", active))
+    assert len(await anime_sama.search("")) == 100
+
+    down.add(FAST)
+    assert len(await anime_sama.search("")) == 100
+    assert mirrors.active == anime_sama.site_url == SLOW
+    assert len(await anime_sama.new_episodes()) == 10
+    assert (await anime_sama.search(""))[0].url.startswith(SLOW)
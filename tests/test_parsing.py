@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from anime_sama_api.episode import Players
+from anime_sama_api.metrics import Metrics
+from anime_sama_api.parsing import (
+    ParseExecutor,
+    catalogue_cards,
+    episode_names,
+    parse,
+    players_from,
+)
+from anime_sama_api.testing import FakeSite
+from anime_sama_api.top_level import AnimeSama
+
+SITE_URL = "https://anime-sama.test/"
+
+
+def test_players_from():
+    episodes_js = """
+    var eps2 = ['https://b.test/1', 'https://b.test/2'];
+    /* var eps3 = ['https://c.test/1']; */
+    var eps1 = ['https://a.test/1', 'https://a.test/2', 'https://a.test/3'];
+    """
+    assert players_from(episodes_js) == [
+        ["https://a.test/1", "https://b.test/1"],
+        ["https://a.test/2", "https://b.test/2"],
+        ["https://a.test/3"],
+    ]
+
+
+async def crawl(client: httpx.AsyncClient) -> list[tuple[str, str, str, Players]]:
+    anime_sama = AnimeSama(SITE_URL, client)
+    episodes = []
+    for catalogue in await anime_sama.all_catalogues():
+        async for episode in catalogue.all_episodes_iter():
+            episodes.append(
+                (
+                    catalogue.name,
+                    episode.season_name,
+                    episode.name,
+                    episode.languages["vostfr"],
+                )
+            )
+    return episodes
+
+
+async def test_parse_executor():
+    site = FakeSite(catalogues=10, seasons=2, episodes=3, page_size=4)
+
+    expected = await crawl(httpx.AsyncClient(transport=site.transport()))
+    with ParseExecutor(max_workers=2) as executor:
+        client = executor.attach(httpx.AsyncClient(transport=site.transport()))
+        assert await crawl(client) == expected
+        assert executor._pool is not None
+
+    assert len(expected) == 10 * 2 * 3
+    assert expected[0][:3] == ("Serie 1", "Saison 1", "Episode 1")
+
+
+async def test_parse_executor_times_the_parsing_only():
+    metrics = Metrics()
+    with ParseExecutor(max_workers=1) as executor:
+        client = executor.attach(metrics.instrument(httpx.AsyncClient()))
+        # The only worker is busy, the page waits for it
+        busy = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+
+        assert await parse(client, "search", catalogue_cards, "", SITE_URL) == []
+        await busy
+
+    parsing = metrics.to_json()["parsing"]["search"]
+    assert parsing["count"] == 1
+    assert parsing["sum"] < 0.2
+
+
+async def test_parse_executor_errors():
+    html = "<script>resetListe();\n\tnewSP();\n}</script>"
+
+    with ParseExecutor(max_workers=1) as executor:
+        with pytest.raises(NotImplementedError, match="saison1/vf/"):
+            await executor.run(
+                episode_names, html, f"{SITE_URL}catalogue/serie-1/saison1/vf/", 1, 1
+            )
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import httpx
+
+from anime_sama_api.cli.cache import JsonStore
+from anime_sama_api.cli.player_store import PlayerStore
+from anime_sama_api.season import Season
+
+from .test_top_level import one_piece_pages
+
+
+def season_and_requests(pages: dict[str, str]) -> tuple[Season, list[str]]:
+    requested: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if request.url.path not in pages:
+            return httpx.Response(404)
+        return httpx.Response(200, text=pages[request.url.path])
+
+    season = Season(
+        "https://anime-sama.org/catalogue/one-piece/saison11/",
+        "Saison 11",
+        "One Piece",
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return season, requested
+
+
+async def test_known_season_without_requests(tmp_path: Path):
+    season, requested = season_and_requests(
+        one_piece_pages
+        | {
+            "/catalogue/one-piece/saison11/vostfr/episodes.js": (
+                "var eps1 = ['https://a/1119', 'https://a/1120', 'https://a/1121'];"
+                "var eps2 = ['https://b/1119', 'https://b/1120', 'https://b/1121'];"
+            )
+        }
+    )
+    store = PlayerStore(JsonStore(tmp_path / "players.json", ttl=60))
+
+    fetched = await store.episodes(season)
+    requested.clear()
+
+    # Another process reading the same file
+    other_store = PlayerStore(JsonStore(tmp_path / "players.json", ttl=60))
+    stored = await other_store.episodes(season)
+
+    assert requested == []
+    assert stored == fetched
+    assert stored[1].best(["VOSTFR"]) == fetched[1].best(["VOSTFR"])
+    assert stored[1].serie_name == "One Piece"
+
+
+async def test_stale_season_refreshed_by_filever(tmp_path: Path):
+    season, requested = season_and_requests(one_piece_pages)
+    store = PlayerStore(JsonStore(tmp_path / "players.json", ttl=0))
+    await store.episodes(season)
+    requested.clear()
+
+    # Unchanged filever: the episodes are not downloaded again
+    await store.episodes(season)
+    await store.wait_refreshes()
+    assert "/catalogue/one-piece/saison11/vostfr/" in requested
+    assert not any(path.endswith("episodes.js") for path in requested)
+
+    one_piece_pages_v2 = one_piece_pages | {
+        "/catalogue/one-piece/saison11/vostfr/": one_piece_pages[
+            "/catalogue/one-piece/saison11/vostfr/"
+        ].replace("filever=42", "filever=43")
+    }
+    season, requested = season_and_requests(one_piece_pages_v2)
+    await store.episodes(season)
+    await store.wait_refreshes()
+    assert "/catalogue/one-piece/saison11/vostfr/episodes.js" in requested
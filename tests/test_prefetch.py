@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from anime_sama_api.cli.prefetch import Prefetcher, run_in_daemon_thread
+import anime_sama_api.cli.utils as utils
+from anime_sama_api.cli.utils import select_one
+
+
+async def test_prefetch_is_reused_and_others_cancelled():
+    calls: list[str] = []
+    running = 0
+    max_running = 0
+
+    def fetch(key: str):
+        async def factory() -> str:
+            nonlocal running, max_running
+            calls.append(key)
+            running += 1
+            max_running = max(max_running, running)
+            try:
+                await asyncio.sleep(0.01)
+            finally:
+                running -= 1
+            return key.upper()
+
+        return factory
+
+    prefetcher = Prefetcher(concurrency=2)
+    for key in "abcd":
+        prefetcher.prefetch(key, fetch(key))
+    await asyncio.sleep(0.05)
+
+    assert await prefetcher.get("b", fetch("b")) == "B"
+    assert calls == ["a", "b", "c", "d"]
+    assert max_running == 2
+
+    # Not prefetched
+    assert await prefetcher.get("e", fetch("e")) == "E"
+
+
+async def test_prefetch_cancelled_on_choice():
+    started = []
+
+    async def slow() -> None:
+        started.append(True)
+        await asyncio.sleep(10)
+
+    prefetcher = Prefetcher(concurrency=1)
+    prefetcher.prefetch("slow", slow)
+    prefetcher.prefetch("queued", slow)
+    await asyncio.sleep(0)
+
+    async def chosen() -> str:
+        return "chosen"
+
+    assert await prefetcher.get("other", chosen) == "chosen"
+    await asyncio.sleep(0)
+    assert started == [True]
+
+
+async def test_run_in_daemon_thread_does_not_block():
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.ensure_future(tick())
+    assert await run_in_daemon_thread(lambda: time.sleep(0.1) or "done") == "done"
+    ticker.cancel()
+    assert ticks > 2
+
+
+async def test_run_in_daemon_thread_without_choices(monkeypatch):
+    # Other tests leave a mock that fails on unexpected output
+    monkeypatch.setattr(utils, "print_func", lambda *_, **__: None)
+
+    async def select() -> str:
+        try:
+            return await run_in_daemon_thread(select_one, [])
+        except SystemExit as exit:
+            return f"exit {exit.code}"
+
+    assert await asyncio.wait_for(select(), 3) == "exit 404"
@@ -0,0 +1,56 @@
+import pstats
+from pathlib import Path
+
+import httpx
+
+from anime_sama_api.profiling import kind_of, profile
+from anime_sama_api.testing import FakeSite
+from anime_sama_api.top_level import AnimeSama
+
+
+def test_kind_of():
+    assert kind_of("/venv/site-packages/httpx/_client.py", "send") == "network"
+    assert kind_of("~", "<method 'poll' of 'select.epoll' objects>") == "network"
+    assert kind_of("~", "<method 'findall' of 're.Pattern' objects>") == "regex"
+    assert kind_of("/src/anime_sama_api/season.py", "_get_players_from") == "parsing"
+    assert kind_of("/src/anime_sama_api/catalogue.py", "__init__") == "models"
+    assert kind_of("/src/anime_sama_api/cli/downloader.py", "download") == "other"
+
+
+async def test_profile(tmp_path: Path):
+    anime_sama = AnimeSama(
+        "https://anime-sama.test/",
+        httpx.AsyncClient(transport=FakeSite(catalogues=200).transport()),
+    )
+
+    with profile(tmp_path / "search.txt"):
+        catalogues = await anime_sama.all_catalogues()
+        await (await catalogues[0].seasons())[0].episodes()
+
+    report = (tmp_path / "search.txt").read_text()
+    assert report.startswith("Profile of search: ")
+    for kind in ("network", "regex", "parsing", "models", "other"):
+        assert f"\n  {kind} " in report
+    assert "Memory peak" in report
+    assert "top_level.py" in report  # Where the catalogues are allocated
+
+    stats = pstats.Stats(str(tmp_path / "search.txt.prof"))
+    assert any(function == "search" for _, _, function in stats.stats)  # type: ignore
+
+
+def test_cli_profile(tmp_path: Path):
+    from anime_sama_api.cli.__main__ import main
+
+    report = tmp_path / "events.txt"
+    main(["--profile", str(report), "events", str(tmp_path / "events.jsonl")])
+
+    assert report.read_text().startswith("Profile of anime-sama events: ")
+
+
+def test_profile_report_ending_in_prof(tmp_path: Path):
+    with profile(tmp_path / "report.prof"):
+        sum(range(1000))
+
+    # The cProfile stats don't replace the report
+    assert (tmp_path / "report.prof").read_text().startswith("Profile of report: ")
+    assert pstats.Stats(str(tmp_path / "report.prof.prof")).stats  # type: ignore
@@ -0,0 +1,41 @@
+import json
+from io import StringIO
+
+from anime_sama_api.cli.progress import JsonLinesProgress, Throttle
+
+
+def test_throttle():
+    throttle = Throttle(refresh_per_second=0.001)
+    assert throttle()
+    assert not throttle()
+    assert not throttle()
+
+    unlimited = Throttle(refresh_per_second=0)
+    assert unlimited()
+    assert unlimited()
+
+
+def test_json_lines_progress():
+    output = StringIO()
+    progress = JsonLinesProgress(output)
+
+    progress.start_batch(1)
+    with progress.live():
+        me = progress.add_episode("Episode 1")
+        progress.update_site(me, "video.sibnet.ru")
+        progress.update_bytes(me, 1024, 2048)
+        progress.finish_episode(me)
+
+    events = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [event["event"] for event in events] == [
+        "batch",
+        "start",
+        "site",
+        "progress",
+        "end",
+        "batch",
+    ]
+    assert events[3]["downloaded"] == 1024
+    assert events[3]["total"] == 2048
+    assert events[3]["site"] == "video.sibnet.ru"
+    assert events[-1] == {"event": "batch", "completed": 1, "total": 1}
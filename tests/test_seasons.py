@@ -1,10 +1,12 @@
 import pytest
 
 from .data import episode_data, season_data
+from .data.http import live_site
 
 pytest_plugins = ("pytest_asyncio",)
 
 
+@live_site
 @pytest.mark.asyncio
 async def test_episodes():
     assert episode_data.one_piece_season1 == await season_data.one_piece[0].episodes()
@@ -0,0 +1,165 @@
+import asyncio
+import json
+from threading import Thread
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import httpx
+import pytest
+
+from anime_sama_api.cli.server import Api, ApiServer
+from anime_sama_api.metrics import Metrics
+from anime_sama_api.top_level import AnimeSama
+
+from .test_top_level import one_piece_pages
+
+
+def one_piece_api(requested: list[str], metrics: Metrics | None = None) -> Api:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if request.url.path not in one_piece_pages:
+            return httpx.Response(404)
+        return httpx.Response(200, text=one_piece_pages[request.url.path])
+
+    return Api(
+        AnimeSama(
+            "https://anime-sama.org/",
+            httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        ),
+        metrics=metrics,
+    )
+
+
+async def test_api_coalesce_requests():
+    requested: list[str] = []
+    api = one_piece_api(requested)
+    params = {"url": "https://anime-sama.org/catalogue/one-piece/saison11"}
+
+    responses = await asyncio.gather(
+        *(api.handle("/episodes", params) for _ in range(3))
+    )
+    responses.append(await api.handle("/episodes", params))
+
+    assert responses[0] == responses[-1]
+    assert [episode["name"] for episode in responses[0]] == [
+        "Episode 1119",
+        "Episode 1120",
+        "Episode 1121",
+    ]
+    assert responses[0][1]["languages"]["vostfr"] == ["https://a/1120"]
+    assert requested.count("/catalogue/one-piece/saison11/vostfr/episodes.js") == 1
+
+    seasons = await api.handle(
+        "/seasons", {"url": "https://anime-sama.org/catalogue/one-piece/"}
+    )
+    assert seasons == [
+        {
+            "url": "https://anime-sama.org/catalogue/one-piece/saison11/",
+            "name": "Saison 11",
+            "serie_name": "one-piece",
+        }
+    ]
+    # The catalogue page is shared with the episodes request
+    assert requested.count("/catalogue/one-piece/") == 1
+
+
+def test_server():
+    server = ApiServer(("127.0.0.1", 0), one_piece_api([]))
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        with urlopen(
+            f"{base_url}/seasons?url=https://anime-sama.org/catalogue/one-piece/"
+        ) as response:
+            assert response.headers["Content-Type"].startswith("application/json")
+            assert json.load(response)[0]["name"] == "Saison 11"
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{base_url}/seasons")
+        assert error.value.code == 400
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{base_url}/unknown")
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_metrics():
+    server = ApiServer(("127.0.0.1", 0), one_piece_api([], Metrics()))
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        urlopen(f"{base_url}/seasons?url=https://anime-sama.org/catalogue/one-piece/")
+
+        with urlopen(f"{base_url}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            text = response.read().decode()
+        assert 'anime_sama_requests_total{endpoint="catalogue",status="200"} 1' in text
+
+        with urlopen(f"{base_url}/metrics?format=json") as response:
+            assert json.load(response)["parsing"]["catalogue"]["count"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+async def test_api_catalogue_expiration():
+    requested: list[str] = []
+    api = one_piece_api(requested)
+    api.ttl = 0.05
+    params = {"url": "https://anime-sama.org/catalogue/one-piece/"}
+
+    await api.handle("/seasons", params)
+    await asyncio.sleep(0.1)
+    await api.handle("/seasons", params)
+    assert requested.count("/catalogue/one-piece/") == 2
+    # Only the fresh responses and catalogues are kept
+    assert len(api._responses) == 1
+    assert len(api._catalogues) == 1
+
+
+async def test_api_failed_catalogue_page_is_not_kept():
+    requested: list[str] = []
+    api = one_piece_api(requested)
+    one_piece = "https://anime-sama.org/catalogue/one-piece/"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if requested.count(request.url.path) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, text=one_piece_pages[request.url.path])
+
+    api.anime_sama.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert await api.handle("/seasons", {"url": one_piece}) == []
+    details = await api.handle("/catalogue", {"url": one_piece})
+    assert details["name"] == "one-piece"
+    assert requested.count("/catalogue/one-piece/") == 2
+
+
+def test_server_internal_error():
+    api = one_piece_api([])
+
+    async def broken(_):
+        raise ValueError("broken")
+
+    api.routes["/seasons"] = broken
+    server = ApiServer(("127.0.0.1", 0), api)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{base_url}/seasons")
+        assert error.value.code == 500
+        assert json.load(error.value) == {"error": "Internal server error"}
+    finally:
+        server.shutdown()
+        server.server_close()
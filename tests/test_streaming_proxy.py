@@ -0,0 +1,47 @@
+from urllib.request import Request, urlopen
+
+from anime_sama_api.cli.direct_download import RangedDownload
+from anime_sama_api.cli.streaming_proxy import StreamingProxy
+
+from .test_direct_download import VIDEO, video_server
+
+
+def proxy_for(tmp_path, accept_ranges: bool = True) -> StreamingProxy:
+    return StreamingProxy(
+        RangedDownload(
+            "https://video.example/episode.mp4",
+            tmp_path / "episode.mp4",
+            connections=2,
+            segment_size=1000,
+            client=video_server([], accept_ranges),
+        )
+    ).start()
+
+
+def test_proxy_streams_and_keeps(tmp_path):
+    proxy = proxy_for(tmp_path)
+
+    request = Request(proxy.url, headers={"Range": "bytes=5000-5099"})
+    with urlopen(request) as response:
+        assert response.status == 206
+        assert response.headers["Content-Range"] == f"bytes 5000-5099/{len(VIDEO)}"
+        assert response.read() == VIDEO[5000:5100]
+
+    with urlopen(proxy.url) as response:
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert response.read() == VIDEO
+
+    proxy.finish()
+    assert (tmp_path / "episode.mp4").read_bytes() == VIDEO
+    assert not (tmp_path / "episode.mp4.rpart").exists()
+
+
+def test_proxy_without_ranges(tmp_path):
+    proxy = proxy_for(tmp_path, accept_ranges=False)
+
+    with urlopen(proxy.url) as response:
+        assert "Accept-Ranges" not in response.headers
+        assert response.read() == VIDEO
+
+    proxy.finish()
+    assert (tmp_path / "episode.mp4").read_bytes() == VIDEO
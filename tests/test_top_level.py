@@ -1,12 +1,22 @@
+import asyncio
+from dataclasses import replace
+from pathlib import Path
+
+import httpx
 import pytest
 
-from anime_sama_api.top_level import AnimeSama
+from anime_sama_api.langs import Lang
+from anime_sama_api.top_level import AnimeSama, EpisodeRelease
+from anime_sama_api.testing import FakeSite
 from .data import catalogue_data
+from .data.http import client, live_site
+from .data.in_flight import InFlight
 
 pytest_plugins = ("pytest_asyncio",)
-anime_sama = AnimeSama(site_url="https://anime-sama.org/")
+anime_sama = AnimeSama(site_url="https://anime-sama.org/", client=client)
 
 
+@live_site
 @pytest.mark.asyncio(loop_scope="session")
 async def test_search():
     assert catalogue_data.one_piece in await anime_sama.search("one piece")
@@ -14,6 +24,7 @@ async def test_search():
     assert catalogue_data.gumball in await anime_sama.search("gumball")
 
 
+@live_site
 @pytest.mark.asyncio(loop_scope="session")
 async def test_all_catalogues():
     async for catalogue in anime_sama.catalogues_iter():
@@ -21,3 +32,241 @@ async def test_all_catalogues():
             break
     else:
         assert 1 == 0
+
+
+@live_site
+@pytest.mark.asyncio(loop_scope="session")
+async def test_homepage():
+    # Checks the section names against the real homepage
+    homepage = await anime_sama.homepage()
+    assert homepage.new_episodes
+    assert homepage.new_content
+    assert homepage.classics
+    assert homepage.highlights
+    assert any(homepage.planning)
+
+
+async def test_homepage_fixture():
+    # Every section of a homepage in the layout of anime-sama
+    html = (Path(__file__).parent / "data" / "homepage.html").read_text("utf-8")
+    anime_sama = AnimeSama(
+        "https://anime-sama.org/",
+        httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda _: httpx.Response(200, text=html))
+        ),
+    )
+    homepage = await anime_sama.homepage()
+
+    assert [
+        (release.serie_name, release.language, release.descriptive)
+        for release in homepage.new_episodes
+    ] == [("Dandadan", "VF", "Episodes 3 à 4"), ("One Piece", "VOSTFR", "Episode 1122")]
+    assert [catalogue.name for catalogue in homepage.new_content] == ["Gachiakuta"]
+    assert [catalogue.name for catalogue in homepage.highlights] == ["Mushishi"]
+    assert [catalogue.name for catalogue in homepage.classics] == [
+        "One Piece",
+        "Naruto",
+    ]
+    assert [[season.serie_name for season in day] for day in homepage.planning] == [
+        ["One Piece"],
+        *[[]] * 5,
+        ["Dandadan"],
+    ]
+
+
+async def test_homepage_conditional_request():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="<html>home</html>", headers={"ETag": '"v1"'})
+
+    anime_sama = AnimeSama(
+        "https://anime-sama.org/",
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    assert await anime_sama._get_homepage() == "<html>home</html>"
+    assert await anime_sama._get_homepage() == "<html>home</html>"
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == '"v1"'
+
+
+HOMEPAGE = """
+<!-- CLASSIQUES -->
+<div><a href="https://anime-sama.org/catalogue/one-piece/">
+<img src="https://cdn/one-piece.jpg"><h1>One Piece</h1></a></div>
+<div><a href="https://anime-sama.org/catalogue/one-piece/saison1/vostfr/">
+<img src="https://cdn/one-piece.jpg"><h1>One Piece</h1></a></div>
+<!-- PLANNING -->
+<h2>Lundi</h2>
+<script>cartePlanningAnime("One Piece", "one-piece/saison11/vostfr");</script>
+<h2>Mardi</h2>
+<a href="https://anime-sama.org/catalogue/dandadan/saison2/vf/">Dandadan</a>
+<!-- FIN -->
+"""
+
+
+async def test_homepage_sections_share_one_request():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text=HOMEPAGE, headers={"ETag": '"v1"'})
+
+    anime_sama = AnimeSama(
+        "https://anime-sama.org/",
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    homepage = await anime_sama.homepage()
+
+    assert [catalogue.name for catalogue in homepage.classics] == ["One Piece"]
+    assert homepage.classics[0].image_url == "https://cdn/one-piece.jpg"
+    assert homepage.highlights == []
+
+    planning = homepage.planning
+    assert len(planning) == 7
+    assert [season.url for season in planning[0]] == [
+        "https://anime-sama.org/catalogue/one-piece/saison11/"
+    ]
+    assert planning[0][0].serie_name == "One Piece"
+    assert [season.url for season in planning[1]] == [
+        "https://anime-sama.org/catalogue/dandadan/saison2/"
+    ]
+    assert planning[2:] == [[]] * 5
+    assert len(requests) == 1
+
+    # An unchanged homepage is not parsed again
+    assert await anime_sama.planning() is planning
+    assert len(requests) == 2
+
+
+def release(descriptive: str, language: Lang = "VOSTFR") -> EpisodeRelease:
+    return EpisodeRelease(
+        page_url="https://anime-sama.org/catalogue/one-piece/saison11/vostfr/",
+        image_url="",
+        serie_name="One Piece",
+        categories=("Anime",),
+        language=language,
+        descriptive=descriptive,
+    )
+
+
+def test_release_urls():
+    new = release("Episode 1120")
+    assert new.season_url == "https://anime-sama.org/catalogue/one-piece/saison11/"
+    assert new.catalogue_url == "https://anime-sama.org/catalogue/one-piece/"
+    assert new.lang_ids == {"vostfr"}
+
+
+def test_release_episode_numbers():
+    assert release("Episode 1120").episode_numbers == {1120}
+    assert release("Saison 2 Episode 5").episode_numbers == {5}
+    assert release("Episodes 1 à 3").episode_numbers == {1, 2, 3}
+    assert release("Film").episode_numbers == set()
+
+
+one_piece_pages = {
+    "/catalogue/one-piece/": 'panneauAnime("Saison 11", "saison11/vostfr");',
+    "/catalogue/one-piece/saison11/vostfr/": (
+        '<img src="https://anime-sama.org/flag_jp.png">\n<p>VO</p>\n'
+        '<script src="episodes.js?filever=42"></script>\n'
+        "<script>resetListe();\n\tcreerListe(1119, 1121);\n}</script>"
+    ),
+    "/catalogue/one-piece/saison11/vostfr/episodes.js": (
+        "var eps1 = ['https://a/1119', 'https://a/1120', 'https://a/1121'];"
+    ),
+}
+
+
+async def test_get_real_episodes_share_seasons():
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if request.url.path not in one_piece_pages:
+            return httpx.Response(404)
+        return httpx.Response(200, text=one_piece_pages[request.url.path])
+
+    anime_sama = AnimeSama(
+        "https://anime-sama.org/",
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    releases = [
+        replace(release(f"Episode {number}"), anime_sama=anime_sama)
+        for number in (1120, 1121)
+    ]
+
+    episodes = await asyncio.gather(*(new.get_real_episodes() for new in releases))
+
+    assert [[episode.name for episode in found] for found in episodes] == [
+        ["Episode 1120"],
+        ["Episode 1121"],
+    ]
+    assert episodes[0][0].season_name == "Saison 11"
+    assert episodes[0][0].serie_name == "One Piece"
+    assert requested.count("/catalogue/one-piece/") == 1
+    assert requested.count("/catalogue/one-piece/saison11/vostfr/episodes.js") == 1
+
+
+async def test_resolve_many():
+    site = FakeSite(catalogues=4, seasons=3, episodes=2, latency=0.01)
+    in_flight = InFlight(site)
+    anime_sama = AnimeSama("https://anime-sama.test/", in_flight.client())
+    urls = [
+        f"https://anime-sama.test/catalogue/serie-{number}" for number in range(1, 5)
+    ]
+
+    resolved = await anime_sama.resolve_many(
+        [*urls, urls[0] + "/", "https://anime-sama.test/catalogue/serie-9/"],
+        concurrency=3,
+    )
+
+    assert [result.catalogue.url for result in resolved] == [
+        url + "/" for url in urls
+    ] + ["https://anime-sama.test/catalogue/serie-9/"]
+    assert in_flight.requested.count("/catalogue/serie-1/") == 1
+    assert in_flight.max_in_flight == 3
+
+    assert not any(result.errors for result in resolved[:4])
+    assert [len(season.episodes) for season in resolved[0].seasons] == [2, 2, 2]
+    assert isinstance(resolved[-1].error, LookupError)
+    assert resolved[-1].seasons == []
+
+    # The seasons are cached by the first batch
+    in_flight.requested.clear()
+    resolved = await anime_sama.resolve_many(urls[:1], depth="seasons")
+    assert in_flight.requested == []
+    assert [season.season.name for season in resolved[0].seasons] == [
+        "Saison 1",
+        "Saison 2",
+        "Saison 3",
+    ]
+
+
+async def test_season_cache_forgets_failures_and_expired():
+    anime_sama = AnimeSama("https://anime-sama.test/", season_cache_ttl=0.05)
+    cache = anime_sama._episodes_cache
+    calls = 0
+
+    async def factory() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    # Cancelling its only caller cancels the shared fetch
+    caller = asyncio.ensure_future(anime_sama._cached(cache, "season", factory))
+    await asyncio.sleep(0.001)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    assert await anime_sama._cached(cache, "season", factory) == 2
+
+    await asyncio.sleep(0.06)
+    await anime_sama._cached(cache, "other", factory)
+    assert list(cache) == ["other"]
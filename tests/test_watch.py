@@ -0,0 +1,51 @@
+import httpx
+
+from anime_sama_api.cli.cache import JsonStore
+from anime_sama_api.cli.watch import Watcher
+from anime_sama_api.testing import FakeSite
+from anime_sama_api.top_level import AnimeSama
+
+
+def watcher(site: FakeSite, tmp_path, series: set[str]) -> Watcher:
+    return Watcher(
+        AnimeSama(
+            "https://anime-sama.test/", httpx.AsyncClient(transport=site.transport())
+        ),
+        series,
+        {"VOSTFR"},
+        JsonStore(tmp_path / "watch.json"),
+    )
+
+
+async def test_poll(tmp_path):
+    site = FakeSite(catalogues=4, seasons=2, episodes=3)
+    new_releases = await watcher(site, tmp_path, {"serie-1", "serie-3"}).poll()
+
+    assert [new.catalogue.name for new in new_releases] == ["Serie 3", "Serie 1"]
+    for new in new_releases:
+        assert new.release.language == "VOSTFR"
+        assert [episode.name for episode in new.episodes] == ["Episode 3"]
+        assert new.episodes[0].season_name == "Saison 2"
+
+
+async def test_mark_seen(tmp_path):
+    site = FakeSite(catalogues=4, seasons=2, episodes=3)
+    first = watcher(site, tmp_path, {"serie-1", "serie-3"})
+    serie_3, serie_1 = await first.poll()
+
+    first.mark_seen([serie_1])
+    # The seen releases are kept between runs
+    second = watcher(site, tmp_path, {"serie-1", "serie-3"})
+    assert await second.poll() == [serie_3]
+
+
+async def test_is_watched(tmp_path):
+    site = FakeSite(catalogues=4)
+    releases = await AnimeSama(
+        "https://anime-sama.test/", httpx.AsyncClient(transport=site.transport())
+    ).new_episodes()
+    watched = watcher(site, tmp_path, {"serie-2"})
+
+    assert [
+        release.serie_name for release in releases if watched.is_watched(release)
+    ] == ["Serie 2"]